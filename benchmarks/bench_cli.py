@@ -0,0 +1,44 @@
+"""
+Batch command-line benchmark.
+
+Generates several synthetic CUP files and converts them to CSV with the
+``soaring-cup convert`` command, once in a single process (``-j 1``) and
+once on the process pool, as a nightly job regenerating files for many
+pilots would. The speed-up is bounded by the number of CPUs.
+
+Usage:
+    python benchmarks/bench_cli.py [files] [rows_per_file]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_cup  # noqa: E402
+from soaring_cup_file_editor import cli  # noqa: E402
+
+
+def run(args):
+    start = time.perf_counter()
+    code = cli.main(args + ['-q'])
+    assert code == cli.EXIT_OK, code
+    return time.perf_counter() - start
+
+
+def main(argv):
+    files = int(argv[0]) if argv else 8
+    rows = int(argv[1]) if len(argv) > 1 else 25_000
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = [generate_cup(os.path.join(tmp, f'pilot{i}.cup'), rows) for i in range(files)]
+        print(f"{files} files x {rows} rows, {os.cpu_count()} CPU(s)")
+        single = run(['convert', *inputs, '-d', os.path.join(tmp, 'single'), '-j', '1'])
+        print(f"  convert, 1 process:    {single:.2f} s")
+        pooled = run(['convert', *inputs, '-d', os.path.join(tmp, 'pool')])
+        print(f"  convert, process pool: {pooled:.2f} s ({single / pooled:.1f}x)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,78 @@
+"""
+Per-edit cost benchmark: full re-sort vs the sorted WaypointCollection.
+
+For growing synthetic databases, times adding one waypoint and renaming
+one waypoint the way MainWindow used to do it (store.sort() after every
+change, which also forced a full table rebuild) and through
+WaypointCollection, which keeps the order with bisect and reports the
+change as a single event.
+
+Usage:
+    python benchmarks/bench_collection.py [rows ...]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import synthetic_waypoints  # noqa: E402
+from soaring_cup_file_editor.collection import WaypointCollection  # noqa: E402
+from soaring_cup_file_editor.store import WaypointStore  # noqa: E402
+
+EDITS = 50
+
+
+def time_per_edit(func) -> float:
+    start = time.perf_counter()
+    for _ in range(EDITS):
+        func()
+    return (time.perf_counter() - start) / EDITS
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    rng = random.Random(1)
+    print(f"{'rows':>8} {'case':<26} {'re-sort':>12} {'collection':>12}")
+    for rows in sizes:
+        waypoints = list(synthetic_waypoints(rows))
+        store = WaypointStore(waypoints)
+        store.sort(key=lambda w: w.name.lower())
+        collection = WaypointCollection(WaypointStore(waypoints))
+        events = []
+        collection.subscribe(events.append)
+        new_point = waypoints[0].copy()
+
+        def add_resort():
+            store.add(new_point)
+            store.sort(key=lambda w: w.name.lower())
+
+        def rename_resort():
+            index = rng.randrange(len(store))
+            waypoint = store[index]
+            waypoint.name = f"Renamed {rng.random()}"
+            store[index] = waypoint
+            store.sort(key=lambda w: w.name.lower())
+
+        def rename_collection():
+            row_id = collection.id_at(rng.randrange(len(collection)))
+            waypoint = collection.get(row_id)
+            waypoint.name = f"Renamed {rng.random()}"
+            collection.update(row_id, waypoint)
+
+        cases = [
+            ("add one waypoint", add_resort, lambda: collection.add(new_point)),
+            ("rename one waypoint", rename_resort, rename_collection),
+        ]
+        for label, resort, incremental in cases:
+            events.clear()
+            old = time_per_edit(resort)
+            new = time_per_edit(incremental)
+            print(f"{rows:>8} {label:<26} {old * 1e3:9.3f} ms {new * 1e3:9.3f} ms"
+                  f"  ({len(events) / EDITS:.1f} events/edit)")
+
+
+if __name__ == '__main__':
+    main()
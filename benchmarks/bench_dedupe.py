@@ -0,0 +1,99 @@
+"""
+Near-duplicate detection benchmark.
+
+Takes synthetic databases of growing size. Each repetition of the bundled
+national file is shifted to its own 12 x 12 degree tile and gets its own
+codes, so point density and code uniqueness stay like a real national file
+while the database grows. It then plants
+near-duplicates of airfields (5% of the rows): each copy's coordinates are
+moved by up to ~400 m, and its name is either replaced by the code or
+stripped of diacritics. It times find_duplicates() and reports how many
+planted duplicates were found, to show that run time grows linearly
+rather than quadratically.
+
+First it checks the bundled file for false positives: its separate
+obstacles of one name (wind farm turbines, masts a few hundred metres
+apart) and nearby places of different styles must not be grouped. The
+run exits with code 1 if any group breaks these rules.
+
+Usage:
+    python benchmarks/bench_dedupe.py [rows ...]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import SOURCE_CUP, synthetic_waypoints  # noqa: E402
+from soaring_cup_file_editor.dedupe import find_duplicates, pair_radius, styles_match  # noqa: E402
+from soaring_cup_file_editor.file_io import parse_cup_file  # noqa: E402
+from soaring_cup_file_editor.utils import fold_text  # noqa: E402
+
+PLANTED_SHARE = 0.05
+BASE_ROWS = 4983  # Rows in the bundled database
+
+
+def with_planted_duplicates(rows: int, seed: int = 3):
+    rng = random.Random(seed)
+    waypoints = []
+    for i, waypoint in enumerate(synthetic_waypoints(rows)):
+        tile = i // BASE_ROWS
+        waypoint.latitude = (waypoint.latitude + 12 * (tile // 25)) % 90
+        waypoint.longitude = (waypoint.longitude + 12 * (tile % 25) + 180) % 360 - 180
+        if tile and waypoint.code:
+            waypoint.code = f"{waypoint.code}{tile}"
+        waypoints.append(waypoint)
+    airfields = [waypoint for waypoint in waypoints if waypoint.is_airfield]
+    planted = []
+    for original in rng.sample(airfields, min(len(airfields), int(rows * PLANTED_SHARE))):
+        copy = original.copy()
+        copy.latitude += rng.uniform(-0.003, 0.003)
+        copy.longitude += rng.uniform(-0.004, 0.004)
+        if copy.code and rng.random() < 0.5:
+            copy.name, copy.code = copy.code, ''
+        else:
+            copy.name = fold_text(copy.name).title()
+        planted.append(copy)
+    return waypoints + planted, len(waypoints)
+
+
+def check_bundled():
+    """Groups found in the bundled file that merge waypoints which are not duplicates."""
+    waypoints = parse_cup_file(SOURCE_CUP)
+    bad = []
+    for group in find_duplicates(waypoints):
+        members = [waypoints[i] for i in group.ids]
+        linked = {(pair.first, pair.second) for pair in group.pairs}
+        if (any(not styles_match(a.style, b.style) for a in members for b in members)
+                or any(pair.distance_m > pair_radius(waypoints[pair.first], waypoints[pair.second])
+                       for pair in group.pairs)
+                or len(linked) != len(group.ids) * (len(group.ids) - 1) // 2):
+            bad.append([(w.name, w.style) for w in members])
+    return bad
+
+
+def main():
+    bad = check_bundled()
+    if bad:
+        print("False duplicates in the bundled file:")
+        for group in bad:
+            print(f"  {group}")
+        sys.exit(1)
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 50_000, 100_000]
+    print(f"{'rows':>8} {'time':>9} {'us/row':>8} {'groups':>7} {'planted found':>14}")
+    for rows in sizes:
+        waypoints, first_planted = with_planted_duplicates(rows)
+        start = time.perf_counter()
+        groups = find_duplicates(waypoints)
+        elapsed = time.perf_counter() - start
+        found = {i for group in groups for i in group.ids if i >= first_planted}
+        planted = len(waypoints) - first_planted
+        print(f"{len(waypoints):>8} {elapsed:8.2f}s {elapsed / len(waypoints) * 1e6:8.1f} "
+              f"{len(groups):>7} {len(found):>7}/{planted}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Elevation fill benchmark against the local stub API.
+
+Writes a CUP file whose waypoints have no elevation, first with one
+request per waypoint (the previous behaviour) and then with the batched
+writer, and reports request counts and wall time.
+
+Usage:
+    python benchmarks/bench_elevation.py [rows] [latency_seconds]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_elevation_server import StubElevationServer  # noqa: E402
+from synthetic import synthetic_waypoints  # noqa: E402
+from soaring_cup_file_editor import elevation  # noqa: E402
+from soaring_cup_file_editor.elevation_cache import ElevationCache, set_default_cache  # noqa: E402
+from soaring_cup_file_editor.file_io import write_cup_file  # noqa: E402
+from soaring_cup_file_editor.models import Waypoint  # noqa: E402
+
+
+def without_elevation(rows: int):
+    waypoints = []
+    for w in synthetic_waypoints(rows):
+        data = w.to_dict()
+        data['elevation'] = None
+        waypoints.append(Waypoint.from_dict(data))
+    return waypoints
+
+
+def main(argv):
+    rows = int(argv[0]) if argv else 500
+    latency = float(argv[1]) if len(argv) > 1 else 0.01
+    waypoints = without_elevation(rows)
+    with tempfile.TemporaryDirectory() as tmp, StubElevationServer(latency=latency) as server:
+        elevation.ELEVATION_API_URL = server.url
+        out = os.path.join(tmp, 'out.cup')
+        # The stub's elevations are fake: keep them out of the user's cache
+        cache = ElevationCache(os.path.join(tmp, 'elevation.sqlite3'))
+        set_default_cache(cache)
+
+        start = time.perf_counter()
+        for w in waypoints:
+            elevation.get_elevation(w.latitude, w.longitude)
+        per_point = time.perf_counter() - start
+        per_point_requests = server.request_count
+
+        # Both runs start from an empty cache
+        cache.clear()
+        server.request_count = 0
+        start = time.perf_counter()
+        write_cup_file(out, waypoints, fetch_elevation=True)
+        batched = time.perf_counter() - start
+        set_default_cache(None)
+        cache.close()
+
+        print(f"{rows} waypoints without elevation, {latency * 1000:.0f} ms simulated latency")
+        print(f"  one request per point: {per_point_requests:5d} requests {per_point:8.3f} s")
+        print(f"  batched writer:        {server.request_count:5d} requests {batched:8.3f} s")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,90 @@
+"""
+Edit journal benchmark.
+
+Loads a synthetic CUP file, journals a stream of single-waypoint edits
+and compares the cost of each journaled edit with autosaving by
+rewriting the whole file. It then times a compaction and the recovery of
+the session from the journal, and checks that the recovered waypoints
+match.
+
+Usage:
+    python benchmarks/bench_journal.py [rows] [edits]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_cup  # noqa: E402
+from soaring_cup_file_editor import journal  # noqa: E402
+from soaring_cup_file_editor.collection import WaypointCollection  # noqa: E402
+from soaring_cup_file_editor.file_io import iter_cup_file, write_cup_file  # noqa: E402
+
+
+def load(filepath):
+    collection = WaypointCollection()
+    edits = journal.EditJournal(enabled=True)
+    edits.attach(collection)
+    collection.extend(iter_cup_file(filepath))
+    edits.start(filepath)
+    return collection, edits
+
+
+def snapshot(collection):
+    return sorted((w.name, w.latitude, w.longitude, w.description) for w in collection)
+
+
+def main(argv):
+    rows = int(argv[0]) if argv else 100_000
+    edits = int(argv[1]) if len(argv) > 1 else 2_000
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        journal.JOURNAL_DIR = tmp
+        filepath = generate_cup(os.path.join(tmp, 'base.cup'), rows)
+        collection, session = load(filepath)
+
+        start = time.perf_counter()
+        for i in range(edits):
+            row_id = collection.id_at(rng.randrange(len(collection)))
+            if i % 10 == 9:
+                collection.remove([row_id])
+                continue
+            waypoint = collection.get(row_id)
+            waypoint.description = f"edit {i}"
+            collection.update(row_id, waypoint)
+        per_edit = (time.perf_counter() - start) / edits
+
+        rewrite_path = os.path.join(tmp, 'rewrite.cup')
+        start = time.perf_counter()
+        write_cup_file(rewrite_path, collection, fetch_elevation=False)
+        rewrite = time.perf_counter() - start
+        print(f"{rows} rows, {edits} edits")
+        print(f"  journaled edit (incl. collection update): {per_edit * 1e3:.3f} ms")
+        print(f"  full rewrite per autosave:                {rewrite * 1e3:.0f} ms")
+
+        records = session.records
+        start = time.perf_counter()
+        session.compact()
+        print(f"  compaction: {records} -> {session.records} records in "
+              f"{(time.perf_counter() - start) * 1e3:.0f} ms")
+
+        expected = snapshot(collection)
+        session.close()
+        start = time.perf_counter()
+        contents = journal.find_session_journal()
+        recovered, recovering = load(filepath)
+        loaded = time.perf_counter() - start
+        recovering.replay(contents)
+        total = time.perf_counter() - start
+        assert snapshot(recovered) == expected
+        print(f"  recovery: base file loaded in {loaded:.2f} s, {len(contents.records)} records "
+              f"replayed in {(total - loaded) * 1e3:.0f} ms")
+        recovering.discard()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,82 @@
+"""
+Background loading benchmark.
+
+Writes synthetic CUP files and loads each one twice into a
+WaypointCollection: once synchronously on the calling thread, as the GUI
+used to, and once through BackgroundLoader with a poll loop like the
+GUI's ``after`` callback. It reports the time until the first rows are in
+the collection, the total time, and the longest single poll, which is how
+long the window stays unresponsive at a time.
+
+Usage:
+    python benchmarks/bench_load.py [rows ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_cup  # noqa: E402
+from soaring_cup_file_editor.collection import WaypointCollection  # noqa: E402
+from soaring_cup_file_editor.config import LOAD_POLL_INTERVAL_MS  # noqa: E402
+from soaring_cup_file_editor.file_io import iter_cup_file  # noqa: E402
+from soaring_cup_file_editor.loader import BackgroundLoader  # noqa: E402
+from soaring_cup_file_editor.store import WaypointStore  # noqa: E402
+
+
+def load_sync(filepath):
+    collection = WaypointCollection()
+    start = time.perf_counter()
+    collection.reset(WaypointStore(iter_cup_file(filepath)))
+    return collection, time.perf_counter() - start
+
+
+def load_background(filepath):
+    collection = WaypointCollection()
+    start = time.perf_counter()
+    loader = BackgroundLoader(filepath, 'cup')
+    first = None
+    longest = 0.0
+    polls = 0
+    while True:
+        time.sleep(LOAD_POLL_INTERVAL_MS / 1000)
+        poll_start = time.perf_counter()
+        waypoints = loader.take()
+        if waypoints:
+            collection.extend(waypoints)
+            if first is None:
+                first = time.perf_counter() - start
+        done = loader.done
+        longest = max(longest, time.perf_counter() - poll_start)
+        polls += 1
+        if done:
+            break
+    return collection, first, time.perf_counter() - start, longest, polls, loader
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            filepath = generate_cup(os.path.join(tmp, f"bench_{rows}.cup"), rows)
+            collection, sync_time = load_sync(filepath)
+            print(f"{rows:>8} rows: synchronous load {sync_time:.2f} s (window blocked throughout)")
+
+            background, first, total, longest, polls, loader = load_background(filepath)
+            assert [w.name for w in background] == [w.name for w in collection]
+            print(f"{'':>8} background: first rows after {first * 1e3:.0f} ms, done in {total:.2f} s "
+                  f"({rows / total:,.0f} rows/s), {polls} polls, longest poll {longest * 1e3:.0f} ms")
+
+            loader = BackgroundLoader(filepath, 'cup')
+            time.sleep(0.1)
+            start = time.perf_counter()
+            loader.cancel()
+            loader.wait()
+            print(f"{'':>8} cancel: worker stopped after {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
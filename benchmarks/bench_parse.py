@@ -0,0 +1,96 @@
+"""
+Throughput benchmark for CUP parsing.
+
+Compares the previous pure-Python, character-by-character tokenizer with the
+csv-reader based tokenizer used by ``parse_cup_file``, and reports rows/sec
+for tokenizing alone and for the full parse into Waypoint objects.
+
+Usage:
+    python benchmarks/bench_parse.py [rows ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import SOURCE_CUP, generate_cup  # noqa: E402
+from soaring_cup_file_editor import file_io  # noqa: E402
+
+
+def legacy_tokenize(filepath: str):
+    """Tokenizer as it was before switching to the csv module."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    rows = []
+    for line in lines[1:]:
+        line = line.strip()
+        if not line:
+            continue
+        parts = []
+        current = []
+        in_quotes = False
+        for char in line:
+            if char == '"':
+                in_quotes = not in_quotes
+            elif char == ',' and not in_quotes:
+                parts.append(''.join(current).strip().strip('"'))
+                current = []
+            else:
+                current.append(char)
+        parts.append(''.join(current).strip().strip('"'))
+        rows.append(parts)
+    return rows
+
+
+def csv_tokenize(filepath: str):
+    """Tokenizer currently used by parse_cup_file."""
+    with open(filepath, 'r', newline='', encoding='utf-8') as f:
+        return [parts for _, parts in file_io._tokenize_cup_rows(f)]
+
+
+def legacy_parse(filepath: str):
+    """Full parse using the legacy tokenizer."""
+    waypoints = []
+    for parts in legacy_tokenize(filepath):
+        try:
+            waypoints.append(file_io._waypoint_from_cup_fields(parts))
+        except Exception:
+            continue
+    return waypoints
+
+
+def measure(func, filepath: str, repeat: int = 3) -> float:
+    """Return the best wall time of ``repeat`` runs of ``func(filepath)``."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(filepath)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(filepath: str) -> None:
+    rows = len(csv_tokenize(filepath))
+    print(f"{os.path.basename(filepath)}: {rows} rows")
+    for label, func in [
+        ("tokenize (legacy)", legacy_tokenize),
+        ("tokenize (csv)", csv_tokenize),
+        ("parse (legacy)", legacy_parse),
+        ("parse (csv)", file_io.parse_cup_file),
+    ]:
+        elapsed = measure(func, filepath)
+        print(f"  {label:<20} {elapsed:8.3f} s  {rows / elapsed:12,.0f} rows/s")
+
+
+def main(argv):
+    run(SOURCE_CUP)
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in [int(arg) for arg in argv] or [100000]:
+            run(generate_cup(os.path.join(tmp, f"synthetic_{rows}.cup"), rows))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,57 @@
+"""
+Structured query benchmark.
+
+Runs typical selections over synthetic databases twice: planned with the
+indexes (bitmaps, sorted columns, spatial and text index) and as a scan
+testing every row with the same compiled predicates. Results of both are
+compared, and the plan of each query is printed with per-step timings.
+
+Usage:
+    python benchmarks/bench_query.py [rows ...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import synthetic_waypoints  # noqa: E402
+from soaring_cup_file_editor.collection import WaypointCollection  # noqa: E402
+from soaring_cup_file_editor.query import QueryEngine  # noqa: E402
+from soaring_cup_file_editor.store import WaypointStore  # noqa: E402
+
+QUERIES = [
+    "style IN (2, 4, 5) AND country = PL AND WITHIN 40 km OF EPBK AND runway_length >= 600m",
+    "style IN (2, 5) AND runway_length >= 1000m",
+    "elevation > 800m OR style = 19",
+    "WITHIN 10nm OF 50.06, 19.94 AND NOT style = 8",
+    "frequency >= 122.5 AND frequency < 123",
+    "code = EPBA",
+    "name ~ biel",
+    "description ~ \"ul\" AND style = 2",
+]
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [5_000, 100_000]
+    for rows in sizes:
+        collection = WaypointCollection(WaypointStore(synthetic_waypoints(rows)))
+        engine = QueryEngine(collection)
+        start = time.perf_counter()
+        engine.build()
+        print(f"{rows} rows: indexes built in {(time.perf_counter() - start) * 1e3:.0f} ms")
+        print(f"{'planned':>10} {'scan':>10} {'speed-up':>9}  query")
+        for query in QUERIES:
+            planned = engine.run(query)
+            scanned = engine.run(query, use_indexes=False)
+            assert planned.ids == scanned.ids, query
+            print(f"{planned.elapsed * 1e3:7.2f} ms {scanned.elapsed * 1e3:7.1f} ms "
+                  f"{scanned.elapsed / planned.elapsed:8.0f}x  {query}")
+            for step in planned.steps:
+                print(f"{'':>33}{step.description}: {step.rows} rows, {step.elapsed * 1e3:.2f} ms")
+        print()
+
+
+if __name__ == '__main__':
+    main()
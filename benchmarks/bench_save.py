@@ -0,0 +1,98 @@
+"""
+Background save benchmark against the local stub elevation API.
+
+Builds a collection in which some waypoints have no elevation and saves
+it twice: synchronously with write_cup_file(), which is what the GUI used
+to do on the Tk thread, and with BackgroundSave from a store snapshot.
+For the background save it reports the time spent on the calling thread
+(taking the snapshot) and the per-stage timings, then skips the
+elevation stage of a second save to show how quickly it can be
+cancelled. Finally it checks that a write failing halfway leaves the
+previous file untouched.
+
+Usage:
+    python benchmarks/bench_save.py [rows] [missing] [latency_seconds]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_elevation_server import StubElevationServer  # noqa: E402
+from synthetic import synthetic_waypoints  # noqa: E402
+from soaring_cup_file_editor import elevation  # noqa: E402
+from soaring_cup_file_editor.collection import WaypointCollection  # noqa: E402
+from soaring_cup_file_editor.elevation_cache import ElevationCache, set_default_cache  # noqa: E402
+from soaring_cup_file_editor.file_io import atomic_write, write_cup_file  # noqa: E402
+from soaring_cup_file_editor.saver import BackgroundSave  # noqa: E402
+from soaring_cup_file_editor.store import WaypointStore  # noqa: E402
+
+
+def collection_with_missing(rows: int, missing: int):
+    waypoints = list(synthetic_waypoints(rows))
+    step = max(1, rows // missing)
+    for i in range(0, rows, step)[:missing]:
+        waypoints[i].elevation = None
+        # Unique coordinates, so every lookup goes to the API instead of the cache
+        waypoints[i].latitude = round(waypoints[i].latitude + time.time() % 1 * 1e-3, 6)
+    return WaypointCollection(WaypointStore(waypoints))
+
+
+def main(argv):
+    rows = int(argv[0]) if argv else 100_000
+    missing = int(argv[1]) if len(argv) > 1 else 2_000
+    latency = float(argv[2]) if len(argv) > 2 else 0.05
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as cache_dir, \
+            StubElevationServer(latency=latency) as server:
+        elevation.ELEVATION_API_URL = server.url
+        # The stub's elevations are fake: keep them out of the user's cache
+        cache = ElevationCache(os.path.join(cache_dir, 'elevation.sqlite3'))
+        set_default_cache(cache)
+        out = os.path.join(tmp, 'out.cup')
+        print(f"{rows} waypoints, {missing} without elevation, {latency * 1000:.0f} ms simulated latency")
+
+        collection = collection_with_missing(rows, missing)
+        start = time.perf_counter()
+        write_cup_file(out, collection, fetch_elevation=True)
+        print(f"  synchronous save: {time.perf_counter() - start:.2f} s on the calling thread")
+
+        collection = collection_with_missing(rows, missing)
+        start = time.perf_counter()
+        snapshot = collection.store.copy()
+        saver = BackgroundSave(out, snapshot)
+        blocked = time.perf_counter() - start
+        saver.wait()
+        assert saver.error is None and saver.result.rows == rows
+        print(f"  background save:  {blocked * 1000:.0f} ms on the calling thread "
+              f"(snapshot), {saver.timing_summary()}, {len(saver.result.unresolved)} unresolved")
+
+        collection = collection_with_missing(rows, missing)
+        saver = BackgroundSave(out, collection.store.copy())
+        time.sleep(latency)
+        start = time.perf_counter()
+        saver.skip_elevation()
+        saver.wait()
+        print(f"  skipped elevations: written {time.perf_counter() - start:.2f} s after skipping, "
+              f"{len(saver.result.unresolved)} left without elevation")
+
+        with open(out, 'rb') as f:
+            before = f.read()
+        try:
+            with atomic_write(out) as f:
+                f.write("partial")
+                raise RuntimeError("simulated crash")
+        except RuntimeError:
+            pass
+        with open(out, 'rb') as f:
+            assert f.read() == before
+        assert os.listdir(tmp) == ['out.cup']
+        print("  failed write left the previous file intact")
+        set_default_cache(None)
+        cache.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,86 @@
+"""
+Search-as-you-type benchmark.
+
+Loads synthetic databases into a WaypointCollection, builds the text index
+and replays queries one keystroke at a time. Each keystroke is timed from
+the index lookup to the matching row ids in display order (what the table
+needs to show the first screen of results), and compared with a linear
+scan folding every name, code and description. Results of both are
+compared. It also times incremental index updates for edits.
+
+Usage:
+    python benchmarks/bench_search.py [rows ...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import synthetic_waypoints  # noqa: E402
+from soaring_cup_file_editor.collection import WaypointCollection  # noqa: E402
+from soaring_cup_file_editor.search import TextIndex, tokenize  # noqa: E402
+from soaring_cup_file_editor.store import WaypointStore  # noqa: E402
+
+QUERIES = ["Bielska Białej", "zar", "EPBA", "bialystok", "Łódź", "brzeska 5"]
+
+
+def keystrokes(query: str):
+    return [query[:i] for i in range(1, len(query) + 1)]
+
+
+def linear_search(collection, query):
+    terms = tokenize(query)
+    matches = []
+    for row_id in collection.store.row_ids():
+        waypoint = collection.get(row_id)
+        tokens = tokenize(f"{waypoint.name} {waypoint.code} {waypoint.description}")
+        if all(any(token.startswith(term) if len(term) < 3 else term in token for token in tokens)
+               for term in terms):
+            matches.append(row_id)
+    return matches
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [5_000, 100_000]
+    for rows in sizes:
+        collection = WaypointCollection(WaypointStore(synthetic_waypoints(rows)))
+        index = TextIndex()
+        index.attach(collection)
+        start = time.perf_counter()
+        index.search("")
+        print(f"{rows:>8} rows: index built in {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+        worst = 0.0
+        total = count = 0
+        for query in QUERIES:
+            for typed in keystrokes(query):
+                start = time.perf_counter()
+                matches = index.search(typed)
+                shown = collection.in_order(matches) if matches is not None else None
+                elapsed = time.perf_counter() - start
+                worst = max(worst, elapsed)
+                total += elapsed
+                count += 1
+            print(f"{'':>8} {query!r:<18} {len(shown):>6} matches")
+        print(f"{'':>8} keystroke latency: mean {total / count * 1e3:.2f} ms, worst {worst * 1e3:.2f} ms")
+
+        start = time.perf_counter()
+        expected = linear_search(collection, QUERIES[0])
+        scan = time.perf_counter() - start
+        assert sorted(expected) == sorted(index.search(QUERIES[0]))
+        print(f"{'':>8} linear scan for {QUERIES[0]!r}: {scan * 1e3:.0f} ms")
+
+        start = time.perf_counter()
+        edited = [collection.id_at(i) for i in range(0, len(collection), len(collection) // 100)][:100]
+        for row_id in edited:
+            waypoint = collection.get(row_id)
+            waypoint.name = f"{waypoint.name} renamed"
+            collection.update(row_id, waypoint)
+        print(f"{'':>8} edit incl. index update: {(time.perf_counter() - start) * 10:.3f} ms")
+        assert index.search("renamed") == set(edited)
+
+
+if __name__ == '__main__':
+    main()
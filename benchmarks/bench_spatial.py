@@ -0,0 +1,106 @@
+"""
+Spatial index benchmark against brute-force scans.
+
+Builds a SpatialIndex over synthetic points spread like the bundled
+OpenAIP database (jittered copies of its coordinates) and times k-nearest,
+radius and bounding-box queries against a linear scan with the same
+great-circle distance. Results of both are compared for every query.
+
+Usage:
+    python benchmarks/bench_spatial.py [points ...]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import SOURCE_CUP  # noqa: E402
+from soaring_cup_file_editor.file_io import iter_cup_file  # noqa: E402
+from soaring_cup_file_editor.spatial import SpatialIndex, haversine_m  # noqa: E402
+
+K = 10
+RADIUS_M = 20_000
+BOX_DEG = 0.5
+
+
+def synthetic_points(count: int, seed: int = 42):
+    base = [(w.latitude, w.longitude) for w in iter_cup_file(SOURCE_CUP)]
+    rng = random.Random(seed)
+    points = []
+    for i in range(count):
+        lat, lon = base[i % len(base)]
+        if i >= len(base):
+            lat += rng.uniform(-0.5, 0.5)
+            lon += rng.uniform(-0.5, 0.5)
+        points.append((i, lat, lon))
+    return points
+
+
+def brute_nearest(points, lat, lon, k):
+    return sorted((haversine_m(lat, lon, p_lat, p_lon), i) for i, p_lat, p_lon in points)[:k]
+
+
+def brute_radius(points, lat, lon, radius):
+    hits = []
+    for i, p_lat, p_lon in points:
+        distance = haversine_m(lat, lon, p_lat, p_lon)
+        if distance <= radius:
+            hits.append((distance, i))
+    hits.sort()
+    return hits
+
+
+def brute_bbox(points, south, west, north, east):
+    return [i for i, lat, lon in points if south <= lat <= north and west <= lon <= east]
+
+
+def box_around(lat, lon):
+    return lat - BOX_DEG / 2, lon - BOX_DEG / 2, lat + BOX_DEG / 2, lon + BOX_DEG / 2
+
+
+def per_query(func, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        func(*query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 1_000_000]
+    rng = random.Random(7)
+    print(f"{'points':>9} {'query':<16} {'brute force':>12} {'index':>12} {'speed-up':>9}")
+    for count in sizes:
+        points = synthetic_points(count)
+        start = time.perf_counter()
+        index = SpatialIndex.from_points(points)
+        print(f"{count:>9} {'build':<16} {'':>12} {(time.perf_counter() - start) * 1e3:9.1f} ms")
+
+        centres = [(lat, lon) for _, lat, lon in rng.sample(points, 50)]
+        # Brute force is slow at large sizes: time it on fewer queries
+        brute_centres = centres[:max(2, 50 * 10_000 // count)]
+        for lat, lon in brute_centres:
+            assert [i for _, i in index.nearest(lat, lon, K)] == [i for _, i in brute_nearest(points, lat, lon, K)]
+            assert ({i for _, i in index.within_radius(lat, lon, RADIUS_M)} ==
+                    {i for _, i in brute_radius(points, lat, lon, RADIUS_M)})
+            box = box_around(lat, lon)
+            assert sorted(index.within_bbox(*box)) == brute_bbox(points, *box)
+
+        cases = [
+            (f"nearest k={K}", lambda lat, lon: brute_nearest(points, lat, lon, K),
+             lambda lat, lon: index.nearest(lat, lon, K)),
+            (f"radius {RADIUS_M // 1000} km", lambda lat, lon: brute_radius(points, lat, lon, RADIUS_M),
+             lambda lat, lon: index.within_radius(lat, lon, RADIUS_M)),
+            (f"bbox {BOX_DEG} deg", lambda lat, lon: brute_bbox(points, *box_around(lat, lon)),
+             lambda lat, lon: index.within_bbox(*box_around(lat, lon))),
+        ]
+        for label, brute, indexed in cases:
+            slow = per_query(brute, brute_centres)
+            fast = per_query(indexed, centres)
+            print(f"{count:>9} {label:<16} {slow * 1e3:9.2f} ms {fast * 1e3:9.3f} ms {slow / fast:8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Memory benchmark for WaypointStore against a plain list of Waypoints.
+
+Parses the same synthetic CUP file into both containers and reports the
+memory they retain (measured with tracemalloc) and the time to build them.
+
+Usage:
+    python benchmarks/bench_store.py [rows]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_cup  # noqa: E402
+from soaring_cup_file_editor.file_io import iter_cup_file  # noqa: E402
+from soaring_cup_file_editor.store import WaypointStore  # noqa: E402
+
+
+def retained(build, filepath: str):
+    """Return (container length, bytes retained, seconds) for parsing filepath into build()."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    container = build(iter_cup_file(filepath))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    length = len(container)
+    del container
+    return length, size, elapsed
+
+
+def main(argv):
+    rows = int(argv[0]) if argv else 1000000
+    print(f"{rows} synthetic waypoints")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = generate_cup(os.path.join(tmp, 'synthetic.cup'), rows)
+        for label, build in [("list[Waypoint]", list), ("WaypointStore", WaypointStore)]:
+            length, size, elapsed = retained(build, filepath)
+            results[label] = size
+            print(f"  {label:<16} {size / 2**20:9.1f} MiB  {size / length:7.1f} B/row  "
+                  f"build {elapsed:6.2f} s")
+    print(f"  reduction        {results['list[Waypoint]'] / results['WaypointStore']:9.1f}x")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
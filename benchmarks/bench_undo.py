@@ -0,0 +1,91 @@
+"""
+Undo/redo benchmark.
+
+Builds a large collection and measures the undo history against the
+snapshot approach (a copy of all waypoints per step): the memory kept for
+a bulk delete and for single-field edits, and how long undoing and
+redoing them takes. It then fills the history past its memory limit to
+show the oldest steps being dropped, and checks that undoing everything
+gets back the original waypoints.
+
+Usage:
+    python benchmarks/bench_undo.py [rows] [deleted] [edits]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import synthetic_waypoints  # noqa: E402
+from soaring_cup_file_editor.collection import WaypointCollection  # noqa: E402
+from soaring_cup_file_editor.history import UndoHistory  # noqa: E402
+from soaring_cup_file_editor.store import WaypointStore  # noqa: E402
+
+
+def snapshot(collection):
+    return [(w.name, w.latitude, w.longitude, w.description) for w in collection]
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main(argv):
+    rows = int(argv[0]) if argv else 100_000
+    deleted = int(argv[1]) if len(argv) > 1 else 10_000
+    edits = int(argv[2]) if len(argv) > 2 else 1_000
+    collection = WaypointCollection(WaypointStore(synthetic_waypoints(rows)))
+    history = UndoHistory()
+    history.attach(collection)
+    original = snapshot(collection)
+    print(f"{rows} waypoints")
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    copy = collection.store.copy()
+    full_copy = tracemalloc.get_traced_memory()[0] - before
+    del copy
+    tracemalloc.stop()
+    print(f"  snapshot per step (store copy): {full_copy / 1e6:.1f} MB")
+
+    row_ids = [collection.id_at(i) for i in range(0, rows, rows // deleted)][:deleted]
+    with history.group("Delete"):
+        collection.remove(row_ids)
+    print(f"  delete {deleted} rows: {history.memory / 1e3:.0f} kB recorded, "
+          f"undo {timed(history.undo):.0f} ms, redo {timed(history.redo):.0f} ms")
+
+    memory = history.memory
+    for i in range(edits):
+        row_id = collection.id_at(i * (len(collection) // edits))
+        waypoint = collection.get(row_id)
+        waypoint.description = f"edit {i}"
+        collection.update(row_id, waypoint)
+    per_edit = (history.memory - memory) / edits
+    print(f"  {edits} single-field edits: {per_edit:.0f} bytes per step, "
+          f"undo {timed(history.undo) * 1e3:.0f} us")
+    history.redo()
+
+    undone = 0
+    while history.undo():
+        undone += 1
+    assert snapshot(collection) == original
+    print(f"  undid all {undone} steps back to the original waypoints")
+
+    limited = UndoHistory(memory_limit=100_000)
+    limited.attach(collection)
+    for i in range(5_000):
+        row_id = collection.id_at(i % len(collection))
+        waypoint = collection.get(row_id)
+        waypoint.description = f"limited {i}"
+        collection.update(row_id, waypoint)
+    print(f"  5000 edits with a 100 kB limit: {len(limited)} steps kept, "
+          f"{limited.memory / 1e3:.0f} kB")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
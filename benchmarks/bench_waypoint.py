@@ -0,0 +1,57 @@
+"""
+Waypoint construction benchmark on the bundled OpenAIP database.
+
+Times validated construction, trusted construction (from_trusted) and
+copying for every row of ``PL-WPT-National-OpenAIP.cup``, and reports the
+memory retained per Waypoint instance.
+
+Usage:
+    python benchmarks/bench_waypoint.py
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import SOURCE_CUP  # noqa: E402
+from soaring_cup_file_editor.file_io import parse_cup_file  # noqa: E402
+from soaring_cup_file_editor.models import Waypoint  # noqa: E402
+
+
+def best_of(func, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    waypoints = parse_cup_file(SOURCE_CUP)
+    rows = [w.to_dict() for w in waypoints]
+    n = len(rows)
+    print(f"{os.path.basename(SOURCE_CUP)}: {n} waypoints, slots={not hasattr(waypoints[0], '__dict__')}")
+
+    cases = [("validated Waypoint(**row)", lambda: [Waypoint(**row) for row in rows])]
+    if hasattr(Waypoint, 'from_trusted'):
+        cases.append(("Waypoint.from_trusted(**row)", lambda: [Waypoint.from_trusted(**row) for row in rows]))
+        cases.append(("waypoint.copy()", lambda: [w.copy() for w in waypoints]))
+    for label, func in cases:
+        elapsed = best_of(func)
+        print(f"  {label:<30} {elapsed * 1000:8.2f} ms  {n / elapsed:12,.0f} rows/s")
+
+    gc.collect()
+    tracemalloc.start()
+    copies = [Waypoint(**row) for row in rows]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  memory per instance            {size / len(copies):8.1f} B (including list slot)")
+
+
+if __name__ == '__main__':
+    main()
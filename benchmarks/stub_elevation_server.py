@@ -0,0 +1,132 @@
+"""
+Local stand-in for the open-elevation lookup API.
+
+Serves ``GET /api/v1/lookup?locations=lat,lon|lat,lon`` and
+``POST /api/v1/lookup`` with a JSON ``locations`` body, answering with a
+deterministic elevation for each point. Requests and looked-up locations
+are counted so batching behaviour can be checked offline (the
+stub_server fixture in tests/conftest.py wraps it for pytest).
+
+Usage as a fixture:
+    with StubElevationServer(latency=0.05) as server:
+        elevation.ELEVATION_API_URL = server.url
+        ...
+        print(server.request_count, server.location_count)
+
+Usage standalone:
+    python benchmarks/stub_elevation_server.py [port]
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def stub_elevation(lat: float, lon: float) -> float:
+    """Deterministic fake elevation for a coordinate."""
+    return round(abs(lat * 10.0) + abs(lon * 3.0), 1)
+
+
+class _LookupHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the lookup endpoint."""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        locations = []
+        for pair in query.get('locations', [''])[0].split('|'):
+            if pair:
+                lat, lon = pair.split(',')
+                locations.append({'latitude': float(lat), 'longitude': float(lon)})
+        self._answer(locations)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        self._answer(body.get('locations', []))
+
+    def _answer(self, locations):
+        server = self.server.stub
+        with server.lock:
+            server.request_count += 1
+            server.location_count += len(locations)
+            server.batch_sizes.append(len(locations))
+            fail = server.fail_requests > 0
+            if fail:
+                server.fail_requests -= 1
+        if server.latency:
+            time.sleep(server.latency)
+        if fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        results = [
+            dict(loc, elevation=stub_elevation(loc['latitude'], loc['longitude']))
+            for loc in locations
+        ]
+        payload = json.dumps({'results': results}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client gave up (e.g. its timeout expired)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubElevationServer:
+    """
+    Threaded local HTTP server emulating the open-elevation lookup API.
+    
+    Args:
+        port: Port to listen on (0 picks a free port)
+        latency: Artificial delay per request in seconds
+        fail_requests: Number of initial requests to answer with HTTP 503
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0, fail_requests: int = 0):
+        self.latency = latency
+        self.fail_requests = fail_requests
+        self.request_count = 0
+        self.location_count = 0
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', port), _LookupHandler)
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api/v1/lookup"
+
+    def start(self) -> 'StubElevationServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'StubElevationServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    stub = StubElevationServer(port=port)
+    print(f"Stub elevation API listening on {stub.url}")
+    try:
+        stub._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,317 @@
+"""
+Benchmark suite with saved results and a regression check.
+
+Times the hot paths of loading, saving and displaying waypoints on
+synthetic files scaled from the bundled OpenAIP database (see
+synthetic.py):
+
+    parse_cup       parse_cup_file() (with the parse cache disabled)
+    parse_cup_cached  parse_cup_file() of an unchanged file (parse cache hit)
+    parse_csv       parse_csv_file()
+    write_cup       write_cup_file(fetch_elevation=False)
+    write_csv       write_csv_file()
+    waypoint_init   Waypoint construction (validation in __post_init__)
+    coord_convert   ddmm_to_deg() and deg_to_ddmm() for both coordinates
+    table_format    Formatting every row for the waypoint table
+    table_refresh   WaypointTable.refresh() on a withdrawn Tk window
+                    (skipped without a display)
+
+Before timing, a CUP and CSV round trip of waypoints with quotes, commas
+and line breaks in their text fields must give the same waypoints back.
+
+Each case runs ``--repeat`` times and the fastest run is kept. Results
+are saved as JSON (by default benchmarks/results/<commit>.json) so they
+can be compared across commits; with ``--compare`` the run fails (exit
+code 1) if a case got slower than the baseline by more than
+``--threshold``.
+
+Usage:
+    python benchmarks/suite.py [--sizes 10000 100000 1000000] [--cases parse_cup ...]
+                               [--repeat 3] [--output results.json]
+                               [--compare baseline.json] [--threshold 0.10]
+"""
+
+import argparse
+import dataclasses
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import REPO_ROOT, generate_cup  # noqa: E402
+from soaring_cup_file_editor.file_io import (  # noqa: E402
+    parse_csv_file, parse_cup_file, write_csv_file, write_cup_file
+)
+from soaring_cup_file_editor.models import Waypoint  # noqa: E402
+from soaring_cup_file_editor.parse_cache import ParseCache, set_default_parse_cache  # noqa: E402
+from soaring_cup_file_editor.store import WaypointStore  # noqa: E402
+from soaring_cup_file_editor.utils import ddmm_to_deg, deg_to_ddmm  # noqa: E402
+
+DEFAULT_SIZES = (10_000, 100_000)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+class Skip(Exception):
+    """A case that cannot run here (e.g. no display for Tk)."""
+
+
+class Dataset:
+    """Synthetic CUP and CSV files of one size, and their parsed waypoints."""
+
+    def __init__(self, directory: str, rows: int):
+        self.rows = rows
+        self.directory = directory
+        self.cup = generate_cup(os.path.join(directory, f'{rows}.cup'), rows)
+        self.waypoints = parse_cup_file(self.cup)
+        self.csv = os.path.join(directory, f'{rows}.csv')
+        write_csv_file(self.csv, self.waypoints)
+        self.out = os.path.join(directory, 'out')
+
+
+# Cases: take a Dataset, return a function that runs the measured work once
+
+
+def case_parse_cup(data):
+    return lambda: parse_cup_file(data.cup)
+
+
+def case_parse_cup_cached(data):
+    cache = ParseCache(os.path.join(data.directory, 'parse_cache'), min_bytes=0)
+
+    def run():
+        set_default_parse_cache(cache)
+        try:
+            parse_cup_file(data.cup)
+        finally:
+            set_default_parse_cache(None)
+    # Writes the entry
+    run()
+    return run
+
+
+def case_parse_csv(data):
+    return lambda: parse_csv_file(data.csv)
+
+
+def case_write_cup(data):
+    return lambda: write_cup_file(data.out + '.cup', data.waypoints, fetch_elevation=False)
+
+
+def case_write_csv(data):
+    return lambda: write_csv_file(data.out + '.csv', data.waypoints)
+
+
+def case_waypoint_init(data):
+    names = [f.name for f in dataclasses.fields(Waypoint)]
+    values = [{name: getattr(w, name) for name in names} for w in data.waypoints]
+    return lambda: [Waypoint(**kwargs) for kwargs in values]
+
+
+def case_coord_convert(data):
+    coords = [(w.latitude, w.longitude) for w in data.waypoints]
+
+    def run():
+        for lat, lon in coords:
+            ddmm_to_deg(deg_to_ddmm(lat, True))
+            ddmm_to_deg(deg_to_ddmm(lon, False))
+    return run
+
+
+def case_table_format(data):
+    from soaring_cup_file_editor.gui.waypoint_table import format_row
+    store = WaypointStore(data.waypoints)
+    return lambda: [format_row(row) for row in store.rows()]
+
+
+# One withdrawn Tk root for the whole run; each size replaces the previous table
+_tk_root = None
+_tk_table = None
+
+
+def case_table_refresh(data):
+    global _tk_root, _tk_table
+    import tkinter as tk
+    from soaring_cup_file_editor.collection import WaypointCollection
+    from soaring_cup_file_editor.gui.waypoint_table import WaypointTable
+    if _tk_root is None:
+        try:
+            _tk_root = tk.Tk()
+        except tk.TclError as e:
+            raise Skip(f"no display ({e})")
+        _tk_root.withdraw()
+    if _tk_table is not None:
+        _tk_table.destroy()
+    root = _tk_root
+    table = _tk_table = WaypointTable(root)
+    table.pack(fill=tk.BOTH, expand=True)
+    table.set_collection(WaypointCollection(WaypointStore(data.waypoints)))
+
+    def run():
+        table.refresh()
+        root.update_idletasks()
+    return run
+
+
+CASES = {
+    'parse_cup': case_parse_cup,
+    'parse_cup_cached': case_parse_cup_cached,
+    'parse_csv': case_parse_csv,
+    'write_cup': case_write_cup,
+    'write_csv': case_write_csv,
+    'waypoint_init': case_waypoint_init,
+    'coord_convert': case_coord_convert,
+    'table_format': case_table_format,
+    'table_refresh': case_table_refresh,
+}
+
+
+# Text that CUP and CSV writers must quote and escape
+ROUND_TRIP_WAYPOINTS = [
+    Waypoint('Say "hi"', 50.1, 19.2, code='A,B', country='PL', elevation='300.0m',
+             frequency='122,500', description='a "b", c'),
+    Waypoint('"Quoted"', -33.5, -70.25, elevation='1654ft', runway_length='1200m',
+             frequency='Radio "x"', description='line 1\nline 2, "3"'),
+    Waypoint('Comma, Name', 0.0, 0.0, elevation='0.0m', description='""'),
+]
+
+
+def check_round_trip(directory: str) -> list:
+    """
+    Write and re-read ROUND_TRIP_WAYPOINTS twice in both formats.
+
+    Returns:
+        Descriptions of the waypoints that did not survive
+    """
+    failures = []
+    for extension, write, parse in (('cup', lambda path, w: write_cup_file(path, w, fetch_elevation=False),
+                                     parse_cup_file),
+                                    ('csv', write_csv_file, parse_csv_file)):
+        path = os.path.join(directory, f'round_trip.{extension}')
+        waypoints = ROUND_TRIP_WAYPOINTS
+        for _ in range(2):
+            write(path, waypoints)
+            waypoints = parse(path)
+        if waypoints != ROUND_TRIP_WAYPOINTS:
+            failures.append(f"{extension}: {waypoints!r}")
+    return failures
+
+
+def close_tk() -> None:
+    """Destroy the Tk root of table_refresh, if it was created."""
+    global _tk_root, _tk_table
+    if _tk_root is not None:
+        _tk_root.destroy()
+    _tk_root = _tk_table = None
+
+
+def measure(run, repeat: int) -> float:
+    """Fastest of ``repeat`` runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compare results with a baseline run.
+
+    Returns:
+        Keys of the cases that are slower than the baseline by more than threshold
+    """
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit', '?')} (threshold {threshold:.0%}):")
+    for key, result in results.items():
+        before = baseline.get('results', {}).get(key)
+        if not before or 'seconds' not in before or 'seconds' not in result:
+            continue
+        change = result['seconds'] / before['seconds'] - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(key)
+        print(f"  {key:28} {before['seconds']:9.4f} s -> {result['seconds']:9.4f} s  {change:+7.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Rows per dataset")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case (the fastest is kept)")
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', metavar='BASELINE', help="Results file of an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Allowed slow-down against the baseline (default: 0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    # Cases measure parsing, except parse_cup_cached which sets its own cache
+    set_default_parse_cache(None)
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        failures = check_round_trip(tmp)
+        if failures:
+            print("Round trip changed waypoints:\n  " + "\n  ".join(failures))
+            return 1
+        for rows in args.sizes:
+            print(f"{rows} rows")
+            data = Dataset(tmp, rows)
+            for name in args.cases:
+                key = f"{name}/{rows}"
+                try:
+                    seconds = measure(CASES[name](data), args.repeat)
+                except Skip as e:
+                    report['results'][key] = {'skipped': str(e)}
+                    print(f"  {name:16} skipped: {e}")
+                    continue
+                report['results'][key] = {'seconds': round(seconds, 6), 'rows_per_second': round(rows / seconds)}
+                print(f"  {name:16} {seconds:9.4f} s  {rows / seconds:12,.0f} rows/s")
+            del data
+    close_tk()
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report['results'], baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
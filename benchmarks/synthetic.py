@@ -0,0 +1,81 @@
+"""
+Synthetic waypoint data for benchmarks.
+
+Scales the bundled ``PL-WPT-National-OpenAIP.cup`` database to an arbitrary
+number of rows by repeating its records with jittered coordinates and
+numbered names, so large-file behaviour can be measured without shipping
+large files.
+
+Usage:
+    python benchmarks/synthetic.py 100000 output.cup
+"""
+
+import os
+import random
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'src'))
+
+from soaring_cup_file_editor.file_io import parse_cup_file, write_cup_file  # noqa: E402
+from soaring_cup_file_editor.models import Waypoint  # noqa: E402
+
+SOURCE_CUP = os.path.join(REPO_ROOT, 'PL-WPT-National-OpenAIP.cup')
+
+
+def synthetic_waypoints(rows: int, seed: int = 42):
+    """
+    Yield ``rows`` waypoints derived from the bundled OpenAIP database.
+    
+    Args:
+        rows: Number of waypoints to generate
+        seed: Random seed for coordinate jitter
+        
+    Yields:
+        Waypoint objects
+    """
+    rng = random.Random(seed)
+    base = parse_cup_file(SOURCE_CUP)
+    for i in range(rows):
+        src = base[i % len(base)]
+        copy_num = i // len(base)
+        if copy_num == 0:
+            yield src
+            continue
+        yield Waypoint(
+            name=f"{src.name} {copy_num}",
+            latitude=max(-90.0, min(90.0, src.latitude + rng.uniform(-0.5, 0.5))),
+            longitude=max(-180.0, min(180.0, src.longitude + rng.uniform(-0.5, 0.5))),
+            code=src.code,
+            country=src.country,
+            elevation=src.elevation,
+            style=src.style,
+            runway_direction=src.runway_direction,
+            runway_length=src.runway_length,
+            runway_width=src.runway_width,
+            frequency=src.frequency,
+            description=src.description
+        )
+
+
+def generate_cup(filepath: str, rows: int, seed: int = 42) -> str:
+    """
+    Write a synthetic CUP file with ``rows`` waypoints.
+    
+    Args:
+        filepath: Path of the CUP file to create
+        rows: Number of waypoints to write
+        seed: Random seed for coordinate jitter
+        
+    Returns:
+        The path that was written
+    """
+    write_cup_file(filepath, list(synthetic_waypoints(rows, seed)), fetch_elevation=False)
+    return filepath
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    generate_cup(sys.argv[2], int(sys.argv[1]))
@@ -36,6 +36,7 @@ setup(
     entry_points={
         "console_scripts": [
             "soaring-cup-editor=soaring_cup_file_editor.__main__:main",
+            "soaring-cup=soaring_cup_file_editor.cli:main",
         ],
     },
 )
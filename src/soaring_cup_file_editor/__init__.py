@@ -3,9 +3,35 @@
 __version__ = "3.0.0"
 __author__ = "Soaring CUP Editor Team"
 
-from .models import Waypoint
-from .file_io import parse_cup_file, write_cup_file, parse_csv_file, write_csv_file
-from .utils import ddmm_to_deg, deg_to_ddmm
+from . import startup
+
+# Started before anything else is imported, so the report covers the
+# entry points' own imports
+if startup.requested():
+    startup.start()
+
+# The public API is loaded on first use (PEP 562): the GUI, the command
+# line and helpers such as perf only import the modules they need
+_LAZY = {
+    'Waypoint': '.models',
+    'parse_cup_file': '.file_io',
+    'write_cup_file': '.file_io',
+    'parse_csv_file': '.file_io',
+    'write_csv_file': '.file_io',
+    'iter_cup_file': '.file_io',
+    'iter_csv_file': '.file_io',
+    'RowError': '.file_io',
+    'find_duplicates': '.dedupe',
+    'merge_duplicates': '.dedupe',
+    'QueryEngine': '.query',
+    'QueryError': '.query',
+    'Field': '.query',
+    'within': '.query',
+    'parse_query': '.query',
+    'run_query': '.query',
+    'ddmm_to_deg': '.utils',
+    'deg_to_ddmm': '.utils',
+}
 
 __all__ = [
     'Waypoint',
@@ -13,6 +39,30 @@ __all__ = [
     'write_cup_file',
     'parse_csv_file',
     'write_csv_file',
+    'iter_cup_file',
+    'iter_csv_file',
+    'RowError',
+    'find_duplicates',
+    'merge_duplicates',
+    'QueryEngine',
+    'QueryError',
+    'Field',
+    'within',
+    'parse_query',
+    'run_query',
     'ddmm_to_deg',
     'deg_to_ddmm',
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        from importlib import import_module
+        value = getattr(import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,13 +1,17 @@
 """Main entry point for Soaring CUP File Editor."""
 
 import tkinter as tk
+from soaring_cup_file_editor import perf, startup
 from soaring_cup_file_editor.gui import MainWindow
 
 
 def main():
     """Launch the Soaring CUP File Editor application."""
+    perf.enable_from_env()
     root = tk.Tk()
     app = MainWindow(root)
+    if startup.requested():
+        root.after_idle(startup.finish, "main window shown")
     root.mainloop()
 
 
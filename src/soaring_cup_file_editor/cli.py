@@ -0,0 +1,455 @@
+"""
+Command-line interface for batch processing of CUP and CSV files.
+
+Usage examples:
+    soaring-cup convert club.cup --to csv
+    soaring-cup merge club.cup openaip.cup -o all.cup --dedupe
+    soaring-cup filter *.cup -d out --query "style IN (2,4,5) AND WITHIN 100km OF EPBK"
+    soaring-cup dedupe pilots/*.cup --in-place
+    soaring-cup fill-elevation pilots/*.cup -d out --report report.json
+
+Files are processed in parallel on a process pool. A summary is printed
+to stderr (and a JSON report written with ``--report``); the exit code
+tells cron jobs whether everything was processed (see EXIT_*).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import __version__, perf, startup
+from .config import (
+    CLI_MAX_WORKERS, CLI_REPORTED_ROW_ERRORS, DEDUPE_MIN_SCORE, DEDUPE_RADIUS_M,
+    ELEVATION_BATCH_SIZE, ELEVATION_TIME_BUDGET
+)
+from .dedupe import merge_duplicates
+from .elevation import resolve_elevations
+from .file_io import RowError, iter_csv_file, iter_cup_file, write_csv_file, write_cup_file
+from .models import Waypoint
+from .query import QueryError, parse_query, run_query
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1  # At least one file could not be processed
+EXIT_USAGE = 2  # Invalid arguments (as used by argparse)
+EXIT_INCOMPLETE = 3  # Everything written, but invalid rows were skipped or elevations are missing
+
+Coord = Tuple[float, float]
+
+
+class _UsageError(Exception):
+    """Invalid combination of arguments."""
+
+
+@dataclass
+class FileReport:
+    """Outcome of processing one input file."""
+    
+    input: str
+    output: Optional[str] = None
+    rows_in: int = 0
+    rows_out: int = 0
+    row_errors: int = 0
+    unresolved: int = 0
+    seconds: float = 0.0
+    # First CLI_REPORTED_ROW_ERRORS invalid rows, e.g. "line 12: could not convert string to float"
+    errors: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    
+    @property
+    def exit_code(self) -> int:
+        if self.error is not None:
+            return EXIT_FAILED
+        if self.row_errors or self.unresolved:
+            return EXIT_INCOMPLETE
+        return EXIT_OK
+
+
+def file_format(filepath: str) -> str:
+    """'csv' for .csv files, otherwise 'cup'."""
+    return 'csv' if filepath.lower().endswith('.csv') else 'cup'
+
+
+# Reading and writing
+
+
+def _read(report: FileReport) -> Iterator[Waypoint]:
+    """Stream the waypoints of report.input, counting rows and invalid rows."""
+    reader = iter_csv_file if file_format(report.input) == 'csv' else iter_cup_file
+    try:
+        for item in reader(report.input, yield_errors=True):
+            if isinstance(item, RowError):
+                report.row_errors += 1
+                if len(report.errors) < CLI_REPORTED_ROW_ERRORS:
+                    report.errors.append(f"line {item.line_num}: {item.error}")
+                continue
+            report.rows_in += 1
+            yield item
+    except Exception as e:
+        report.error = f"{type(e).__name__}: {e}"
+        raise
+
+
+def _write(filepath: str, waypoints: Iterable[Waypoint]) -> int:
+    """Write waypoints in the format given by the file extension; returns the row count."""
+    count = 0
+    
+    def counted():
+        nonlocal count
+        for waypoint in waypoints:
+            count += 1
+            yield waypoint
+    
+    if file_format(filepath) == 'csv':
+        write_csv_file(filepath, counted())
+    else:
+        # Missing elevations stay empty; fill-elevation looks them up
+        write_cup_file(filepath, counted(), elevations={})
+    return count
+
+
+def _with_elevations(waypoints: Iterable[Waypoint], elevations: Dict[Coord, float],
+                     report: FileReport) -> Iterator[Waypoint]:
+    """Fill in missing elevations from resolved ones, counting those still missing."""
+    for waypoint in waypoints:
+        if waypoint.elevation is None or waypoint.elevation == "":
+            elevation = elevations.get((waypoint.latitude, waypoint.longitude))
+            if elevation is None:
+                report.unresolved += 1
+            else:
+                waypoint.elevation = f"{elevation:.1f}m"
+        yield waypoint
+
+
+# Tasks, run in worker processes
+
+
+def _run_task(task: Callable, source: str, target: Optional[str], *args):
+    """
+    Run one task on one file, catching its errors into the report.
+    
+    Library messages are redirected to stderr, so stdout only carries the
+    JSON report when ``--report -`` is used.
+    
+    Returns:
+        Tuple of (FileReport, the task's return value or None)
+    """
+    report = FileReport(source, target)
+    start = time.monotonic()
+    value = None
+    try:
+        with redirect_stdout(sys.stderr):
+            value = task(report, *args)
+    except Exception as e:
+        if report.error is None:
+            report.error = f"{type(e).__name__}: {e}"
+    report.seconds = round(time.monotonic() - start, 3)
+    return report, value
+
+
+def _convert(report: FileReport) -> None:
+    report.rows_out = _write(report.output, _read(report))
+
+
+def _filter(report: FileReport, query: str) -> None:
+    # Queries need the whole file (indexes, WITHIN ... OF a waypoint by name)
+    report.rows_out = _write(report.output, run_query(list(_read(report)), query))
+
+
+def _dedupe(report: FileReport, radius_m: float, min_score: float) -> None:
+    report.rows_out = _write(report.output, merge_duplicates(list(_read(report)), radius_m, min_score))
+
+
+def _load(report: FileReport) -> List[Waypoint]:
+    return list(_read(report))
+
+
+def _scan_missing(report: FileReport) -> List[Coord]:
+    missing = ((w.latitude, w.longitude) for w in _read(report)
+               if w.elevation is None or w.elevation == "")
+    return list(dict.fromkeys(missing))
+
+
+def _fill(report: FileReport, elevations: Dict[Coord, float]) -> None:
+    report.rows_out = _write(report.output, _with_elevations(_read(report), elevations, report))
+
+
+def _run_all(calls: Sequence[tuple], jobs: Optional[int], quiet: bool) -> List[tuple]:
+    """
+    Run _run_task() calls, in parallel on a process pool if there are several.
+    
+    Args:
+        calls: Argument tuples for _run_task()
+        jobs: Maximum number of processes (None: one per CPU)
+        quiet: Do not print a line per finished file
+    
+    Returns:
+        (FileReport, value) tuples in the order of calls
+    """
+    if len(calls) <= 1 or jobs == 1:
+        results = []
+        for call in calls:
+            results.append(_run_task(*call))
+            _print_file(results[-1][0], quiet)
+        return results
+    # Imported here: multiprocessing is not needed for a single file
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_run_task, *call) for call in calls]
+        results = []
+        for future in futures:
+            results.append(future.result())
+            _print_file(results[-1][0], quiet)
+        return results
+
+
+# Commands
+
+
+def _print_file(report: FileReport, quiet: bool) -> None:
+    if report.error is not None:
+        print(f"FAILED {report.input}: {report.error}", file=sys.stderr)
+    elif not quiet:
+        target = f" -> {report.output}" if report.output else ""
+        notes = ""
+        if report.row_errors:
+            notes += f", {report.row_errors} invalid rows skipped"
+        if report.unresolved:
+            notes += f", {report.unresolved} without elevation"
+        print(f"{report.input}{target}: {report.rows_in} rows read, {report.rows_out} written "
+              f"in {report.seconds:.2f} s{notes}", file=sys.stderr)
+
+
+def _targets(args: argparse.Namespace, extensions: Optional[List[str]] = None) -> List[str]:
+    """
+    Output file of each input (see the -o, -d and --in-place options).
+    
+    Args:
+        args: Parsed arguments
+        extensions: New extension of each output file, or None to keep the input's
+    
+    Returns:
+        Output paths in the order of args.inputs
+    """
+    if args.output:
+        if len(args.inputs) > 1:
+            raise _UsageError("-o/--output needs a single input file; use -d/--out-dir for several")
+        return [args.output]
+    targets = []
+    for i, source in enumerate(args.inputs):
+        name = os.path.basename(source)
+        if extensions is not None:
+            name = os.path.splitext(name)[0] + extensions[i]
+        directory = args.out_dir if args.out_dir else os.path.dirname(source)
+        targets.append(os.path.join(directory, name))
+    for source, target in zip(args.inputs, targets):
+        if os.path.abspath(source) == os.path.abspath(target) and not getattr(args, 'in_place', False):
+            raise _UsageError(f"{source} would be overwritten; pass -d/--out-dir, -o/--output or --in-place")
+    if len(set(map(os.path.abspath, targets))) < len(targets):
+        raise _UsageError("Several inputs would be written to the same output file")
+    return targets
+
+
+def _cmd_convert(args: argparse.Namespace) -> List[FileReport]:
+    extensions = ['.' + (args.to or ('cup' if file_format(source) == 'csv' else 'csv'))
+                  for source in args.inputs]
+    calls = [(_convert, source, target) for source, target in zip(args.inputs, _targets(args, extensions))]
+    return [report for report, _ in _run_all(calls, args.jobs, args.quiet)]
+
+
+def _cmd_filter(args: argparse.Namespace) -> List[FileReport]:
+    try:
+        parse_query(args.query)
+    except QueryError as e:
+        raise _UsageError(f"Invalid query: {e}")
+    calls = [(_filter, source, target, args.query) for source, target in zip(args.inputs, _targets(args))]
+    return [report for report, _ in _run_all(calls, args.jobs, args.quiet)]
+
+
+def _cmd_dedupe(args: argparse.Namespace) -> List[FileReport]:
+    calls = [(_dedupe, source, target, args.radius, args.min_score)
+             for source, target in zip(args.inputs, _targets(args))]
+    return [report for report, _ in _run_all(calls, args.jobs, args.quiet)]
+
+
+def _cmd_merge(args: argparse.Namespace) -> List[FileReport]:
+    target = args.output
+    reports = [FileReport(source, target) for source in args.inputs]
+    start = time.monotonic()
+    if args.dedupe:
+        # Parse in parallel, then merge duplicates across all files
+        results = _run_all([(_load, source, None) for source in args.inputs], args.jobs, quiet=True)
+        reports = [report for report, _ in results]
+        if any(report.error for report in reports):
+            return reports
+        waypoints = [waypoint for _, loaded in results for waypoint in loaded]
+        waypoints = merge_duplicates(waypoints, args.radius, args.min_score)
+    else:
+        # Streamed straight into the output, one input after the other
+        waypoints = (waypoint for report in reports for waypoint in _read(report))
+    try:
+        with redirect_stdout(sys.stderr):
+            rows_out = _write(target, waypoints)
+    except Exception as e:
+        # The output is left untouched if any input fails
+        failed = next((report for report in reports if report.error), reports[-1])
+        failed.error = failed.error or f"{type(e).__name__}: {e}"
+        _print_file(failed, args.quiet)
+        return reports
+    for report in reports:
+        report.output = target
+    # The output's rows are counted once, with the last input
+    reports[-1].rows_out = rows_out
+    if not args.quiet:
+        row_errors = sum(report.row_errors for report in reports)
+        notes = f", {row_errors} invalid rows skipped" if row_errors else ""
+        print(f"{len(reports)} file(s) -> {target}: {sum(report.rows_in for report in reports)} rows read, "
+              f"{rows_out} written in {time.monotonic() - start:.2f} s{notes}", file=sys.stderr)
+    return reports
+
+
+def _cmd_fill_elevation(args: argparse.Namespace) -> List[FileReport]:
+    targets = _targets(args)
+    # Look up each coordinate once across all files, then write the files
+    scans = _run_all([(_scan_missing, source, target) for source, target in zip(args.inputs, targets)],
+                     args.jobs, quiet=True)
+    coords = list(dict.fromkeys(coord for report, missing in scans if not report.error for coord in missing))
+    elevations: Dict[Coord, float] = {}
+    if coords:
+        if not args.quiet:
+            print(f"Looking up {len(coords)} elevations", file=sys.stderr)
+        with redirect_stdout(sys.stderr):
+            result = resolve_elevations(coords, args.batch_size, time_budget=args.time_budget)
+        elevations = result.elevations
+    calls = [(_fill, report.input, report.output, {coord: elevations[coord] for coord in missing
+                                                   if coord in elevations})
+             for report, missing in scans if not report.error]
+    done = {report.input: report for report, _ in _run_all(calls, args.jobs, args.quiet)}
+    return [done.get(report.input, report) for report, _ in scans]
+
+
+# Argument parsing
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the ``soaring-cup`` argument parser."""
+    parser = argparse.ArgumentParser(
+        prog='soaring-cup',
+        description="Convert, merge, filter and deduplicate CUP/CSV waypoint files in batch."
+    )
+    parser.add_argument('--version', action='version', version=f"%(prog)s {__version__}")
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('inputs', nargs='+', metavar='FILE', help="CUP or CSV files (format by extension)")
+    common.add_argument('-j', '--jobs', type=int, default=CLI_MAX_WORKERS,
+                        help="Worker processes (default: one per CPU)")
+    common.add_argument('--report', metavar='PATH', help="Write a JSON report to PATH ('-' for stdout)")
+    common.add_argument('-q', '--quiet', action='store_true', help="Only print failures")
+    common.add_argument(startup.FLAG, action='store_true',
+                        help="Print the import times of this command's startup to stderr")
+    
+    outputs = argparse.ArgumentParser(add_help=False)
+    outputs.add_argument('-o', '--output', help="Output file (single input only)")
+    outputs.add_argument('-d', '--out-dir', help="Directory for the output files (same names)")
+    
+    in_place = argparse.ArgumentParser(add_help=False)
+    in_place.add_argument('--in-place', action='store_true', help="Overwrite the input files")
+    
+    dedupe = argparse.ArgumentParser(add_help=False)
+    dedupe.add_argument('--radius', type=float, default=DEDUPE_RADIUS_M,
+                        help=f"Farthest apart two duplicates can be, in metres (default: {DEDUPE_RADIUS_M})")
+    dedupe.add_argument('--min-score', type=float, default=DEDUPE_MIN_SCORE,
+                        help=f"Minimum duplicate score 0..1 (default: {DEDUPE_MIN_SCORE})")
+    
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    commands.required = True
+    
+    command = commands.add_parser('convert', parents=[common, outputs], help="Convert between CUP and CSV")
+    command.add_argument('--to', choices=('cup', 'csv'),
+                         help="Output format (default: CSV for CUP input and vice versa; "
+                              "with -o, its extension)")
+    command.set_defaults(run=_cmd_convert)
+    
+    command = commands.add_parser('merge', parents=[common, dedupe], help="Merge files into one")
+    command.add_argument('-o', '--output', required=True, help="Merged output file")
+    command.add_argument('--dedupe', action='store_true', help="Merge duplicates across the files")
+    command.set_defaults(run=_cmd_merge)
+    
+    command = commands.add_parser('filter', parents=[common, outputs, in_place],
+                                  help="Keep the waypoints matching a query")
+    command.add_argument('--query', required=True,
+                         help="Query, e.g. \"style IN (2,4,5) AND WITHIN 40km OF EPBK\"")
+    command.set_defaults(run=_cmd_filter)
+    
+    command = commands.add_parser('dedupe', parents=[common, outputs, in_place, dedupe],
+                                  help="Merge duplicates within each file")
+    command.set_defaults(run=_cmd_dedupe)
+    
+    command = commands.add_parser('fill-elevation', parents=[common, outputs, in_place],
+                                  help="Look up missing elevations")
+    command.add_argument('--time-budget', type=float, default=ELEVATION_TIME_BUDGET,
+                         help=f"Maximum seconds spent on lookups (default: {ELEVATION_TIME_BUDGET})")
+    command.add_argument('--batch-size', type=int, default=ELEVATION_BATCH_SIZE,
+                         help=f"Locations per lookup request (default: {ELEVATION_BATCH_SIZE})")
+    command.set_defaults(run=_cmd_fill_elevation)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Run the ``soaring-cup`` command.
+    
+    Args:
+        argv: Arguments without the program name (default: sys.argv[1:])
+    
+    Returns:
+        Exit code: EXIT_OK, EXIT_FAILED, EXIT_USAGE or EXIT_INCOMPLETE
+    """
+    perf.enable_from_env()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.startup_profile:
+        startup.finish(f"{args.command} started")
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("-j/--jobs must be at least 1")
+    
+    start = time.monotonic()
+    try:
+        if getattr(args, 'out_dir', None):
+            os.makedirs(args.out_dir, exist_ok=True)
+        reports = args.run(args)
+    except _UsageError as e:
+        print(f"{parser.prog} {args.command}: error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    
+    codes = {report.exit_code for report in reports}
+    exit_code = EXIT_FAILED if EXIT_FAILED in codes else max(codes, default=EXIT_OK)
+    summary = {
+        'command': args.command,
+        'exit_code': exit_code,
+        'seconds': round(time.monotonic() - start, 3),
+        'files': len(reports),
+        'failed': sum(1 for report in reports if report.error is not None),
+        'rows_in': sum(report.rows_in for report in reports),
+        'rows_out': sum(report.rows_out for report in reports),
+        'reports': [asdict(report) for report in reports],
+    }
+    if not args.quiet or exit_code == EXIT_FAILED:
+        print(f"{summary['files']} file(s), {summary['failed']} failed, {summary['rows_in']} rows read, "
+              f"{summary['rows_out']} written in {summary['seconds']:.2f} s", file=sys.stderr)
+    if args.report == '-':
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    elif args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""Observable, sorted waypoint collection."""
+
+import math
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import AbstractSet, Any, Callable, Iterable, Iterator, List, Optional, Sequence as SequenceType, Tuple, Union
+
+from .config import BULK_CHANGE_ROWS
+from .models import Waypoint
+from .store import WaypointRow, WaypointStore
+from .utils import fold_text
+
+# Event kinds
+INSERT = 'insert'
+UPDATE = 'update'
+DELETE = 'delete'
+MOVE = 'move'
+RESET = 'reset'
+
+
+@dataclass
+class CollectionEvent:
+    """
+    Change notification sent to collection listeners.
+    
+    Positions refer to the order after the change, except that ``index``
+    of a DELETE and ``old_index`` of a MOVE are positions before it.
+    RESET means the whole collection changed (new file, bulk import, re-sort)
+    and carries no row. A RESET caused by extend(), restore() or a bulk
+    remove() lists the rows in ``added`` or ``removed``. An UPDATE carries
+    the waypoint as it was before in ``previous``.
+    """
+    kind: str
+    row_id: Optional[int] = None
+    index: Optional[int] = None
+    old_index: Optional[int] = None
+    added: Optional[SequenceType[int]] = None
+    removed: Optional[AbstractSet[int]] = None
+    previous: Optional[Waypoint] = None
+
+
+Listener = Callable[[CollectionEvent], None]
+
+
+def name_sort_key(waypoint: Union[Waypoint, WaypointRow]) -> Any:
+    """Default sort key: the waypoint name, ignoring case and diacritics."""
+    return fold_text(waypoint.name)
+
+
+class WaypointCollection(Sequence):
+    """
+    Waypoints kept sorted in a WaypointStore, notifying listeners of changes.
+    
+    The sort key of every row is cached next to the store order, so adding
+    a waypoint or changing its key is a binary search plus one list insert
+    instead of a full re-sort. Rows with equal keys stay in the order they
+    were added (the row id breaks ties).
+    
+    Listeners (e.g. the waypoint table) receive one CollectionEvent per
+    changed row and can update themselves incrementally.
+    
+    Read access works like a sequence of Waypoints; changes go through
+    add(), extend(), update(), remove(), restore() and reset().
+    """
+    
+    def __init__(self, store: Optional[WaypointStore] = None,
+                 key: Callable[[Union[Waypoint, WaypointRow]], Any] = name_sort_key):
+        """
+        Create a collection.
+        
+        Args:
+            store: Initial waypoints (sorted on creation)
+            key: Sort key function, called with a Waypoint or WaypointRow
+        """
+        self._listeners: List[Listener] = []
+        self._sort_key = key
+        self.store = WaypointStore()
+        self._keys: List[Tuple[Any, int]] = []
+        self.reset(store)
+    
+    # Listeners
+    
+    def subscribe(self, listener: Listener) -> None:
+        """Register a function called with every CollectionEvent."""
+        self._listeners.append(listener)
+    
+    def unsubscribe(self, listener: Listener) -> None:
+        """Remove a listener registered with subscribe()."""
+        self._listeners.remove(listener)
+    
+    def _emit(self, kind: str, row_id: Optional[int] = None, index: Optional[int] = None,
+              old_index: Optional[int] = None, added: Optional[SequenceType[int]] = None,
+              removed: Optional[AbstractSet[int]] = None, previous: Optional[Waypoint] = None) -> None:
+        event = CollectionEvent(kind, row_id, index, old_index, added, removed, previous)
+        for listener in list(self._listeners):
+            listener(event)
+    
+    # Sorting
+    
+    def _key_of(self, row_id: int) -> Tuple[Any, int]:
+        return (self._sort_key(WaypointRow(self.store, row_id)), row_id)
+    
+    def _resort(self) -> None:
+        keys = [self._key_of(row_id) for row_id in self.store.row_ids()]
+        keys.sort()
+        self.store.reorder(row_id for _, row_id in keys)
+        self._keys = keys
+    
+    def set_sort_key(self, key: Callable[[Union[Waypoint, WaypointRow]], Any]) -> None:
+        """
+        Sort by a different key.
+        
+        Args:
+            key: Sort key function, called with a Waypoint or WaypointRow
+        """
+        self._sort_key = key
+        self._resort()
+        self._emit(RESET)
+    
+    def index_of(self, row_id: int) -> int:
+        """
+        Get the current position of a row.
+        
+        Args:
+            row_id: Row id of a waypoint in the collection
+        
+        Returns:
+            Position in sort order
+        """
+        if not self.store.contains_id(row_id):
+            raise KeyError(row_id)
+        return bisect_left(self._keys, self._key_of(row_id))
+    
+    # Changes
+    
+    def reset(self, store: Optional[WaypointStore] = None) -> None:
+        """
+        Replace all waypoints.
+        
+        Args:
+            store: New waypoints (default: empty)
+        """
+        self.store = store if store is not None else WaypointStore()
+        self._resort()
+        self._emit(RESET)
+    
+    def add(self, waypoint: Waypoint) -> int:
+        """
+        Insert a waypoint at its sorted position.
+        
+        Args:
+            waypoint: Waypoint to add
+        
+        Returns:
+            Row id of the new waypoint
+        """
+        # New row ids are larger than all existing ones: go after equal keys
+        key = self._sort_key(waypoint)
+        index = bisect_right(self._keys, (key, math.inf))
+        row_id = self.store.add(waypoint, index)
+        self._keys.insert(index, (key, row_id))
+        self._emit(INSERT, row_id, index)
+        return row_id
+    
+    def extend(self, waypoints: Iterable[Waypoint]) -> int:
+        """
+        Add many waypoints at once (e.g. an import or a loaded chunk).
+        
+        Only the new rows' keys are computed; they are sorted and merged
+        with the existing keys in linear time. Listeners get a single
+        RESET event.
+        
+        Args:
+            waypoints: Waypoints to add
+        
+        Returns:
+            Number of waypoints added
+        """
+        first = self.store.next_row_id
+        self.store.extend(waypoints)
+        added = range(first, self.store.next_row_id)
+        if added:
+            self._merge_keys(added)
+            self._emit(RESET, added=added)
+        return len(added)
+    
+    def _merge_keys(self, row_ids: Iterable[int]) -> None:
+        """Put rows appended to the store order at their sorted positions."""
+        new_keys = sorted(self._key_of(row_id) for row_id in row_ids)
+        # Two sorted runs: list.sort() merges them without comparing everything
+        keys = self._keys + new_keys
+        keys.sort()
+        self.store.reorder(row_id for _, row_id in keys)
+        self._keys = keys
+    
+    def restore(self, row_ids: Iterable[int]) -> None:
+        """
+        Bring back removed waypoints (e.g. to undo a removal).
+        
+        Removed rows keep their data and row ids in the store, so nothing is
+        copied. Listeners get one INSERT event per row, or a single RESET
+        for more than BULK_CHANGE_ROWS rows.
+        
+        Args:
+            row_ids: Row ids of removed waypoints
+        """
+        row_ids = sorted(set(row_ids))
+        if len(row_ids) > BULK_CHANGE_ROWS:
+            self.store.restore_ids(row_ids)
+            self._merge_keys(row_ids)
+            self._emit(RESET, added=row_ids)
+            return
+        for row_id in row_ids:
+            key = self._key_of(row_id)
+            index = bisect_left(self._keys, key)
+            self.store.restore(row_id, index)
+            self._keys.insert(index, key)
+            self._emit(INSERT, row_id, index)
+    
+    def update(self, row_id: int, waypoint: Waypoint) -> None:
+        """
+        Replace a waypoint, moving it if its sort key changed.
+        
+        Args:
+            row_id: Row id of the waypoint to replace
+            waypoint: New waypoint data
+        """
+        old_index = self.index_of(row_id)
+        previous = self.store.get(row_id)
+        self.store.replace(row_id, waypoint)
+        key = self._key_of(row_id)
+        if key == self._keys[old_index]:
+            self._emit(UPDATE, row_id, old_index, previous=previous)
+            return
+        
+        del self._keys[old_index]
+        index = bisect_left(self._keys, key)
+        self._keys.insert(index, key)
+        if index != old_index:
+            self.store.move(old_index, index)
+            self._emit(MOVE, row_id, index, old_index)
+        self._emit(UPDATE, row_id, index, previous=previous)
+    
+    def remove(self, row_ids: Iterable[int]) -> None:
+        """
+        Remove waypoints.
+        
+        Listeners get one DELETE event per row, or a single RESET for more
+        than BULK_CHANGE_ROWS rows.
+        
+        Args:
+            row_ids: Row ids of the waypoints to remove
+        """
+        row_ids = set(row_ids)
+        if len(row_ids) > BULK_CHANGE_ROWS:
+            for row_id in row_ids:
+                if not self.store.contains_id(row_id):
+                    raise KeyError(row_id)
+            self.store.remove_ids(row_ids)
+            self._keys = [key for key in self._keys if key[1] not in row_ids]
+            self._emit(RESET, removed=row_ids)
+            return
+        indices = sorted({self.index_of(row_id) for row_id in row_ids}, reverse=True)
+        for index in indices:
+            row_id = self._keys.pop(index)[1]
+            del self.store[index]
+            self._emit(DELETE, row_id, index)
+    
+    # Read access
+    
+    def id_at(self, index: int) -> int:
+        """Get the row id at a position."""
+        return self.store.id_at(index)
+    
+    def get(self, row_id: int) -> Waypoint:
+        """Materialize the waypoint stored under a row id."""
+        return self.store.get(row_id)
+    
+    def contains_id(self, row_id: int) -> bool:
+        """Check whether a row id refers to a waypoint in the collection."""
+        return self.store.contains_id(row_id)
+    
+    def in_order(self, row_ids: Iterable[int]) -> List[int]:
+        """
+        Put row ids in collection order, dropping unknown ones.
+        
+        Few ids are placed by binary search; many by one pass over the order.
+        
+        Args:
+            row_ids: Row ids, e.g. search results
+        
+        Returns:
+            The row ids in sort order
+        """
+        wanted = row_ids if isinstance(row_ids, (set, frozenset)) else set(row_ids)
+        if len(wanted) * 100 < len(self.store):
+            return sorted((row_id for row_id in wanted if self.store.contains_id(row_id)), key=self.index_of)
+        return [row_id for row_id in self.store.row_ids() if row_id in wanted]
+    
+    def __len__(self) -> int:
+        return len(self.store)
+    
+    def __getitem__(self, index):
+        return self.store[index]
+    
+    def __iter__(self) -> Iterator[Waypoint]:
+        return iter(self.store)
+    
+    def __repr__(self) -> str:
+        return f"<WaypointCollection with {len(self)} waypoints>"
@@ -32,6 +32,81 @@ STYLE_LABELS = {v: k for k, v in STYLE_OPTIONS.items()}
 # API Configuration
 ELEVATION_API_URL = "https://api.open-elevation.com/api/v1/lookup"
 ELEVATION_API_TIMEOUT = 5
+ELEVATION_BATCH_SIZE = 100  # Locations per lookup request
+ELEVATION_RETRIES = 2  # Extra attempts for a failed request
+ELEVATION_RETRY_BACKOFF = 0.5  # Seconds before the first retry, doubled each time
+ELEVATION_BREAKER_THRESHOLD = 3  # Consecutive failures before requests are paused
+ELEVATION_BREAKER_RESET = 30  # Seconds before a paused API is tried again
+ELEVATION_TIME_BUDGET = 60  # Maximum seconds spent fetching elevations per save
+ELEVATION_MAX_CONCURRENCY = 4  # Lookup requests in flight at once
+ELEVATION_MAX_REQUESTS_PER_SECOND = 10  # None = unlimited
+ELEVATION_POLL_INTERVAL_MS = 100  # How often the GUI checks running lookups
+
+# Elevation cache configuration
+ELEVATION_CACHE_ENABLED = True
+ELEVATION_CACHE_DIR = None  # None = per-user cache directory
+ELEVATION_CACHE_PRECISION = 4  # Decimal places of the cache key (~11 m)
+ELEVATION_CACHE_MAX_ENTRIES = 500000
+ELEVATION_CACHE_TTL = 365 * 24 * 3600  # Seconds
+
+# Offline elevation from SRTM .hgt tiles (used before the API when set)
+ELEVATION_DEM_DIR = None
+ELEVATION_DEM_MAX_OPEN_TILES = 8
+
+# Waypoint table configuration
+VIRTUAL_TREE_THRESHOLD = 10000  # Above this many rows only visible rows become tree items
+VIRTUAL_TREE_OVERSCAN = 30  # Extra rows kept above and below the viewport
+ROW_CACHE_SIZE = 20000  # Formatted rows kept for redrawing
+
+# Background loading configuration
+LOAD_CHUNK_ROWS = 2000  # Waypoints handed from the loader thread to the GUI at a time
+LOAD_QUEUE_CHUNKS = 8  # Parsed chunks buffered before the loader thread waits
+LOAD_POLL_INTERVAL_MS = 50  # How often the GUI takes parsed chunks
+BULK_CHANGE_ROWS = 1000  # Larger removals re-sort once and send a single reset
+
+# Edit journal (crash recovery) configuration
+JOURNAL_ENABLED = True
+JOURNAL_DIR = None  # Journals of untitled files; None = per-user cache directory
+JOURNAL_SYNC_INTERVAL = 1.0  # Seconds between fsyncs (every record is flushed at once)
+JOURNAL_COMPACT_RECORDS = 2000  # Compact once there are this many records and twice as many as edited rows
+
+# Parse cache configuration (binary copies of parsed CUP files for fast reopening)
+PARSE_CACHE_ENABLED = True
+PARSE_CACHE_DIR = None  # None = per-user cache directory
+PARSE_CACHE_MIN_BYTES = 256 * 1024  # Smaller files parse about as fast as the cache loads
+PARSE_CACHE_MAX_FILES = 32  # Least recently opened entries beyond this are deleted
+
+# Undo configuration
+UNDO_MEMORY_LIMIT = 32 * 1024 * 1024  # Bytes of undo/redo deltas kept before the oldest steps are dropped
+
+# Command-line interface configuration
+CLI_MAX_WORKERS = None  # Processes for batch commands; None = one per CPU
+CLI_REPORTED_ROW_ERRORS = 10  # Invalid rows listed per file in reports (all are counted)
+
+# Performance instrumentation configuration
+PERF_ENV_VAR = "SOARING_CUP_PERF"  # "1": collect timings, "profile": also cProfile; report printed at exit
+PERF_PROFILE_FILE = "soaring_cup_editor.prof"  # pstats file of a session profiled via PERF_ENV_VAR
+PERF_PROFILE_LINES = 25  # Functions listed in profile summaries
+PERF_REFRESH_MS = 1000  # How often the open Performance panel updates its report
+
+# Startup profile configuration (--startup-profile)
+STARTUP_TIME_BUDGET = 1.0  # Seconds from the first import until the main window or a command starts
+STARTUP_PROFILE_FILE = "soaring_cup_startup.txt"  # Startup profile of the windowed executable, which has no stderr
+STARTUP_PROFILE_LINES = 15  # Slowest imports listed after the import tree
+
+# Spatial index configuration
+SPATIAL_INDEX_CELL_SIZE = 0.1  # Grid cell edge in degrees (~11 km of latitude)
+
+# Duplicate detection configuration
+DEDUPE_RADIUS_M = 2000  # Farthest apart two duplicates can be
+DEDUPE_MIN_SCORE = 0.65  # Minimum pair score (0..1) to report a duplicate
+DEDUPE_WEIGHTS = (0.4, 0.3, 0.3)  # Weights of distance, code match and name similarity
+DEDUPE_COMMON_COUNT = 5  # Names/codes used more often than this are ignored as generic
+DEDUPE_STYLE_PENALTY = 0.25  # Subtracted from the score of a pair with different styles
+DEDUPE_STYLE_GROUPS = ({2, 4, 5},)  # Styles that do not count as different (grass, glider and solid airfields)
+DEDUPE_ANY_STYLE = 1  # Plain waypoints (the default style) may be any kind of place
+DEDUPE_OBSTACLE_STYLES = {8, 11}  # Point obstacles (masts, towers) that stand in named clusters
+DEDUPE_OBSTACLE_RADIUS_M = 50  # Farthest apart two duplicates of a point obstacle can be
 
 # Coordinate validation ranges
 LATITUDE_MIN = -90
@@ -0,0 +1,315 @@
+"""Near-duplicate waypoint detection."""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .collection import WaypointCollection
+from .config import (
+    DEDUPE_RADIUS_M, DEDUPE_MIN_SCORE, DEDUPE_WEIGHTS, DEDUPE_COMMON_COUNT, DEDUPE_STYLE_PENALTY,
+    DEDUPE_STYLE_GROUPS, DEDUPE_ANY_STYLE, DEDUPE_OBSTACLE_STYLES, DEDUPE_OBSTACLE_RADIUS_M
+)
+from .models import Waypoint
+from .spatial import SpatialIndex
+from .store import WaypointRow, WaypointStore
+from .utils import fold_text
+
+_NON_ALNUM = re.compile(r'[\W_]+')
+# Numbering words ("1", "II") that tell otherwise equal names apart
+_NUMBERING = re.compile(r'\d+|[ivx]+')
+
+Record = Union[Waypoint, WaypointRow]
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a waypoint name for comparison.
+    
+    Args:
+        name: Waypoint name
+    
+    Returns:
+        Folded name with punctuation replaced by single spaces
+    """
+    return _NON_ALNUM.sub(' ', fold_text(name)).strip()
+
+
+def name_similarity(a: str, b: str) -> float:
+    """
+    Similarity of two normalized names between 0 and 1.
+    
+    Args:
+        a: Normalized name
+        b: Normalized name
+    
+    Returns:
+        1.0 for equal names, 0.0 if both are numbered differently
+        ("Komin 4" / "Komin 5"), 0.9 if all words of one name appear in
+        the other, otherwise the difflib similarity ratio
+    """
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    words_a, words_b = set(a.split()), set(b.split())
+    numbers_a = {word for word in words_a if _NUMBERING.fullmatch(word)}
+    numbers_b = {word for word in words_b if _NUMBERING.fullmatch(word)}
+    if numbers_a and numbers_b and numbers_a != numbers_b:
+        return 0.0
+    if words_a <= words_b or words_b <= words_a:
+        return 0.9
+    return SequenceMatcher(None, a, b).ratio()
+
+
+@dataclass
+class DuplicatePair:
+    """Two waypoints that look like the same place."""
+    first: int
+    second: int
+    score: float
+    distance_m: float
+    code_match: bool
+    name_similarity: float
+
+
+@dataclass
+class DuplicateGroup:
+    """
+    Waypoints that should be merged into one.
+    
+    Attributes:
+        ids: Ids of the grouped waypoints (positions or store row ids)
+        pairs: The scored pairs that linked them
+    """
+    ids: List[int]
+    pairs: List[DuplicatePair] = field(default_factory=list)
+    
+    @property
+    def score(self) -> float:
+        """Best pair score in the group."""
+        return max((pair.score for pair in self.pairs), default=0.0)
+
+
+def styles_match(a: int, b: int) -> bool:
+    """
+    Check whether two style codes can describe the same place.
+    
+    Args:
+        a: Style of one waypoint
+        b: Style of the other
+    
+    Returns:
+        True for equal styles, styles in one of DEDUPE_STYLE_GROUPS, or if
+        either is a plain waypoint (DEDUPE_ANY_STYLE)
+    """
+    if a == b or DEDUPE_ANY_STYLE in (a, b):
+        return True
+    return any(a in group and b in group for group in DEDUPE_STYLE_GROUPS)
+
+
+def pair_radius(a: Record, b: Record, radius_m: float = DEDUPE_RADIUS_M) -> float:
+    """
+    Farthest apart two waypoints can be and still be duplicates.
+    
+    Wind farms and mast clusters list many obstacles of the same name a few
+    hundred metres apart, so point obstacles only match within
+    DEDUPE_OBSTACLE_RADIUS_M.
+    """
+    if a.style in DEDUPE_OBSTACLE_STYLES or b.style in DEDUPE_OBSTACLE_STYLES:
+        return min(radius_m, DEDUPE_OBSTACLE_RADIUS_M)
+    return radius_m
+
+
+def _records(waypoints) -> Dict[int, Record]:
+    """Map ids to waypoints: row ids for collections and stores, positions for sequences."""
+    if isinstance(waypoints, WaypointCollection):
+        waypoints = waypoints.store
+    if isinstance(waypoints, WaypointStore):
+        return {row_id: WaypointRow(waypoints, row_id) for row_id in waypoints.row_ids()}
+    return dict(enumerate(waypoints))
+
+
+def score_pair(a: Record, b: Record, distance_m: float, radius_m: float = DEDUPE_RADIUS_M,
+               normalized: Optional[Tuple[str, str]] = None, common_name: bool = False,
+               common_code: bool = False) -> DuplicatePair:
+    """
+    Score how likely two waypoints are the same place.
+    
+    The score is a weighted sum (DEDUPE_WEIGHTS) of closeness within the
+    radius (see pair_radius()), code agreement (equal codes, or one
+    waypoint's name being the other's code, e.g. an ICAO-named entry) and
+    name similarity, minus DEDUPE_STYLE_PENALTY if the styles differ (see
+    styles_match()). Pairs farther apart than pair_radius() score 0.
+    
+    Names and codes shared by many waypoints (e.g. "Obstacle") say nothing
+    about identity: a common code scores as if missing and a common name
+    adds nothing.
+    
+    Args:
+        a: First waypoint
+        b: Second waypoint
+        distance_m: Great-circle distance between them
+        radius_m: Distance at which closeness counts as zero (smaller for point obstacles)
+        normalized: Pre-computed normalized names of a and b
+        common_name: The names are generic in this data set
+        common_code: The codes are generic in this data set
+    
+    Returns:
+        DuplicatePair with ids set to -1
+    """
+    name_a, name_b = normalized or (normalize_name(a.name), normalize_name(b.name))
+    code_a, code_b = a.code.strip().lower(), b.code.strip().lower()
+    if common_code:
+        code_match = False
+        code_score = 0.5
+    elif code_a and code_b:
+        code_match = code_a == code_b
+        code_score = 1.0 if code_match else 0.0
+    else:
+        code_match = bool(code_a and code_a == name_b) or bool(code_b and code_b == name_a)
+        code_score = 1.0 if code_match else 0.5
+    if code_match and (code_a == name_b or code_b == name_a):
+        # Named by the other's code (e.g. "EPBA"): the name identifies it
+        similarity = 1.0
+    elif common_name:
+        similarity = 0.0
+    else:
+        similarity = name_similarity(name_a, name_b)
+    radius_m = pair_radius(a, b, radius_m)
+    if distance_m > radius_m:
+        return DuplicatePair(-1, -1, 0.0, distance_m, code_match, similarity)
+    closeness = max(0.0, 1.0 - distance_m / radius_m)
+    w_distance, w_code, w_name = DEDUPE_WEIGHTS
+    score = w_distance * closeness + w_code * code_score + w_name * similarity
+    if not styles_match(a.style, b.style):
+        score -= DEDUPE_STYLE_PENALTY
+    return DuplicatePair(-1, -1, score, distance_m, code_match, similarity)
+
+
+def find_duplicates(waypoints: Union[WaypointCollection, WaypointStore, Sequence[Waypoint]],
+                    radius_m: float = DEDUPE_RADIUS_M,
+                    min_score: float = DEDUPE_MIN_SCORE) -> List[DuplicateGroup]:
+    """
+    Find groups of waypoints that are probably the same place.
+    
+    Candidate pairs come from a spatial index, so only waypoints within
+    ``radius_m`` of each other are compared and the run time grows roughly
+    linearly with the number of waypoints. Pairs scoring at least
+    ``min_score`` are linked, best first, and two groups are only joined if
+    every waypoint of one is linked to every waypoint of the other, so a
+    chain of near places (A near B near C) does not merge A with C.
+    
+    Args:
+        waypoints: Collection or store (ids are row ids) or a sequence of
+            Waypoints (ids are positions)
+        radius_m: Maximum distance between duplicates in metres
+        min_score: Minimum pair score (0..1)
+    
+    Returns:
+        Merge groups, best score first
+    """
+    records = _records(waypoints)
+    index = SpatialIndex.from_points((point_id, record.latitude, record.longitude)
+                                     for point_id, record in records.items())
+    names = {point_id: normalize_name(record.name) for point_id, record in records.items()}
+    name_counts = Counter(names.values())
+    code_counts = Counter(record.code.strip().lower() for record in records.values())
+    code_counts[''] = 0  # Missing codes are handled by score_pair
+    
+    pairs: List[DuplicatePair] = []
+    for point_id, record in records.items():
+        for distance, other_id in index.within_radius(record.latitude, record.longitude, radius_m):
+            if other_id <= point_id:
+                continue
+            other = records[other_id]
+            name_a, name_b = names[point_id], names[other_id]
+            pair = score_pair(
+                record, other, distance, radius_m, (name_a, name_b),
+                common_name=max(name_counts[name_a], name_counts[name_b]) > DEDUPE_COMMON_COUNT,
+                common_code=max(code_counts[record.code.strip().lower()],
+                                code_counts[other.code.strip().lower()]) > DEDUPE_COMMON_COUNT
+            )
+            if pair.score >= min_score:
+                pair.first, pair.second = point_id, other_id
+                pairs.append(pair)
+    
+    # Join groups along the best pairs (complete linkage)
+    linked = {(pair.first, pair.second) for pair in pairs}
+    members: Dict[int, List[int]] = {}  # Group members by id
+    pairs.sort(key=lambda pair: -pair.score)
+    for pair in pairs:
+        group_a = members.get(pair.first, [pair.first])
+        group_b = members.get(pair.second, [pair.second])
+        if group_a is group_b:
+            continue
+        if all((min(a, b), max(a, b)) in linked for a in group_a for b in group_b):
+            group_a.extend(group_b)
+            for point_id in group_a:
+                members[point_id] = group_a
+    
+    groups: Dict[int, DuplicateGroup] = {}
+    for pair in pairs:
+        group_ids = members.get(pair.first)
+        if group_ids is None or group_ids is not members.get(pair.second):
+            continue
+        group = groups.setdefault(id(group_ids), DuplicateGroup(sorted(group_ids)))
+        group.pairs.append(pair)
+    return sorted(groups.values(), key=lambda group: -group.score)
+
+
+def _completeness(waypoint: Waypoint) -> Tuple[int, int]:
+    filled = sum(1 for value in (waypoint.code, waypoint.country, waypoint.elevation,
+                                 waypoint.runway_direction, waypoint.runway_length,
+                                 waypoint.runway_width, waypoint.frequency, waypoint.description)
+                 if value not in (None, ''))
+    return (int(waypoint.is_airfield), filled)
+
+
+def merge_group(waypoints: Sequence[Waypoint]) -> Waypoint:
+    """
+    Merge duplicate waypoints into one.
+    
+    The most complete waypoint (airfields first, then by number of filled
+    fields) is kept, and its empty fields are filled from the others.
+    
+    Args:
+        waypoints: Duplicates of the same place
+    
+    Returns:
+        New merged Waypoint
+    """
+    ranked = sorted(waypoints, key=_completeness, reverse=True)
+    merged = ranked[0].copy()
+    for other in ranked[1:]:
+        for name in ('code', 'country', 'elevation', 'runway_direction', 'runway_length',
+                     'runway_width', 'frequency', 'description'):
+            if getattr(merged, name) in (None, '') and getattr(other, name) not in (None, ''):
+                setattr(merged, name, getattr(other, name))
+    return merged
+
+
+def merge_duplicates(waypoints: Iterable[Waypoint], radius_m: float = DEDUPE_RADIUS_M,
+                     min_score: float = DEDUPE_MIN_SCORE) -> List[Waypoint]:
+    """
+    Return waypoints with each group of duplicates merged into one.
+    
+    Useful when combining files, e.g. a club file with an OpenAIP export.
+    Merged waypoints take the position of the first member of their group.
+    
+    Args:
+        waypoints: Waypoints to deduplicate
+        radius_m: Maximum distance between duplicates in metres
+        min_score: Minimum pair score (0..1)
+    
+    Returns:
+        Deduplicated list of waypoints
+    """
+    waypoints = list(waypoints)
+    replacement: Dict[int, Waypoint] = {}
+    dropped = set()
+    for group in find_duplicates(waypoints, radius_m, min_score):
+        replacement[group.ids[0]] = merge_group([waypoints[i] for i in group.ids])
+        dropped.update(group.ids[1:])
+    return [replacement.get(i, waypoint) for i, waypoint in enumerate(waypoints) if i not in dropped]
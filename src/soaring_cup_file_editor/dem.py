@@ -0,0 +1,197 @@
+"""Offline elevation lookups from local SRTM ``.hgt`` tiles."""
+
+import math
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import ELEVATION_DEM_MAX_OPEN_TILES
+from .elevation import Coord, ElevationProvider
+
+# SRTM samples are big-endian signed 16-bit integers, -32768 marks a void
+_SAMPLE_PAIR = struct.Struct('>hh')
+HGT_VOID = -32768
+
+# File size -> samples per tile edge (SRTM1 = 1 arc-second, SRTM3 = 3 arc-seconds)
+_HGT_SIZES = {3601 * 3601 * 2: 3601, 1201 * 1201 * 2: 1201}
+
+
+def hgt_tile_name(lat: float, lon: float) -> str:
+    """
+    Get the SRTM tile file name covering a point.
+    
+    Args:
+        lat: Latitude in decimal degrees
+        lon: Longitude in decimal degrees
+    
+    Returns:
+        Tile name such as "N50E019.hgt"
+    
+    Example:
+        >>> hgt_tile_name(50.0228, 19.0020)
+        'N50E019.hgt'
+    """
+    lat0 = math.floor(lat)
+    lon0 = math.floor(lon)
+    ns = 'N' if lat0 >= 0 else 'S'
+    ew = 'E' if lon0 >= 0 else 'W'
+    return f"{ns}{abs(lat0):02d}{ew}{abs(lon0):03d}.hgt"
+
+
+class HgtTile:
+    """A single memory-mapped SRTM tile."""
+    
+    def __init__(self, path: str, lat0: int, lon0: int):
+        """
+        Map a tile file into memory.
+        
+        Args:
+            path: Path to the .hgt file
+            lat0: Latitude of the tile's south edge
+            lon0: Longitude of the tile's west edge
+        """
+        size = os.path.getsize(path)
+        if size not in _HGT_SIZES:
+            raise ValueError(f"{path}: unsupported HGT size {size} bytes")
+        self.path = path
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.samples = _HGT_SIZES[size]
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def elevations(self, coords: Sequence[Coord]) -> List[Optional[float]]:
+        """
+        Bilinearly interpolate the elevation of points inside this tile.
+        
+        Args:
+            coords: (latitude, longitude) pairs within the tile
+        
+        Returns:
+            Elevations in meters (None where all surrounding samples are voids)
+        """
+        n = self.samples
+        last = n - 2
+        top = self.lat0 + 1
+        west = self.lon0
+        row_bytes = n * 2
+        buf = self._map
+        unpack_pair = _SAMPLE_PAIR.unpack_from
+        results = []
+        for lat, lon in coords:
+            # Row 0 is the northern edge, column 0 the western edge
+            row = (top - lat) * (n - 1)
+            col = (lon - west) * (n - 1)
+            r0 = min(max(int(row), 0), last)
+            c0 = min(max(int(col), 0), last)
+            fr = min(max(row - r0, 0.0), 1.0)
+            fc = min(max(col - c0, 0.0), 1.0)
+            offset = r0 * row_bytes + c0 * 2
+            v00, v01 = unpack_pair(buf, offset)
+            v10, v11 = unpack_pair(buf, offset + row_bytes)
+            weighted = (
+                (v00, (1 - fr) * (1 - fc)),
+                (v01, (1 - fr) * fc),
+                (v10, fr * (1 - fc)),
+                (v11, fr * fc),
+            )
+            total = 0.0
+            weight = 0.0
+            for value, w in weighted:
+                if value != HGT_VOID:
+                    total += value * w
+                    weight += w
+            results.append(total / weight if weight > 0 else None)
+        return results
+    
+    def close(self) -> None:
+        """Unmap the tile and close its file."""
+        self._map.close()
+        self._file.close()
+
+
+class HgtElevationProvider(ElevationProvider):
+    """
+    Offline elevation provider reading SRTM ``.hgt`` tiles from a directory.
+    
+    Tiles are memory-mapped on first use and kept in a small LRU of open
+    tiles. Batch lookups group points by tile so each tile is resolved
+    in one pass. Lookups are serialized by a lock: the ElevationResolver
+    calls providers from several worker threads, and a tile evicted by
+    one thread must not be closed while another is still reading it.
+    """
+    
+    def __init__(self, directory: str, max_open_tiles: int = ELEVATION_DEM_MAX_OPEN_TILES):
+        """
+        Initialize the provider.
+        
+        Args:
+            directory: Directory containing tiles named like "N50E019.hgt"
+            max_open_tiles: Number of tiles kept memory-mapped at once
+        """
+        self.directory = directory
+        self.max_open_tiles = max_open_tiles
+        self._tiles: "OrderedDict[Tuple[int, int], HgtTile]" = OrderedDict()
+        self._missing = set()
+        self._files = self._index_directory()
+        self._lock = threading.Lock()
+    
+    def _index_directory(self) -> Dict[str, str]:
+        """Map upper-cased tile names to their paths."""
+        files = {}
+        if os.path.isdir(self.directory):
+            for entry in os.listdir(self.directory):
+                if entry.lower().endswith('.hgt'):
+                    files[entry.upper()] = os.path.join(self.directory, entry)
+        return files
+    
+    def _tile(self, lat0: int, lon0: int) -> Optional[HgtTile]:
+        """Get the open tile with the given south-west corner, opening it if needed (call with the lock held)."""
+        key = (lat0, lon0)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            return tile
+        if key in self._missing:
+            return None
+        path = self._files.get(hgt_tile_name(lat0, lon0).upper())
+        if path is None:
+            self._missing.add(key)
+            return None
+        try:
+            tile = HgtTile(path, lat0, lon0)
+        except (OSError, ValueError) as e:
+            print(f"Cannot open elevation tile {path}: {e}")
+            self._missing.add(key)
+            return None
+        self._tiles[key] = tile
+        while len(self._tiles) > self.max_open_tiles:
+            _, evicted = self._tiles.popitem(last=False)
+            evicted.close()
+        return tile
+    
+    def lookup_many(self, coords: Sequence[Coord],
+                    deadline: Optional[float] = None) -> List[Optional[float]]:
+        results: List[Optional[float]] = [None] * len(coords)
+        by_tile: Dict[Tuple[int, int], List[int]] = {}
+        for i, (lat, lon) in enumerate(coords):
+            by_tile.setdefault((math.floor(lat), math.floor(lon)), []).append(i)
+        with self._lock:
+            for (lat0, lon0), indices in by_tile.items():
+                tile = self._tile(lat0, lon0)
+                if tile is None:
+                    continue
+                values = tile.elevations([coords[i] for i in indices])
+                for i, value in zip(indices, values):
+                    results[i] = value
+        return results
+    
+    def close(self) -> None:
+        """Close all open tiles."""
+        with self._lock:
+            while self._tiles:
+                _, tile = self._tiles.popitem()
+                tile.close()
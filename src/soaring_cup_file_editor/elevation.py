@@ -0,0 +1,583 @@
+"""Elevation lookups through pluggable elevation providers."""
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from .config import (
+    ELEVATION_API_URL, ELEVATION_API_TIMEOUT, ELEVATION_BATCH_SIZE,
+    ELEVATION_DEM_DIR, ELEVATION_RETRIES, ELEVATION_RETRY_BACKOFF,
+    ELEVATION_BREAKER_THRESHOLD, ELEVATION_BREAKER_RESET,
+    ELEVATION_MAX_CONCURRENCY, ELEVATION_MAX_REQUESTS_PER_SECOND
+)
+from . import perf
+from .elevation_cache import get_default_cache
+
+if TYPE_CHECKING:
+    import requests
+
+Coord = Tuple[float, float]
+
+
+@dataclass
+class ElevationResult:
+    """Outcome of resolving elevations for a set of coordinates."""
+    
+    elevations: Dict[Coord, float] = field(default_factory=dict)
+    unresolved: List[Coord] = field(default_factory=list)
+    elapsed: float = 0.0
+    budget_exhausted: bool = False
+    
+    def get(self, coord: Coord) -> Optional[float]:
+        """Get the resolved elevation of a coordinate, or None."""
+        return self.elevations.get(coord)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service until it has had time to recover.
+    
+    After ``threshold`` consecutive failures the breaker opens and allow()
+    returns False. Once ``reset_timeout`` seconds have passed a single trial
+    call is allowed (half-open): other callers still get False until the
+    trial's success closes the breaker or its failure re-opens it. A caller
+    that was allowed but did not make the call must release() it.
+    """
+    
+    def __init__(self, threshold: int = ELEVATION_BREAKER_THRESHOLD,
+                 reset_timeout: float = ELEVATION_BREAKER_RESET):
+        """
+        Initialize a closed breaker.
+        
+        Args:
+            threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds to wait before allowing a trial call
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._trial_thread: Optional[int] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+    
+    def allow(self) -> bool:
+        """Check whether a call may be attempted now."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial_in_flight or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._trial_in_flight = True
+            self._trial_thread = threading.get_ident()
+            return True
+    
+    def release(self) -> None:
+        """Give back a call allowed by allow() that was not made after all."""
+        with self._lock:
+            # Only the thread that got the trial call can give it back
+            if self._trial_thread == threading.get_ident():
+                self._trial_in_flight = False
+                self._trial_thread = None
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+            self.failures += 1
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    print(f"Elevation API unavailable after {self.failures} failures, "
+                          f"pausing requests for {self.reset_timeout:.0f} s")
+                self.opened_at = time.monotonic()
+
+
+class RateLimiter:
+    """Spaces calls so that at most ``rate`` of them start per second (thread-safe)."""
+    
+    def __init__(self, rate: Optional[float] = ELEVATION_MAX_REQUESTS_PER_SECOND):
+        """
+        Initialize the limiter.
+        
+        Args:
+            rate: Maximum calls per second, or None/0 for no limit
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """
+        Wait for the next free slot.
+        
+        Args:
+            deadline: time.monotonic() value to give up at, or None
+        
+        Returns:
+            True if a slot was taken, False if it would start after the deadline
+        """
+        if not self.interval:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            if deadline is not None and slot >= deadline:
+                return False
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+        return True
+
+
+class ElevationProvider:
+    """
+    Base class for sources of terrain elevation.
+    
+    Subclasses implement lookup_many(); lookups that cannot be answered
+    return None rather than a made-up value. ``deadline`` is a
+    time.monotonic() value after which slow providers should give up.
+    """
+    
+    # Whether results are worth storing in the persistent elevation cache
+    cacheable = False
+    
+    def lookup(self, lat: float, lon: float) -> Optional[float]:
+        """
+        Look up the elevation of a single point.
+        
+        Args:
+            lat: Latitude in decimal degrees
+            lon: Longitude in decimal degrees
+        
+        Returns:
+            Elevation in meters, or None if unknown
+        """
+        return self.lookup_many([(lat, lon)])[0]
+    
+    def lookup_many(self, coords: Sequence[Coord],
+                    deadline: Optional[float] = None) -> List[Optional[float]]:
+        """
+        Look up the elevation of many points.
+        
+        Args:
+            coords: (latitude, longitude) pairs in decimal degrees
+            deadline: time.monotonic() value to give up at, or None
+        
+        Returns:
+            Elevations in meters (None where unknown), in the same order as coords
+        """
+        raise NotImplementedError
+
+
+class OpenElevationProvider(ElevationProvider):
+    """
+    Elevation provider backed by the open-elevation lookup API.
+    
+    Requests share one keep-alive session and are spaced by a rate
+    limiter, so the provider can be called from several threads at once.
+    Transient failures are retried with exponential backoff, and a
+    circuit breaker skips the API entirely while it keeps failing.
+    """
+    
+    cacheable = True
+    
+    def __init__(self, url: Optional[str] = None, timeout: float = ELEVATION_API_TIMEOUT,
+                 retries: int = ELEVATION_RETRIES, backoff: float = ELEVATION_RETRY_BACKOFF,
+                 breaker: Optional[CircuitBreaker] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 max_connections: int = ELEVATION_MAX_CONCURRENCY):
+        """
+        Initialize the provider.
+        
+        Args:
+            url: Lookup endpoint (defaults to ELEVATION_API_URL)
+            timeout: Request timeout in seconds
+            retries: Extra attempts after a failed request
+            backoff: Delay before the first retry in seconds (doubles per retry)
+            breaker: Circuit breaker guarding the API
+            rate_limiter: Limiter applied to every request
+            max_connections: Keep-alive connections kept in the session pool
+        """
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        # Imported here: requests (with urllib3 and certifi) is the slowest
+        # import of the package and most sessions never fetch an elevation
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def lookup_many(self, coords: Sequence[Coord],
+                    deadline: Optional[float] = None) -> List[Optional[float]]:
+        """Fetch all coords with one API request (None for all of them on failure)."""
+        unresolved = [None] * len(coords)
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                return unresolved
+            if not self.rate_limiter.acquire(deadline):
+                self.breaker.release()
+                return unresolved
+            timeout = self.timeout
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    self.breaker.release()
+                    return unresolved
+            try:
+                elevations = _fetch_elevation_batch(
+                    coords, self.url or ELEVATION_API_URL, timeout, self.session
+                )
+            except Exception as e:
+                self.breaker.record_failure()
+                print(f"Elevation batch fetch error for {len(coords)} locations "
+                      f"(attempt {attempt + 1}): {e}")
+                if not _is_retryable(e):
+                    return unresolved
+            else:
+                self.breaker.record_success()
+                return elevations
+            if attempt < self.retries:
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    return unresolved
+                time.sleep(delay)
+                delay *= 2
+        return unresolved
+
+
+class ChainedElevationProvider(ElevationProvider):
+    """Asks each provider in turn for the points earlier providers could not answer."""
+    
+    def __init__(self, providers: Sequence[ElevationProvider]):
+        """
+        Initialize the chain.
+        
+        Args:
+            providers: Providers in order of preference (e.g. offline DEM first)
+        """
+        self.providers = list(providers)
+        self.cacheable = any(provider.cacheable for provider in self.providers)
+    
+    def lookup_many(self, coords: Sequence[Coord],
+                    deadline: Optional[float] = None) -> List[Optional[float]]:
+        results = [None] * len(coords)
+        for provider in self.providers:
+            todo = [i for i, value in enumerate(results) if value is None]
+            if not todo:
+                break
+            for i, value in zip(todo, provider.lookup_many([coords[i] for i in todo], deadline)):
+                results[i] = value
+        return results
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Check whether a failed request is worth retrying."""
+    import requests
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, requests.RequestException)
+
+
+def _fetch_elevation_batch(coords: Sequence[Coord], url: str, timeout: float,
+                           session: Optional['requests.Session'] = None) -> List[float]:
+    """
+    Fetch elevations for several coordinates in a single API request.
+    
+    Args:
+        coords: (latitude, longitude) pairs in decimal degrees
+        url: Lookup endpoint
+        timeout: Request timeout in seconds
+        session: Session to send the request through (keeps connections alive)
+    
+    Returns:
+        Elevations in meters, in the same order as coords
+    """
+    if session is None:
+        import requests
+        session = requests
+    resp = session.post(
+        url,
+        json={"locations": [{"latitude": lat, "longitude": lon} for lat, lon in coords]},
+        timeout=timeout
+    )
+    resp.raise_for_status()
+    results = resp.json()['results']
+    if len(results) != len(coords):
+        raise ValueError(f"Expected {len(coords)} results, got {len(results)}")
+    return [float(result['elevation']) for result in results]
+
+
+_default_provider = None
+
+
+def get_default_provider() -> ElevationProvider:
+    """
+    Get the elevation provider used by get_elevation() and get_elevations().
+    
+    If ELEVATION_DEM_DIR is configured, local SRTM tiles are used first and
+    the open-elevation API only for points outside the available tiles.
+    
+    Returns:
+        The shared elevation provider
+    """
+    global _default_provider
+    if _default_provider is None:
+        if ELEVATION_DEM_DIR:
+            from .dem import HgtElevationProvider
+            _default_provider = ChainedElevationProvider([
+                HgtElevationProvider(ELEVATION_DEM_DIR),
+                OpenElevationProvider(),
+            ])
+        else:
+            _default_provider = OpenElevationProvider()
+    return _default_provider
+
+
+def set_default_provider(provider: Optional[ElevationProvider]) -> None:
+    """
+    Replace the shared elevation provider (None restores the configured default).
+    
+    Args:
+        provider: Provider to use for subsequent lookups
+    """
+    global _default_provider
+    _default_provider = provider
+
+
+class ElevationJob:
+    """
+    A running elevation lookup submitted to an ElevationResolver.
+    
+    Poll progress and done() (e.g. from a Tk ``after`` callback) or block
+    on wait(). ``future`` can be awaited with ``asyncio.wrap_future()``.
+    """
+    
+    def __init__(self, total: int, deadline: Optional[float]):
+        self.total = total
+        self.completed = 0
+        self.deadline = deadline
+        self.cancelled = False
+        self.result = ElevationResult()
+        self.future: "Future[ElevationResult]" = Future()
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        if total == 0:
+            self._finish()
+    
+    @property
+    def progress(self) -> Tuple[int, int]:
+        """Number of coordinates processed so far and in total."""
+        return self.completed, self.total
+    
+    def done(self) -> bool:
+        return self.future.done()
+    
+    def wait(self, timeout: Optional[float] = None) -> ElevationResult:
+        """
+        Block until the job has finished.
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+        
+        Returns:
+            ElevationResult of the job
+        """
+        return self.future.result(timeout)
+    
+    def cancel(self) -> None:
+        """Stop the job; batches that have not started are left unresolved."""
+        self.cancelled = True
+    
+    def partial(self) -> Dict[Coord, float]:
+        """Copy of the elevations resolved so far (usable while the job still runs)."""
+        with self._lock:
+            return dict(self.result.elevations)
+    
+    def _record(self, batch: Sequence[Coord], values: Sequence[Optional[float]],
+                skipped: bool) -> None:
+        with self._lock:
+            for coord, value in zip(batch, values):
+                if value is None:
+                    self.result.unresolved.append(coord)
+                else:
+                    self.result.elevations[coord] = value
+            if skipped and not self.cancelled:
+                self.result.budget_exhausted = True
+            self.completed += len(batch)
+            finished = self.completed >= self.total
+        if finished:
+            self._finish()
+    
+    def _finish(self) -> None:
+        self.result.elapsed = time.monotonic() - self._started
+        self.future.set_result(self.result)
+
+
+class ElevationResolver:
+    """
+    Resolves elevations concurrently on a thread pool.
+    
+    Cached coordinates are answered immediately; the rest are split into
+    batches that run on up to ``max_concurrency`` worker threads.
+    """
+    
+    def __init__(self, max_concurrency: int = ELEVATION_MAX_CONCURRENCY):
+        """
+        Initialize the resolver.
+        
+        Args:
+            max_concurrency: Maximum number of provider calls in flight
+        """
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix='elevation'
+        )
+    
+    def submit(self, coords: Sequence[Coord], batch_size: int = ELEVATION_BATCH_SIZE,
+               provider: Optional[ElevationProvider] = None,
+               time_budget: Optional[float] = None) -> ElevationJob:
+        """
+        Start resolving elevations in the background.
+        
+        Args:
+            coords: (latitude, longitude) pairs in decimal degrees
+            batch_size: Maximum number of locations per provider call (API request)
+            provider: Elevation provider (defaults to get_default_provider())
+            time_budget: Maximum seconds to spend, or None for no limit
+        
+        Returns:
+            ElevationJob tracking the lookup
+        """
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        provider = provider or get_default_provider()
+        unique = list(dict.fromkeys(coords))
+        cache = get_default_cache() if provider.cacheable else None
+        cached = {}
+        if cache is not None:
+            try:
+                cached = cache.get_many(unique)
+            except sqlite3.Error as e:
+                # E.g. locked by another process: look everything up instead
+                print(f"Elevation cache read failed: {e}")
+        unique = [coord for coord in unique if coord not in cached]
+        perf.count("elevation.cache_hits", len(cached))
+        job = ElevationJob(len(unique), deadline)
+        job.result.elevations.update(cached)
+        for start in range(0, len(unique), batch_size):
+            batch = unique[start:start + batch_size]
+            self._executor.submit(self._run_batch, job, batch, provider, cache)
+        return job
+    
+    @staticmethod
+    def _run_batch(job: ElevationJob, batch: Sequence[Coord],
+                   provider: ElevationProvider, cache) -> None:
+        if job.cancelled or (job.deadline is not None and time.monotonic() >= job.deadline):
+            job._record(batch, [None] * len(batch), skipped=True)
+            return
+        try:
+            with perf.timer("elevation.request"):
+                values = provider.lookup_many(batch, job.deadline)
+            perf.count("elevation.locations", len(batch))
+        except Exception as e:
+            print(f"Elevation lookup error for {len(batch)} locations: {e}")
+            values = [None] * len(batch)
+        try:
+            if cache is not None:
+                cache.put_many({c: v for c, v in zip(batch, values) if v is not None})
+        except sqlite3.Error as e:
+            print(f"Elevation cache write failed for {len(batch)} locations: {e}")
+        finally:
+            # Always recorded, or the job would never complete
+            job._record(batch, values, skipped=False)
+    
+    def shutdown(self) -> None:
+        """Stop the worker threads once queued batches have run."""
+        self._executor.shutdown(wait=False)
+
+
+_default_resolver = None
+
+
+def get_default_resolver() -> ElevationResolver:
+    """Get the shared elevation resolver."""
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = ElevationResolver()
+    return _default_resolver
+
+
+def resolve_elevations(coords: Sequence[Coord], batch_size: int = ELEVATION_BATCH_SIZE,
+                       provider: Optional[ElevationProvider] = None,
+                       time_budget: Optional[float] = None) -> ElevationResult:
+    """
+    Look up elevations for many coordinates and wait for the result.
+    
+    Duplicate coordinates are only looked up once, coordinates found in
+    the persistent elevation cache are not requested at all, and batches
+    run concurrently on the default ElevationResolver. Once the time
+    budget is used up, remaining coordinates are left unresolved.
+    
+    Args:
+        coords: (latitude, longitude) pairs in decimal degrees
+        batch_size: Maximum number of locations per provider call (API request)
+        provider: Elevation provider (defaults to get_default_provider())
+        time_budget: Maximum seconds to spend, or None for no limit
+    
+    Returns:
+        ElevationResult with resolved elevations and unresolved coordinates
+    """
+    return get_default_resolver().submit(coords, batch_size, provider, time_budget).wait()
+
+
+def get_elevation(lat: float, lon: float) -> Optional[float]:
+    """
+    Look up the elevation of a point with the default elevation provider.
+    
+    The persistent elevation cache is checked first and successful
+    lookups are stored in it.
+    
+    Args:
+        lat: Latitude in decimal degrees
+        lon: Longitude in decimal degrees
+    
+    Returns:
+        Elevation in meters, or None if the lookup fails
+    """
+    return get_elevations([(lat, lon)])[0]
+
+
+def get_elevations(coords: Sequence[Coord], batch_size: int = ELEVATION_BATCH_SIZE,
+                   provider: Optional[ElevationProvider] = None) -> List[Optional[float]]:
+    """
+    Look up elevations for many coordinates in batches.
+    
+    Args:
+        coords: (latitude, longitude) pairs in decimal degrees
+        batch_size: Maximum number of locations per provider call (API request)
+        provider: Elevation provider (defaults to get_default_provider())
+    
+    Returns:
+        Elevations in meters in the same order as coords, with None for
+        coordinates that could not be resolved
+    """
+    result = resolve_elevations(coords, batch_size, provider)
+    return [result.get(coord) for coord in coords]
@@ -0,0 +1,235 @@
+"""Persistent on-disk cache for elevation lookups."""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from .config import (
+    ELEVATION_CACHE_DIR, ELEVATION_CACHE_ENABLED, ELEVATION_CACHE_MAX_ENTRIES,
+    ELEVATION_CACHE_PRECISION, ELEVATION_CACHE_TTL
+)
+
+Coord = Tuple[float, float]
+
+
+def user_cache_dir() -> str:
+    """
+    Get the per-user cache directory for the application.
+    
+    Returns:
+        Platform specific cache directory path (not created)
+    """
+    if ELEVATION_CACHE_DIR:
+        return ELEVATION_CACHE_DIR
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+        return os.path.join(base, 'SoaringCupEditor', 'Cache')
+    if sys.platform == 'darwin':
+        return os.path.expanduser('~/Library/Caches/SoaringCupEditor')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'soaring-cup-editor')
+
+
+class ElevationCache:
+    """
+    SQLite-backed elevation cache with LRU eviction and expiry.
+    
+    Coordinates are rounded to ``precision`` decimal places to form the key,
+    so nearby lookups (4 places is about 11 m) share an entry.
+    
+    Attributes:
+        hits: Number of lookups answered from the cache
+        misses: Number of lookups not found (or expired) in the cache
+    """
+    
+    def __init__(self, path: str, precision: int = ELEVATION_CACHE_PRECISION,
+                 max_entries: int = ELEVATION_CACHE_MAX_ENTRIES,
+                 ttl: Optional[float] = ELEVATION_CACHE_TTL):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            path: SQLite database file, or ":memory:"
+            precision: Decimal places coordinates are rounded to
+            max_entries: Entries kept before least recently used ones are evicted
+            ttl: Seconds an entry stays valid, or None to never expire
+        """
+        self.path = path
+        self.precision = precision
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._scale = 10 ** precision
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS elevation ("
+            " lat_key INTEGER NOT NULL,"
+            " lon_key INTEGER NOT NULL,"
+            " elevation REAL NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL,"
+            " PRIMARY KEY (lat_key, lon_key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS elevation_accessed ON elevation (accessed)")
+        self._conn.commit()
+        # Upper bound of the entry count, so inserts only count the table near the limit
+        self._entries = self._count()
+    
+    def _key(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(round(lat * self._scale)), int(round(lon * self._scale))
+    
+    def get(self, lat: float, lon: float) -> Optional[float]:
+        """
+        Look up a cached elevation.
+        
+        Args:
+            lat: Latitude in decimal degrees
+            lon: Longitude in decimal degrees
+        
+        Returns:
+            Elevation in meters, or None on a cache miss
+        """
+        return self.get_many([(lat, lon)]).get((lat, lon))
+    
+    def get_many(self, coords: Iterable[Coord]) -> Dict[Coord, float]:
+        """
+        Look up many cached elevations at once.
+        
+        Args:
+            coords: (latitude, longitude) pairs in decimal degrees
+        
+        Returns:
+            Mapping of the coordinates that were found to their elevation
+        """
+        now = time.time()
+        oldest = now - self.ttl if self.ttl is not None else None
+        found = {}
+        touched = []
+        expired = []
+        with self._lock:
+            for coord in coords:
+                key = self._key(*coord)
+                row = self._conn.execute(
+                    "SELECT elevation, created FROM elevation WHERE lat_key = ? AND lon_key = ?", key
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                elif oldest is not None and row[1] < oldest:
+                    self.misses += 1
+                    expired.append(key)
+                else:
+                    self.hits += 1
+                    found[coord] = row[0]
+                    touched.append((now,) + key)
+            if touched or expired:
+                self._conn.executemany(
+                    "UPDATE elevation SET accessed = ? WHERE lat_key = ? AND lon_key = ?", touched
+                )
+                self._conn.executemany(
+                    "DELETE FROM elevation WHERE lat_key = ? AND lon_key = ?", expired
+                )
+                self._conn.commit()
+        return found
+    
+    def put(self, lat: float, lon: float, elevation: float) -> None:
+        """
+        Store an elevation in the cache.
+        
+        Args:
+            lat: Latitude in decimal degrees
+            lon: Longitude in decimal degrees
+            elevation: Elevation in meters
+        """
+        self.put_many({(lat, lon): elevation})
+    
+    def put_many(self, elevations: Dict[Coord, float]) -> None:
+        """
+        Store many elevations, evicting least recently used entries over the size limit.
+        
+        Args:
+            elevations: Mapping of (latitude, longitude) to elevation in meters
+        """
+        if not elevations:
+            return
+        now = time.time()
+        rows = [self._key(lat, lon) + (elev, now, now) for (lat, lon), elev in elevations.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO elevation (lat_key, lon_key, elevation, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?)", rows
+            )
+            # Replaced rows and expired deletions make this an overestimate
+            self._entries += len(rows)
+            if self._entries > self.max_entries:
+                self._entries = self._count()
+                excess = self._entries - self.max_entries
+                if excess > 0:
+                    self._conn.execute(
+                        "DELETE FROM elevation WHERE rowid IN"
+                        " (SELECT rowid FROM elevation ORDER BY accessed LIMIT ?)", (excess,)
+                    )
+                    self._entries = self.max_entries
+            self._conn.commit()
+    
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM elevation").fetchone()[0]
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+    
+    def clear(self) -> None:
+        """Remove all entries and reset the hit/miss counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM elevation")
+            self._conn.commit()
+            self._entries = 0
+            self.hits = 0
+            self.misses = 0
+    
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+_default_cache_failed = False
+
+
+def get_default_cache() -> Optional[ElevationCache]:
+    """
+    Get the shared elevation cache stored in the user cache directory.
+    
+    Returns:
+        The cache, or None if caching is disabled or the database cannot be opened
+    """
+    global _default_cache, _default_cache_failed
+    if not ELEVATION_CACHE_ENABLED or _default_cache_failed:
+        return None
+    if _default_cache is None:
+        try:
+            _default_cache = ElevationCache(os.path.join(user_cache_dir(), 'elevation.sqlite3'))
+        except (OSError, sqlite3.Error) as e:
+            print(f"Elevation cache unavailable: {e}")
+            _default_cache_failed = True
+    return _default_cache
+
+
+def set_default_cache(cache: Optional[ElevationCache]) -> None:
+    """
+    Replace the shared elevation cache (None disables it).
+    
+    Args:
+        cache: Cache to use for subsequent lookups
+    """
+    global _default_cache, _default_cache_failed
+    _default_cache = cache
+    _default_cache_failed = cache is None
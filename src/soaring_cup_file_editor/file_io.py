@@ -1,186 +1,517 @@
 """File I/O operations for CUP and CSV formats."""
 
 import csv
-import requests
-from typing import List
+import io
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Mapping, Optional, TextIO, Tuple, Union
 from pathlib import Path
 
+from . import perf
 from .models import Waypoint
+from .parse_cache import content_digest, get_default_parse_cache
 from .utils import ddmm_to_deg, deg_to_ddmm
-from .config import STYLE_OPTIONS, ELEVATION_API_URL, ELEVATION_API_TIMEOUT
+from .config import STYLE_OPTIONS, ELEVATION_BATCH_SIZE, ELEVATION_TIME_BUDGET
+from .elevation import get_default_resolver, resolve_elevations
+# Re-exported so elevation lookups can be used and plugged in from the file I/O API
+from .elevation import (  # noqa: F401
+    get_elevation, get_elevations, ElevationProvider, ElevationResult, CircuitBreaker,
+    ElevationResolver, ElevationJob, OpenElevationProvider, ChainedElevationProvider,
+    get_default_provider, set_default_provider
+)
 
+# Characters that make a CUP field need quotes
+_NEEDS_QUOTES = re.compile(r'[,"\r\n]')
 
-def get_elevation(lat: float, lon: float) -> float:
+
+@dataclass
+class RowError:
+    """An input row that could not be parsed into a Waypoint."""
+    
+    line_num: int
+    text: str
+    error: str
+
+
+@dataclass
+class CupWriteResult:
+    """Summary of a write_cup_file() call."""
+    
+    rows: int = 0
+    fetched: int = 0
+    unresolved: List[Waypoint] = field(default_factory=list)
+    elevation_time: float = 0.0
+    write_time: float = 0.0
+    budget_exhausted: bool = False
+
+
+@contextmanager
+def atomic_write(filepath: str, newline: Optional[str] = None) -> Iterator[TextIO]:
+    """
+    Open a text file for writing that replaces filepath only once complete.
+    
+    The data goes to a temporary file next to the target, which is flushed
+    to disk and then renamed over the target, so a crash or error while
+    writing leaves the previous file intact. The temporary file is removed
+    if writing fails.
+    
+    Args:
+        filepath: Path of the file to write
+        newline: Passed to open() (use '' for the csv module)
+    
+    Yields:
+        Text file to write to
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    temp_path = os.path.join(directory, f".{os.path.basename(filepath)}.{uuid.uuid4().hex[:8]}.tmp")
+    # Created like open() would, so the new file gets the usual permissions
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with open(fd, 'w', encoding='utf-8', newline=newline) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(filepath):
+            # Keep the permissions of the file being replaced
+            os.chmod(temp_path, os.stat(filepath).st_mode & 0o7777)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        # Make the rename itself durable (not possible on Windows)
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def _tokenize_cup_rows(f: TextIO) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Split CUP data rows into fields using the C-backed csv reader.
+    
+    Quoted fields may contain commas and ``""`` escaped quotes. The header
+    line and blank lines are skipped.
+    
+    Args:
+        f: Text file object opened with ``newline=''``
+        
+    Yields:
+        Tuples of (line number, list of stripped field values)
+    """
+    reader = csv.reader(f, skipinitialspace=True)
+    # Skip header line
+    next(reader, None)
+    for fields in reader:
+        parts = [field.strip() for field in fields]
+        if not any(parts):
+            continue
+        yield reader.line_num, parts
+
+
+def _waypoint_from_cup_fields(parts: List[str]) -> Waypoint:
     """
-    Fetch elevation data from open-elevation API.
+    Build a Waypoint from the tokenized fields of one CUP row.
     
     Args:
-        lat: Latitude in decimal degrees
-        lon: Longitude in decimal degrees
+        parts: Field values in CUP column order
         
     Returns:
-        Elevation in meters, or 0.0 if fetch fails
+        Waypoint object
     """
-    try:
-        resp = requests.get(
-            ELEVATION_API_URL,
-            params={"locations": f"{lat},{lon}"},
-            timeout=ELEVATION_API_TIMEOUT
-        )
-        return resp.json()['results'][0]['elevation']
-    except Exception as e:
-        print(f"Elevation fetch error for {lat}, {lon}: {e}")
-        return 0.0
+    # Ensure we have enough fields
+    if len(parts) < 12:
+        parts = parts + [''] * (12 - len(parts))
+    
+    name, code, country, lat_str, lon_str, elev_str, style_str, rwdir, rwlen, rwwidth, freq, desc = parts[:12]
+    
+    lat = ddmm_to_deg(lat_str)
+    lon = ddmm_to_deg(lon_str)
+    style = int(style_str) if style_str else 1
+    
+    # Parse elevation - keep as string with unit (e.g., "504.0m" or "1654ft")
+    elev = elev_str if elev_str else None
+    
+    return Waypoint(
+        name=name,
+        latitude=lat,
+        longitude=lon,
+        code=code,
+        country=country,
+        elevation=elev,
+        style=style,
+        runway_direction=rwdir,
+        runway_length=rwlen,
+        runway_width=rwwidth,
+        frequency=freq,
+        description=desc
+    )
+
+
+def iter_cup_file(filepath: str, yield_errors: bool = False) -> Iterator[Union[Waypoint, RowError]]:
+    """
+    Lazily parse a CUP file, yielding one Waypoint per data row.
+    
+    Rows are read through a buffered reader, so memory use does not grow
+    with file size.
+    
+    Args:
+        filepath: Path to the CUP file
+        yield_errors: If True, yield a RowError for each invalid row instead
+            of printing it and skipping the row
+        
+    Yields:
+        Waypoint objects (and RowError objects if yield_errors is set)
+    """
+    with open(filepath, 'r', newline='', encoding='utf-8') as f:
+        yield from iter_cup_stream(f, yield_errors)
+
+
+def iter_cup_stream(f: TextIO, yield_errors: bool = False) -> Iterator[Union[Waypoint, RowError]]:
+    """
+    Lazily parse CUP data from an open text stream (see iter_cup_file()).
+    
+    Args:
+        f: Text stream opened with ``newline=''``
+        yield_errors: If True, yield a RowError for each invalid row
+    
+    Yields:
+        Waypoint objects (and RowError objects if yield_errors is set)
+    """
+    for line_num, parts in _tokenize_cup_rows(f):
+        try:
+            yield _waypoint_from_cup_fields(parts)
+        except Exception as e:
+            if yield_errors:
+                yield RowError(line_num, ','.join(parts), str(e))
+            else:
+                print(f"Error parsing line {line_num}: {','.join(parts)}\nError: {e}")
 
 
 def parse_cup_file(filepath: str) -> List[Waypoint]:
     """
     Parse a CUP file and return list of Waypoint objects.
     
+    Large files are parsed once and then loaded from the parse cache (see
+    parse_cache.py) for as long as they do not change.
+    
     Args:
         filepath: Path to the CUP file
         
     Returns:
         List of Waypoint objects
     """
-    waypoints = []
-    
-    with open(filepath, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    # Skip header line
-    for line_num, line in enumerate(lines[1:], start=2):
-        line = line.strip()
-        if not line:
-            continue
+    with perf.timer("cup.parse"):
+        cache = get_default_parse_cache()
+        if cache is None or not cache.accepts(os.path.getsize(filepath)):
+            return list(iter_cup_file(filepath))
         
-        # Parse CSV line respecting quoted fields
-        parts = []
-        current = []
-        in_quotes = False
+        cached = cache.load(filepath)
+        if cached is not None:
+            perf.count("cup.parse_cache_hits")
+            waypoints, errors = cached
+            for line_num, text, error in errors:
+                print(f"Error parsing line {line_num}: {text}\nError: {error}")
+            return waypoints
         
-        for char in line:
-            if char == '"':
-                in_quotes = not in_quotes
-            elif char == ',' and not in_quotes:
-                parts.append(''.join(current).strip().strip('"'))
-                current = []
+        # Parsed from the bytes that are hashed, so the entry matches what was read
+        with open(filepath, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        waypoints = []
+        errors = []
+        for item in iter_cup_stream(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', newline=''),
+                                    yield_errors=True):
+            if isinstance(item, RowError):
+                print(f"Error parsing line {item.line_num}: {item.text}\nError: {item.error}")
+                errors.append((item.line_num, item.text, item.error))
             else:
-                current.append(char)
-        parts.append(''.join(current).strip().strip('"'))
-        
-        # Ensure we have enough fields
-        while len(parts) < 12:
-            parts.append('')
+                waypoints.append(item)
+        cache.store(filepath, stat, content_digest(data).digest(), waypoints, errors)
+        return waypoints
+
+
+def _quote(value: str) -> str:
+    """Quote a CUP field, doubling embedded quotes (``"`` -> ``""``)."""
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _quote_if_needed(value: str) -> str:
+    """Quote a CUP field only if it contains a comma, a quote or a line break."""
+    return _quote(value) if value and _NEEDS_QUOTES.search(value) else value
+
+
+def _format_cup_row(waypoint: Waypoint, elev_str: str) -> str:
+    """
+    Format a waypoint as one CUP data row.
+    
+    Args:
+        waypoint: Waypoint to format
+        elev_str: Elevation with unit (e.g., "504.0m")
         
-        name, code, country, lat_str, lon_str, elev_str, style_str, rwdir, rwlen, rwwidth, freq, desc = parts[:12]
+    Returns:
+        CUP row without line terminator
+    """
+    # Use description as-is (preserve empty descriptions)
+    desc = waypoint.description if waypoint.description else ""
+    
+    # Convert coordinates to DDMM format
+    lat_str = deg_to_ddmm(waypoint.latitude, True)
+    lon_str = deg_to_ddmm(waypoint.longitude, False)
+    
+    # Format code and country (use defaults if empty)
+    code = _quote_if_needed(waypoint.code) if waypoint.code else ""
+    country = _quote_if_needed(waypoint.country) if waypoint.country else ""
+    
+    # Format runway information
+    rwdir = _quote_if_needed(waypoint.runway_direction) if waypoint.runway_direction else ""
+    rwlen = _quote_if_needed(waypoint.runway_length) if waypoint.runway_length else ""
+    rwwidth = _quote_if_needed(waypoint.runway_width) if waypoint.runway_width else ""
+    
+    # Format frequency - quote text, and numbers only if they need it (decimal comma)
+    freq = waypoint.frequency if waypoint.frequency else ""
+    if freq and not freq.replace('.', '').replace(',', '').isdigit():
+        freq_formatted = _quote(freq)  # Quote if it's text
+    else:
+        freq_formatted = _quote_if_needed(freq)
+    
+    # Format description - only quote if not empty
+    if desc:
+        desc_formatted = _quote(desc)
+    else:
+        desc_formatted = ''
+    
+    # Build row - Quote fields that may contain special characters
+    return (
+        f'{_quote(waypoint.name)},'
+        f'{code},'
+        f'{country},'
+        f'{lat_str},'
+        f'{lon_str},'
+        f'{_quote_if_needed(elev_str)},'
+        f'{waypoint.style},'
+        f'{rwdir},'
+        f'{rwlen},'
+        f'{rwwidth},'
+        f'{freq_formatted},'
+        f'{desc_formatted}'
+    )
+
+
+def _has_elevation(waypoint: Waypoint) -> bool:
+    """Check whether a waypoint already carries an elevation value."""
+    return waypoint.elevation is not None and waypoint.elevation != ""
+
+
+def _format_elevation(waypoint: Waypoint) -> str:
+    """Format an existing elevation value, defaulting to meters if it has no unit."""
+    # Elevation already has unit, use as-is
+    elev_str = str(waypoint.elevation)
+    # Ensure it has a unit
+    if not any(unit in elev_str.lower() for unit in ['m', 'ft']):
+        elev_str = f"{elev_str}m"  # Default to meters if no unit
+    return elev_str
+
+
+def _iter_with_elevations(waypoints: Iterable[Waypoint], batch_size: int,
+                          report: CupWriteResult,
+                          deadline: Optional[float]) -> Iterator[Tuple[Waypoint, str]]:
+    """
+    Pair each waypoint with its formatted elevation, fetching missing ones in batches.
+    
+    Waypoints are buffered until enough of them lack an elevation to keep
+    every resolver worker busy with a full batch (or the input ends), then
+    the missing elevations are resolved concurrently and the buffered
+    waypoints are released in their original order.
+    Elevations that cannot be resolved are left empty and recorded in report.
+    
+    Args:
+        waypoints: Iterable of Waypoint objects
+        batch_size: Maximum number of locations per elevation request
+        report: Write summary updated with fetch statistics
+        deadline: time.monotonic() value after which no more lookups are made
         
-        try:
-            lat = ddmm_to_deg(lat_str)
-            lon = ddmm_to_deg(lon_str)
-            style = int(style_str) if style_str else 1
-            
-            # Parse elevation - keep as string with unit
-            elev = None
-            if elev_str:
-                elev = elev_str.strip()  # Keep as-is with unit (e.g., "504.0m" or "1654ft")
-            
-            waypoint = Waypoint(
-                name=name,
-                latitude=lat,
-                longitude=lon,
-                code=code,
-                country=country,
-                elevation=elev,
-                style=style,
-                runway_direction=rwdir,
-                runway_length=rwlen,
-                runway_width=rwwidth,
-                frequency=freq,
-                description=desc
-            )
-            waypoints.append(waypoint)
-        except Exception as e:
-            print(f"Error parsing line {line_num}: {line}\nError: {e}")
-            continue
+    Yields:
+        Tuples of (waypoint, elevation string with unit or "")
+    """
+    pending = []
+    missing = []
+    window = batch_size * get_default_resolver().max_concurrency
+    
+    def flush():
+        budget = None if deadline is None else max(0.0, deadline - time.monotonic())
+        result = resolve_elevations(missing, batch_size, time_budget=budget)
+        report.elevation_time += result.elapsed
+        report.budget_exhausted = report.budget_exhausted or result.budget_exhausted
+        for waypoint in pending:
+            if _has_elevation(waypoint):
+                yield waypoint, _format_elevation(waypoint)
+                continue
+            elevation = result.get((waypoint.latitude, waypoint.longitude))
+            if elevation is None:
+                report.unresolved.append(waypoint)
+                yield waypoint, ""
+            else:
+                report.fetched += 1
+                yield waypoint, f"{elevation:.1f}m"
+        pending.clear()
+        missing.clear()
     
-    return waypoints
+    for waypoint in waypoints:
+        if not pending and _has_elevation(waypoint):
+            # Nothing waiting on a lookup, so write straight through
+            yield waypoint, _format_elevation(waypoint)
+            continue
+        pending.append(waypoint)
+        if not _has_elevation(waypoint):
+            missing.append((waypoint.latitude, waypoint.longitude))
+            if len(missing) >= window:
+                yield from flush()
+    if pending:
+        yield from flush()
+
+
+def _iter_with_known_elevations(waypoints: Iterable[Waypoint], elevations: Mapping[Tuple[float, float], float],
+                                report: CupWriteResult) -> Iterator[Tuple[Waypoint, str]]:
+    """Pair each waypoint with its elevation, taking missing ones from already resolved elevations."""
+    for waypoint in waypoints:
+        if _has_elevation(waypoint):
+            yield waypoint, _format_elevation(waypoint)
+            continue
+        elevation = elevations.get((waypoint.latitude, waypoint.longitude))
+        if elevation is None:
+            report.unresolved.append(waypoint)
+            yield waypoint, ""
+        else:
+            report.fetched += 1
+            yield waypoint, f"{elevation:.1f}m"
 
 
-def write_cup_file(filepath: str, waypoints: List[Waypoint], fetch_elevation: bool = True) -> None:
+def write_cup_file(filepath: str, waypoints: Iterable[Waypoint], fetch_elevation: bool = True,
+                   batch_size: int = ELEVATION_BATCH_SIZE,
+                   time_budget: Optional[float] = ELEVATION_TIME_BUDGET,
+                   elevations: Optional[Mapping[Tuple[float, float], float]] = None) -> CupWriteResult:
     """
     Write waypoints to CUP file format.
     
+    Rows are written as the iterable is consumed, so a generator such as
+    iter_cup_file() can be written without holding every waypoint in memory.
+    Missing elevations are collected and fetched in batches rather than with
+    one request per waypoint. Elevations that cannot be fetched (API down,
+    time budget used up) are written empty and listed in the result.
+    
+    The file is replaced atomically (see atomic_write()), so an error or a
+    crash while writing never leaves a truncated file behind.
+    
     Args:
         filepath: Path to save the CUP file
-        waypoints: List of Waypoint objects to save
+        waypoints: Iterable of Waypoint objects to save
         fetch_elevation: Whether to fetch elevation from API if not present
+            (if not, missing elevations are written empty)
+        batch_size: Maximum number of locations per elevation request
+        time_budget: Maximum seconds spent fetching elevations, or None for no limit
+        elevations: Elevations already resolved by (latitude, longitude); if
+            given, nothing is fetched and waypoints missing from it are
+            written without elevation
+        
+    Returns:
+        CupWriteResult with row count and any waypoints left without elevation
     """
-    rows = ["name,code,country,lat,lon,elev,style,rwdir,rwlen,rwwidth,freq,desc"]
+    report = CupWriteResult()
+    if elevations is not None:
+        rows = _iter_with_known_elevations(waypoints, elevations, report)
+    elif fetch_elevation:
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        rows = _iter_with_elevations(waypoints, batch_size, report, deadline)
+    else:
+        rows = ((waypoint, _format_elevation(waypoint) if _has_elevation(waypoint) else "")
+                for waypoint in waypoints)
     
-    for waypoint in waypoints:
-        # Get or fetch elevation
-        if waypoint.elevation is not None and waypoint.elevation != "":
-            # Elevation already has unit, use as-is
-            elev_str = str(waypoint.elevation)
-            # Ensure it has a unit
-            if not any(unit in elev_str.lower() for unit in ['m', 'ft']):
-                elev_str = f"{elev_str}m"  # Default to meters if no unit
-        elif fetch_elevation:
-            # Fetch elevation and add default unit (meters)
-            elev_value = get_elevation(waypoint.latitude, waypoint.longitude)
-            elev_str = f"{elev_value:.1f}m"
-        else:
-            elev_str = "0.0m"
-        
-        # Use description as-is (preserve empty descriptions)
-        desc = waypoint.description if waypoint.description else ""
-        
-        # Convert coordinates to DDMM format
-        lat_str = deg_to_ddmm(waypoint.latitude, True)
-        lon_str = deg_to_ddmm(waypoint.longitude, False)
-        
-        # Format code and country (use defaults if empty)
-        code = waypoint.code if waypoint.code else ""
-        country = waypoint.country if waypoint.country else ""
-        
-        # Format runway information
-        rwdir = waypoint.runway_direction if waypoint.runway_direction else ""
-        rwlen = waypoint.runway_length if waypoint.runway_length else ""
-        rwwidth = waypoint.runway_width if waypoint.runway_width else ""
-        
-        # Format frequency - only quote if it's empty or contains non-numeric text
-        freq = waypoint.frequency if waypoint.frequency else ""
-        if freq and not freq.replace('.', '').replace(',', '').isdigit():
-            freq_formatted = f'"{freq}"'  # Quote if it's text
-        else:
-            freq_formatted = freq  # Don't quote numeric frequencies
+    start = time.monotonic()
+    with atomic_write(filepath) as f:
+        f.write("name,code,country,lat,lon,elev,style,rwdir,rwlen,rwwidth,freq,desc")
+        for waypoint, elev_str in rows:
+            f.write("\n")
+            f.write(_format_cup_row(waypoint, elev_str))
+            report.rows += 1
+    # Lookups made while writing are counted as elevation time
+    report.write_time = time.monotonic() - start - report.elevation_time
+    perf.record("cup.write", report.write_time)
+    perf.count("cup.rows_written", report.rows)
+    
+    if report.unresolved:
+        print(f"Elevation unavailable for {len(report.unresolved)} waypoint(s); left empty")
+    return report
+
+
+def _waypoint_from_csv_row(row: dict) -> Waypoint:
+    """
+    Build a Waypoint from one CSV row as read by csv.DictReader.
+    
+    Args:
+        row: Mapping of CSV column names to values
         
-        # Format description - only quote if not empty
-        if desc:
-            desc_formatted = f'"{desc}"'
-        else:
-            desc_formatted = ''
+    Returns:
+        Waypoint object
+    """
+    return Waypoint(
+        name=row.get('name', ''),
+        latitude=float(row['latitude']),
+        longitude=float(row['longitude']),
+        code=row.get('code', ''),
+        country=row.get('country', ''),
+        elevation=row.get('elevation', None) if row.get('elevation') else None,
+        style=int(row.get('style', 1)),
+        runway_direction=row.get('runway_direction', ''),
+        runway_length=row.get('runway_length', ''),
+        runway_width=row.get('runway_width', ''),
+        frequency=row.get('frequency', ''),
+        description=row.get('description', '')
+    )
+
+
+def iter_csv_file(filepath: str, yield_errors: bool = False) -> Iterator[Union[Waypoint, RowError]]:
+    """
+    Lazily parse a CSV file, yielding one Waypoint per data row.
+    
+    Args:
+        filepath: Path to the CSV file
+        yield_errors: If True, yield a RowError for each invalid row instead
+            of printing it and skipping the row
         
-        # Build row - Quote fields that may contain special characters
-        row = (
-            f'"{waypoint.name}",'
-            f'{code},'
-            f'{country},'
-            f'{lat_str},'
-            f'{lon_str},'
-            f'{elev_str},'
-            f'{waypoint.style},'
-            f'{rwdir},'
-            f'{rwlen},'
-            f'{rwwidth},'
-            f'{freq_formatted},'
-            f'{desc_formatted}'
-        )
-        rows.append(row)
-    
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write("\n".join(rows))
+    Yields:
+        Waypoint objects (and RowError objects if yield_errors is set)
+    """
+    with open(filepath, newline='', encoding='utf-8') as csvfile:
+        yield from iter_csv_stream(csvfile, yield_errors)
+
+
+def iter_csv_stream(f: TextIO, yield_errors: bool = False) -> Iterator[Union[Waypoint, RowError]]:
+    """
+    Lazily parse CSV data from an open text stream (see iter_csv_file()).
+    
+    Args:
+        f: Text stream opened with ``newline=''``
+        yield_errors: If True, yield a RowError for each invalid row
+    
+    Yields:
+        Waypoint objects (and RowError objects if yield_errors is set)
+    """
+    reader = csv.DictReader(f)
+    for row_num, row in enumerate(reader, start=2):
+        try:
+            yield _waypoint_from_csv_row(row)
+        except (ValueError, KeyError) as e:
+            if yield_errors:
+                yield RowError(row_num, str(row), str(e))
+            else:
+                print(f"Skipping invalid CSV row {row_num}: {row}, Error: {e}")
 
 
 def parse_csv_file(filepath: str) -> List[Waypoint]:
@@ -193,43 +524,19 @@ def parse_csv_file(filepath: str) -> List[Waypoint]:
     Returns:
         List of Waypoint objects
     """
-    waypoints = []
-    
-    with open(filepath, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row_num, row in enumerate(reader, start=2):
-            try:
-                waypoint = Waypoint(
-                    name=row.get('name', ''),
-                    latitude=float(row['latitude']),
-                    longitude=float(row['longitude']),
-                    code=row.get('code', ''),
-                    country=row.get('country', ''),
-                    elevation=row.get('elevation', None) if row.get('elevation') else None,
-                    style=int(row.get('style', 1)),
-                    runway_direction=row.get('runway_direction', ''),
-                    runway_length=row.get('runway_length', ''),
-                    runway_width=row.get('runway_width', ''),
-                    frequency=row.get('frequency', ''),
-                    description=row.get('description', '')
-                )
-                waypoints.append(waypoint)
-            except (ValueError, KeyError) as e:
-                print(f"Skipping invalid CSV row {row_num}: {row}, Error: {e}")
-                continue
-    
-    return waypoints
+    with perf.timer("csv.parse"):
+        return list(iter_csv_file(filepath))
 
 
-def write_csv_file(filepath: str, waypoints: List[Waypoint]) -> None:
+def write_csv_file(filepath: str, waypoints: Iterable[Waypoint]) -> None:
     """
     Write waypoints to CSV file.
     
     Args:
         filepath: Path to save the CSV file
-        waypoints: List of Waypoint objects to save
+        waypoints: Iterable of Waypoint objects to save
     """
-    with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
+    with perf.timer("csv.write"), atomic_write(filepath, newline='') as csvfile:
         fieldnames = [
             'name', 'code', 'country', 'latitude', 'longitude', 'elevation', 
             'style', 'runway_direction', 'runway_length', 'runway_width', 
@@ -1,6 +1,23 @@
 """GUI package for Soaring CUP Editor."""
 
-from .main_window import MainWindow
-from .dialogs import WaypointDialog
+# Loaded on first use (PEP 562), so that importing a submodule does not
+# build the whole main window
+_LAZY = {
+    'MainWindow': '.main_window',
+    'WaypointDialog': '.dialogs',
+}
 
 __all__ = ['MainWindow', 'WaypointDialog']
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        from importlib import import_module
+        value = getattr(import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
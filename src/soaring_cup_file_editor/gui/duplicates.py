@@ -0,0 +1,175 @@
+"""Dialog for reviewing and merging near-duplicate waypoints."""
+
+import tkinter as tk
+from contextlib import nullcontext
+from tkinter import messagebox, ttk
+from typing import Callable, Dict, List, Optional
+
+from ..collection import WaypointCollection
+from ..dedupe import DuplicateGroup, find_duplicates, merge_group
+from ..history import UndoHistory
+
+
+class DuplicatesDialog:
+    """Lists groups of probable duplicates and merges the chosen ones."""
+    
+    def __init__(self, parent: tk.Tk, collection: WaypointCollection,
+                 groups: Optional[List[DuplicateGroup]] = None,
+                 on_merged: Optional[Callable[[], None]] = None,
+                 on_show: Optional[Callable[[int], None]] = None,
+                 history: Optional[UndoHistory] = None):
+        """
+        Initialize the duplicates dialog.
+        
+        Args:
+            parent: Parent window
+            collection: Waypoints to check
+            groups: Already computed groups (found here if None)
+            on_merged: Callback after groups were merged
+            on_show: Callback with a row id to show a waypoint in the main list
+            history: Undo history in which each merge becomes one step
+        """
+        self.parent = parent
+        self.collection = collection
+        self.on_merged = on_merged
+        self.on_show = on_show
+        self.history = history
+        self.groups: Dict[str, DuplicateGroup] = {}
+        # Row ids are only meaningful for the store they were found in
+        self.store = collection.store
+        
+        if groups is None:
+            parent.config(cursor='watch')
+            parent.update_idletasks()
+            try:
+                groups = find_duplicates(collection)
+            finally:
+                parent.config(cursor='')
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Find Duplicates")
+        self.dialog.geometry("800x450")
+        self.dialog.transient(parent)
+        
+        self._create_widgets()
+        self._fill(groups)
+        
+        self.dialog.bind('<Escape>', lambda e: self.dialog.destroy())
+    
+    def _create_widgets(self):
+        """Create dialog widgets."""
+        self.summary = tk.Label(self.dialog, anchor='w')
+        self.summary.pack(fill=tk.X, padx=10, pady=(10, 0))
+        
+        frame = tk.Frame(self.dialog)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        columns = ("Code", "Latitude", "Longitude", "Distance", "Score")
+        self.tree = ttk.Treeview(frame, columns=columns, show='tree headings')
+        self.tree.heading("#0", text="Name")
+        self.tree.column("#0", width=280)
+        for column, width in zip(columns, (70, 100, 100, 90, 60)):
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=width)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind('<Double-Button-1>', lambda e: self._show_selected())
+        
+        button_frame = tk.Frame(self.dialog)
+        button_frame.pack(pady=(0, 10))
+        tk.Button(button_frame, text="Merge Selected", command=self._merge_selected, width=14).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Merge All", command=self._merge_all, width=14).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Close", command=self.dialog.destroy, width=14).pack(side=tk.LEFT, padx=5)
+    
+    def _fill(self, groups: List[DuplicateGroup]):
+        """Show one parent item per group with its waypoints below it."""
+        for number, group in enumerate(groups):
+            group_iid = f"g{number}"
+            self.groups[group_iid] = group
+            first = self.collection.get(group.ids[0])
+            self.tree.insert('', tk.END, iid=group_iid, open=True,
+                             text=f"{first.name} ({len(group.ids)} waypoints)",
+                             values=("", "", "", "", f"{group.score:.2f}"))
+            for row_id in group.ids:
+                waypoint = self.collection.get(row_id)
+                distance = min((pair.distance_m for pair in group.pairs if row_id in (pair.first, pair.second)),
+                               default=0.0)
+                self.tree.insert(group_iid, tk.END, iid=f"{group_iid}:{row_id}", text=waypoint.name, values=(
+                    waypoint.code,
+                    f"{waypoint.latitude:.6f}",
+                    f"{waypoint.longitude:.6f}",
+                    f"{distance:.0f} m",
+                    ""
+                ))
+        self._update_summary()
+    
+    def _update_summary(self):
+        count = len(self.groups)
+        if count:
+            self.summary.config(text=f"{count} group(s) of possible duplicates. Merging keeps the most "
+                                     f"complete waypoint and fills its empty fields from the others.")
+        else:
+            self.summary.config(text="No duplicates found.")
+    
+    def _selected_groups(self) -> List[str]:
+        """Group items of the selection (selecting a waypoint selects its group)."""
+        chosen = []
+        for iid in self.tree.selection():
+            group_iid = iid.split(':')[0]
+            if group_iid not in chosen:
+                chosen.append(group_iid)
+        return chosen
+    
+    def _check_current(self) -> bool:
+        """Close the dialog if another file was loaded since the search."""
+        if self.collection.store is self.store:
+            return True
+        messagebox.showinfo("Find Duplicates", "The waypoint list was replaced. Please search again.",
+                            parent=self.dialog)
+        self.dialog.destroy()
+        return False
+    
+    def _show_selected(self):
+        if not self._check_current():
+            return
+        selection = self.tree.selection()
+        if self.on_show and selection and ':' in selection[0]:
+            row_id = int(selection[0].split(':')[1])
+            if self.collection.contains_id(row_id):
+                self.on_show(row_id)
+    
+    def _merge(self, group_iids: List[str]):
+        """Merge the given groups into their first waypoint and remove the others."""
+        if not self._check_current():
+            return
+        merged_count = 0
+        # All groups merged at once are undone together
+        label = "Merge duplicates" if len(group_iids) == 1 else f"Merge {len(group_iids)} duplicate groups"
+        with self.history.group(label) if self.history else nullcontext():
+            for group_iid in group_iids:
+                group = self.groups.pop(group_iid)
+                self.tree.delete(group_iid)
+                row_ids = [row_id for row_id in group.ids if self.collection.contains_id(row_id)]
+                if len(row_ids) < 2:
+                    continue  # Already merged or deleted elsewhere
+                merged = merge_group([self.collection.get(row_id) for row_id in row_ids])
+                self.collection.update(row_ids[0], merged)
+                self.collection.remove(row_ids[1:])
+                merged_count += 1
+        self._update_summary()
+        if merged_count and self.on_merged:
+            self.on_merged()
+    
+    def _merge_selected(self):
+        group_iids = self._selected_groups()
+        if not group_iids:
+            messagebox.showwarning("No Selection", "Please select group(s) to merge", parent=self.dialog)
+            return
+        self._merge(group_iids)
+    
+    def _merge_all(self):
+        if not self.groups:
+            return
+        if messagebox.askyesno("Confirm Merge", f"Merge all {len(self.groups)} groups?", parent=self.dialog):
+            self._merge(list(self.groups))
@@ -1,14 +1,27 @@
 """Main window for the Soaring CUP File Editor."""
 
 import os
+import time
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from typing import List, Optional
+from typing import Optional
 
 from ..models import Waypoint
-from ..file_io import parse_cup_file, write_cup_file, parse_csv_file, write_csv_file
-from ..config import STYLE_OPTIONS
+from ..file_io import write_csv_file
+from ..collection import WaypointCollection, name_sort_key
+from ..config import ELEVATION_POLL_INTERVAL_MS, LOAD_POLL_INTERVAL_MS
+from ..loader import BackgroundLoader
+from ..saver import BackgroundSave, ELEVATION
+from ..journal import EditJournal, JournalContents, discard_journal, find_session_journal
+from ..history import UndoHistory
+from ..elevation import get_default_resolver
+from ..dedupe import find_duplicates
+from ..search import TextIndex
+from ..query import QueryEngine, QueryError
 from .dialogs import WaypointDialog
+from .waypoint_table import WaypointTable
+from .duplicates import DuplicatesDialog
+from .performance import PerformanceDialog
 
 
 class MainWindow:
@@ -25,7 +38,24 @@ class MainWindow:
         self.root.title("Soaring CUP File Editor")
         self.root.geometry("1200x600")  # Wider for more columns
         
-        self.waypoints: List[Waypoint] = []
+        self.waypoints = WaypointCollection()
+        # Built on the first search, then kept up to date with edits
+        self.text_index = TextIndex()
+        self.text_index.attach(self.waypoints)
+        self.query_engine = QueryEngine(self.waypoints, self.text_index)
+        self.last_query = None
+        self._search_pending = False
+        # File being loaded in the background, if any
+        self.loader: Optional[BackgroundLoader] = None
+        # File being saved in the background, if any
+        self.saver: Optional[BackgroundSave] = None
+        # Counts edits, so a save only marks the file saved if nothing changed meanwhile
+        self._revision = 0
+        # Unsaved edits are journaled next to the file for crash recovery
+        self.journal = EditJournal()
+        self.journal.attach(self.waypoints)
+        self.history = UndoHistory()
+        self.history.attach(self.waypoints)
         self.cup_file_path: Optional[str] = None
         self.modified = False
         
@@ -34,6 +64,7 @@ class MainWindow:
         
         self._create_widgets()
         self._update_title()
+        self.root.after_idle(self._offer_recovery)
     
     def _create_widgets(self):
         """Create all GUI widgets."""
@@ -64,43 +95,142 @@ class MainWindow:
         tk.Button(button_frame, text="Edit Selected", command=self._edit_point).grid(row=0, column=9, padx=5)
         tk.Button(button_frame, text="Remove Selected", command=self._remove_selected).grid(row=0, column=10, padx=5)
         
-        # Tree view with extended columns
-        columns = ("Name", "Code", "Country", "Latitude", "Longitude", "Elevation", "Style", "Airfield")
-        self.tree = ttk.Treeview(
-            self.root, 
-            columns=columns, 
-            show='headings'
+        tk.Label(button_frame, text="|").grid(row=0, column=11, padx=5)
+        
+        tk.Button(button_frame, text="Find Duplicates", command=self._find_duplicates).grid(row=0, column=12, padx=5)
+        
+        tk.Label(button_frame, text="|").grid(row=0, column=13, padx=5)
+        
+        self.undo_btn = tk.Button(button_frame, text="Undo", command=self._undo, state=tk.DISABLED)
+        self.undo_btn.grid(row=0, column=14, padx=5)
+        self.redo_btn = tk.Button(button_frame, text="Redo", command=self._redo, state=tk.DISABLED)
+        self.redo_btn.grid(row=0, column=15, padx=5)
+        
+        tk.Label(button_frame, text="|").grid(row=0, column=16, padx=5)
+        
+        tk.Button(button_frame, text="Performance", command=lambda: PerformanceDialog(self.root)).grid(
+            row=0, column=17, padx=5)
+        self.root.bind('<Control-z>', lambda e: self._undo())
+        self.root.bind('<Control-y>', lambda e: self._redo())
+        self.root.bind('<Control-Shift-Z>', lambda e: self._redo())
+        
+        # Filter bar: search-as-you-type text or a structured query
+        search_frame = tk.Frame(self.root)
+        search_frame.pack(padx=10, fill=tk.X)
+        tk.Label(search_frame, text="Filter:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(search_frame, textvariable=self.search_var, width=60)
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        tk.Button(search_frame, text="Clear", command=self._clear_search).pack(side=tk.LEFT)
+        tk.Button(search_frame, text="Query Help", command=self._show_query_help).pack(side=tk.LEFT, padx=5)
+        self.search_status = tk.Label(search_frame, anchor='w')
+        self.search_status.pack(side=tk.LEFT, padx=10)
+        self._status_fg = self.search_status.cget('fg')
+        self.search_var.trace_add('write', lambda *args: self._schedule_search())
+        self.search_entry.bind('<Escape>', lambda e: self._clear_search())
+        self.root.bind('<Control-f>', lambda e: self.search_entry.focus_set())
+        
+        # Progress of loading or saving, shown only while a file is loaded or saved
+        self.progress_frame = tk.Frame(self.root)
+        self.progress_bar = ttk.Progressbar(self.progress_frame, length=300, maximum=100)
+        self.progress_bar.pack(side=tk.LEFT)
+        self.progress_label = tk.Label(self.progress_frame, anchor='w')
+        self.progress_label.pack(side=tk.LEFT, padx=10)
+        self.progress_button = tk.Button(self.progress_frame, text="Cancel")
+        self.progress_button.pack(side=tk.RIGHT)
+        
+        # Waypoint table (virtualized for large files)
+        self.table = WaypointTable(
+            self.root,
+            heading_commands={"Name": self._sort_by_name},
+            on_activate=self._edit_point
         )
+        self.table.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        self.table.set_collection(self.waypoints)
+        # Subscribed after the text index, so searches see the change
+        self.waypoints.subscribe(self._on_waypoints_changed)
+    
+    def _schedule_search(self):
+        """Run the search once pending keystrokes and changes are processed."""
+        if not self._search_pending:
+            self._search_pending = True
+            self.root.after_idle(self._apply_search)
+    
+    def _on_waypoints_changed(self, event):
+        """Re-run an active search so edited and added waypoints are matched."""
+        if self.table.filtered:
+            self._schedule_search()
+    
+    def _update_undo_buttons(self):
+        """Enable Undo/Redo if there is something to undo or redo."""
+        self.undo_btn.config(state=tk.NORMAL if self.history.can_undo else tk.DISABLED)
+        self.redo_btn.config(state=tk.NORMAL if self.history.can_redo else tk.DISABLED)
+    
+    def _undo(self):
+        """Revert the last edit."""
+        if self._busy(editing=True) or not self.history.can_undo:
+            return
+        self.history.undo()
+        self._mark_modified()
+    
+    def _redo(self):
+        """Apply the last undone edit again."""
+        if self._busy(editing=True) or not self.history.can_redo:
+            return
+        self.history.redo()
+        self._mark_modified()
+    
+    def _apply_search(self):
+        """Filter the table to the waypoints matching the filter text."""
+        self._search_pending = False
+        try:
+            result = self.query_engine.run(self.search_var.get()) if self.waypoints else None
+        except QueryError as e:
+            # Usually a query still being typed: keep the previous results
+            self.search_status.config(text=str(e), fg='red')
+            return
+        self.last_query = result
+        self.table.set_filter(None if result is None else result.ids)
+        if result is None:
+            self.search_status.config(text="", fg=self._status_fg)
+        else:
+            self.search_status.config(
+                text=f"{len(result)} of {len(self.waypoints)} waypoints ({result.elapsed * 1000:.1f} ms)",
+                fg=self._status_fg
+            )
+    
+    def _show_query_help(self):
+        """Explain the filter syntax and how the last query was run."""
+        message = (
+            "Type words to search names, codes and descriptions, or combine conditions:\n\n"
+            "  style IN (2, 4, 5) AND country = PL\n"
+            "  WITHIN 40km OF EPBK AND runway_length >= 600m\n"
+            "  elevation > 1000ft OR NOT (name ~ \"lotnisko\")\n\n"
+            "Operators: = != < <= > >= ~ (contains), IN (...), AND, OR, NOT.\n"
+            "Fields: name, code, country, style, latitude, longitude, elevation, "
+            "runway_direction, runway_length, runway_width, frequency, description."
+        )
+        if self.last_query is not None:
+            message += f"\n\nLast query:\n{self.last_query.summary()}"
+        messagebox.showinfo("Query Help", message)
+    
+    def _clear_search(self):
+        """Show all waypoints again."""
+        self.search_var.set("")
+        self._apply_search()
+    
+    def _show_waypoint(self, row_id: int):
+        """
+        Select a waypoint, clearing the search if it does not match.
         
-        # Configure headings and columns
-        self.tree.heading("Name", text="Name", command=self._sort_by_name)
-        self.tree.heading("Code", text="Code")
-        self.tree.heading("Country", text="Country")
-        self.tree.heading("Latitude", text="Latitude")
-        self.tree.heading("Longitude", text="Longitude")
-        self.tree.heading("Elevation", text="Elevation (m)")
-        self.tree.heading("Style", text="Type")
-        self.tree.heading("Airfield", text="Airfield")
-        
-        # Configure column widths
-        self.tree.column("Name", width=180)
-        self.tree.column("Code", width=60)
-        self.tree.column("Country", width=60)
-        self.tree.column("Latitude", width=100)
-        self.tree.column("Longitude", width=100)
-        self.tree.column("Elevation", width=80)
-        self.tree.column("Style", width=150)
-        self.tree.column("Airfield", width=80)
-        
-        # Scrollbar for tree
-        scrollbar = ttk.Scrollbar(self.root, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        
-        self.tree.pack(side=tk.LEFT, padx=(10, 0), pady=10, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, padx=(0, 10), pady=10, fill=tk.Y)
-        
-        # Double-click to edit
-        self.tree.bind('<Double-Button-1>', lambda e: self._edit_point())
+        Args:
+            row_id: Store row id of the waypoint
+        """
+        if self.table.filtered:
+            self._apply_search()
+            if not self.table.is_listed(row_id):
+                self._clear_search()
+        self.table.select_id(row_id)
     
     def _update_title(self):
         """Update window title to show filename and modified status."""
@@ -110,6 +240,8 @@ class MainWindow:
     
     def _mark_modified(self):
         """Mark the file as modified and update UI."""
+        self._revision += 1
+        self._update_undo_buttons()
         if not self.modified:
             self.modified = True
             self._update_title()
@@ -121,53 +253,37 @@ class MainWindow:
         self.modified = False
         self._update_title()
     
-    def _refresh_tree(self):
-        """Refresh the tree view with current waypoint data."""
-        self.tree.delete(*self.tree.get_children())
-        for waypoint in self.waypoints:
-            style_label = STYLE_OPTIONS.get(waypoint.style, 'Unknown')
-            
-            # Format elevation (now stored as string with unit)
-            elev_str = str(waypoint.elevation) if waypoint.elevation is not None else ""
-            
-            # Check if airfield (has runway or frequency info)
-            airfield_marker = "✓" if waypoint.is_airfield else ""
-            
-            self.tree.insert('', tk.END, values=(
-                waypoint.name,
-                waypoint.code,
-                waypoint.country,
-                f"{waypoint.latitude:.6f}",
-                f"{waypoint.longitude:.6f}",
-                elev_str,
-                style_label,
-                airfield_marker
-            ))
-    
-    def _select_waypoint_by_name(self, name: str):
+    def _busy(self, editing: bool = False) -> bool:
         """
-        Select and scroll to a waypoint by name.
+        Tell the user to wait if a file is still loading or saving.
         
         Args:
-            name: Name of the waypoint to select
+            editing: The action only edits waypoints, which is fine while saving
+        
+        Returns:
+            True if the action has to wait
         """
-        # Find the waypoint in the list
-        for i, waypoint in enumerate(self.waypoints):
-            if waypoint.name == name:
-                # Get the tree item at this index
-                children = self.tree.get_children()
-                if i < len(children):
-                    item_id = children[i]
-                    # Clear current selection
-                    self.tree.selection_remove(self.tree.selection())
-                    # Select and scroll to the item
-                    self.tree.selection_set(item_id)
-                    self.tree.see(item_id)
-                    self.tree.focus(item_id)
-                    break
+        if self.loader is not None:
+            messagebox.showwarning("Loading", "Please wait until loading has finished, or cancel it")
+            return True
+        if self.saver is not None and not editing:
+            messagebox.showwarning("Saving", "Please wait until saving has finished")
+            return True
+        return False
+    
+    def _show_progress(self, text: str, button_text: str, command):
+        """Show the progress bar with a button to cancel or skip the running task."""
+        self.progress_bar.config(value=0)
+        self.progress_label.config(text=text)
+        self.progress_button.config(text=button_text, command=command, state=tk.NORMAL)
+        self.progress_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 10))
     
     def _on_closing(self):
         """Handle window close event - check for unsaved changes."""
+        if self.saver is not None:
+            # The file is only replaced once it is completely written
+            messagebox.showwarning("Saving", "Please wait until saving has finished")
+            return
         if self.modified:
             response = messagebox.askyesnocancel(
                 "Unsaved Changes",
@@ -175,13 +291,64 @@ class MainWindow:
             )
             if response is None:  # Cancel
                 return
-            elif response:  # Yes - save
-                if not self._save_cup():
-                    return  # Save failed or was cancelled
+            elif response:  # Yes - save, then close once saved
+                self._save_cup(on_saved=self._close)
+                return
+        self._close()
+    
+    def _close(self):
+        """Stop background work and close the window."""
+        if self.loader is not None:
+            self.loader.cancel()
+        # Saved or deliberately not saved: nothing to recover
+        self.journal.discard()
         self.root.destroy()
     
+    def _offer_recovery(self):
+        """Offer to restore the edits of a session that ended without saving them."""
+        contents = find_session_journal()
+        self.journal.start()
+        if contents is None:
+            return
+        name = os.path.basename(contents.base_file) if contents.base_file else "Untitled"
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(contents.created))
+        if not messagebox.askyesno(
+            "Recover Unsaved Changes",
+            f"{len(contents.records)} unsaved change(s) to {name} from a session started "
+            f"{when} were found.\n\nRecover them?"
+        ):
+            discard_journal(contents.path)
+            return
+        if not contents.base_matches():
+            messagebox.showerror(
+                "Recover Unsaved Changes",
+                f"{name} was changed or removed since, so the changes cannot be applied to it. "
+                f"They were kept in {contents.path}."
+            )
+            return
+        if contents.base_file is None:
+            self._recover(contents)
+        else:
+            self._open_cup(contents.base_file, on_loaded=lambda: self._recover(contents))
+    
+    def _recover(self, contents: JournalContents):
+        """Replay a recovered journal onto the freshly loaded base file."""
+        # The recovered state is where undo starts from
+        self.history.pause()
+        try:
+            count = self.journal.replay(contents)
+        except Exception as e:
+            messagebox.showerror("Recover Unsaved Changes", f"Failed to recover the changes:\n{str(e)}")
+            return
+        finally:
+            self.history.resume()
+        self._mark_modified()
+        messagebox.showinfo("Recover Unsaved Changes", f"Recovered {count} unsaved change(s).")
+    
     def _new_file(self):
         """Create a new empty waypoint file."""
+        if self._busy():
+            return
         if self.modified:
             response = messagebox.askyesnocancel(
                 "Unsaved Changes",
@@ -189,50 +356,138 @@ class MainWindow:
             )
             if response is None:  # Cancel
                 return
-            elif response:  # Yes - save
-                if not self._save_cup():
-                    return  # Save failed or was cancelled
-        
-        # Clear everything and start fresh
-        self.waypoints = []
+            elif response:  # Yes - save, then start afresh once saved
+                self._save_cup(on_saved=self._clear_file)
+                return
+        self._clear_file()
+    
+    def _clear_file(self):
+        """Clear everything and start fresh."""
+        self.waypoints.reset()
+        self.journal.start()
+        self._update_undo_buttons()
         self.cup_file_path = None
         self.modified = False
-        self._refresh_tree()
         self._update_title()
         self.save_btn.config(state=tk.DISABLED)
         self.save_as_btn.config(state=tk.DISABLED)
     
     def _sort_by_name(self):
-        """Sort waypoints by name."""
-        self.waypoints.sort(key=lambda w: w.name.lower())
-        self._refresh_tree()
-        self._mark_modified()
+        """Sort waypoints by name (the list is kept sorted; this re-sorts from scratch)."""
+        self.waypoints.set_sort_key(name_sort_key)
+    
+    def _start_loading(self, loader: BackgroundLoader, on_finished):
+        """
+        Show the progress bar and add parsed chunks as they arrive.
+        
+        Args:
+            loader: Running background loader
+            on_finished: Callback with the loader once it finished, failed or was cancelled
+        """
+        self.loader = loader
+        self._show_progress(f"Reading {os.path.basename(loader.filepath)}...", "Cancel", self._cancel_loading)
+        self.root.after(LOAD_POLL_INTERVAL_MS, lambda: self._poll_loading(on_finished))
+    
+    def _poll_loading(self, on_finished):
+        """Add the waypoints parsed since the last poll and update the progress bar."""
+        loader = self.loader
+        if not loader.cancelled:
+            waypoints = loader.take()
+            if waypoints:
+                # Merged into the sorted list, so the first rows show up right away
+                self.waypoints.extend(waypoints)
+            if not loader.done:
+                read, total = loader.progress
+                self.progress_bar.config(value=100 * read / total if total else 100)
+                self.progress_label.config(
+                    text=f"{loader.rows:,} waypoints, {loader.rows_per_second:,.0f} rows/s"
+                )
+                self.root.after(LOAD_POLL_INTERVAL_MS, lambda: self._poll_loading(on_finished))
+                return
+        self.loader = None
+        self.progress_frame.pack_forget()
+        on_finished(loader)
+    
+    def _cancel_loading(self):
+        """Stop the file being loaded."""
+        if self.loader is not None:
+            self.loader.cancel()
+    
+    @staticmethod
+    def _skipped_rows(loader: BackgroundLoader) -> str:
+        """Describe the rows a loader could not parse."""
+        if not loader.errors:
+            return ""
+        lines = "\n".join(f"Line {error.line_num}: {error.error}" for error in loader.errors[:5])
+        more = "\n..." if len(loader.errors) > 5 else ""
+        return f"\n\nSkipped {len(loader.errors)} invalid row(s):\n{lines}{more}"
     
     def _load_cup(self):
-        """Load waypoints from a CUP file."""
+        """Load waypoints from a CUP file in the background."""
+        if self._busy():
+            return
         filepath = filedialog.askopenfilename(
             filetypes=[("CUP Files", "*.cup"), ("All Files", "*.*")]
         )
         if not filepath:
             return
+        self._open_cup(filepath)
+    
+    def _open_cup(self, filepath: str, on_loaded=None):
+        """
+        Load a CUP file in the background, replacing the current waypoints.
         
+        Args:
+            filepath: Path of the CUP file
+            on_loaded: Callback once loaded, instead of the "Loaded" message
+        """
         try:
-            self.waypoints = parse_cup_file(filepath)
-            # Sort by name automatically after loading
-            self.waypoints.sort(key=lambda w: w.name.lower())
-            self.cup_file_path = filepath
-            self.modified = False
-            self._refresh_tree()
-            self._update_title()
-            messagebox.showinfo(
-                "Loaded", 
-                f"Loaded {len(self.waypoints)} waypoints from {os.path.basename(filepath)}"
-            )
+            loader = BackgroundLoader(filepath, 'cup')
         except Exception as e:
             messagebox.showerror("Load Error", f"Failed to load file:\n{str(e)}")
+            return
+        
+        # Restored if loading fails or is cancelled
+        previous = (self.waypoints.store, self.cup_file_path, self.modified)
+        self._clear_search()
+        self.journal.pause()
+        self.history.pause()
+        self.waypoints.reset()
+        self.cup_file_path = filepath
+        self.modified = False
+        self._update_title()
+        
+        def on_finished(loader: BackgroundLoader):
+            if loader.cancelled or loader.error:
+                store, self.cup_file_path, self.modified = previous
+                self.waypoints.reset(store)
+                self.journal.resume()
+                self.history.resume()
+                self._update_title()
+                if loader.error:
+                    messagebox.showerror("Load Error", f"Failed to load file:\n{str(loader.error)}")
+                return
+            self.text_index.build()
+            self.journal.start(filepath)
+            self.history.resume()
+            self.history.clear()
+            self._update_undo_buttons()
+            if on_loaded:
+                on_loaded()
+                return
+            messagebox.showinfo(
+                "Loaded",
+                f"Loaded {len(self.waypoints)} waypoints from {os.path.basename(filepath)} "
+                f"in {loader.elapsed:.1f} s{' (parse cache)' if loader.from_cache else ''}"
+                f"{self._skipped_rows(loader)}"
+            )
+        
+        self._start_loading(loader, on_finished)
     
     def _import_csv(self):
-        """Import waypoints from CSV file."""
+        """Import waypoints from a CSV file in the background."""
+        if self._busy():
+            return
         filepath = filedialog.askopenfilename(
             filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")]
         )
@@ -240,21 +495,69 @@ class MainWindow:
             return
         
         try:
-            imported = parse_csv_file(filepath)
-            self.waypoints.extend(imported)
-            # Sort by name automatically after importing
-            self.waypoints.sort(key=lambda w: w.name.lower())
-            self._refresh_tree()
-            self._mark_modified()
-            messagebox.showinfo(
-                "Imported", 
-                f"Imported {len(imported)} waypoints from {os.path.basename(filepath)}"
-            )
+            loader = BackgroundLoader(filepath, 'csv')
         except Exception as e:
             messagebox.showerror("Import Error", f"Failed to import file:\n{str(e)}")
+            return
+        
+        # Rows added from here on are the imported ones (row ids only grow)
+        store = self.waypoints.store
+        first_id = store.next_row_id
+        # The whole import is undone at once; dropped again if rolled back
+        self.history.begin(f"Import {os.path.basename(filepath)}")
+        
+        def on_finished(loader: BackgroundLoader):
+            if loader.cancelled or loader.error:
+                self.waypoints.remove([row_id for row_id in range(first_id, store.next_row_id)
+                                       if store.contains_id(row_id)])
+                self.history.end(discard=True)
+                self._update_undo_buttons()
+                if loader.error:
+                    messagebox.showerror("Import Error", f"Failed to import file:\n{str(loader.error)}")
+                return
+            self.text_index.build()
+            self.history.end()
+            self._mark_modified()
+            self._report_import(filepath, loader)
+        
+        self._start_loading(loader, on_finished)
+    
+    def _report_import(self, filepath: str, loader: BackgroundLoader):
+        """Show what was imported and offer to review duplicates."""
+        imported = loader.rows
+        message = (f"Imported {imported} waypoints from {os.path.basename(filepath)}"
+                   f"{self._skipped_rows(loader)}")
+        groups = find_duplicates(self.waypoints) if imported else []
+        if groups:
+            # Merging files often brings in the same place twice
+            if messagebox.askyesno(
+                "Imported",
+                f"{message}\n\nFound {len(groups)} group(s) of possible duplicates. Review them now?"
+            ):
+                self._find_duplicates(groups)
+        else:
+            messagebox.showinfo("Imported", message)
+    
+    def _find_duplicates(self, groups=None):
+        """
+        Show the near-duplicate waypoints and let the user merge them.
+        
+        Args:
+            groups: Already computed duplicate groups (searched if None)
+        """
+        if self._busy(editing=True):
+            return
+        if not self.waypoints:
+            messagebox.showwarning("No Data", "No waypoints to check")
+            return
+        DuplicatesDialog(self.root, self.waypoints, groups=groups,
+                         on_merged=self._mark_modified, on_show=self._show_waypoint,
+                         history=self.history)
     
     def _export_csv(self):
         """Export current waypoints to CSV file."""
+        if self._busy(editing=True):
+            return
         if not self.waypoints:
             messagebox.showwarning("No Data", "No waypoints to export")
             return
@@ -277,66 +580,93 @@ class MainWindow:
     
     def _add_point(self):
         """Show dialog to add a new waypoint."""
+        if self._busy(editing=True):
+            return
         def on_save(waypoint: Waypoint):
+            # Inserted at its sorted position
+            row_id = self.waypoints.add(waypoint)
+            self._mark_modified()
+            # Select the newly added waypoint
+            self._show_waypoint(row_id)
             # Fetch elevation if not provided
             if waypoint.elevation is None:
-                from ..file_io import get_elevation
-                waypoint.elevation = get_elevation(waypoint.latitude, waypoint.longitude)
-            
-            self.waypoints.append(waypoint)
-            # Sort by name after adding
-            self.waypoints.sort(key=lambda w: w.name.lower())
-            self._refresh_tree()
-            self._mark_modified()
-            # Find and select the newly added waypoint
-            self._select_waypoint_by_name(waypoint.name)
+                self._fill_elevation(row_id)
         
         dialog = WaypointDialog(self.root, on_save=on_save)
         dialog.show()
     
+    def _fill_elevation(self, row_id: int, overwrite: bool = False):
+        """
+        Look up a waypoint's elevation in the background and show it when ready.
+        
+        The lookup runs on the shared elevation resolver and is polled from
+        the Tk event loop, so the window stays responsive while it runs.
+        
+        Args:
+            row_id: Store row id of the waypoint to fill in
+            overwrite: Replace an elevation the waypoint already has
+        """
+        store = self.waypoints.store
+        waypoint = store.get(row_id)
+        coord = (waypoint.latitude, waypoint.longitude)
+        job = get_default_resolver().submit([coord])
+        
+        def poll():
+            if not job.done():
+                self.root.after(ELEVATION_POLL_INTERVAL_MS, poll)
+                return
+            elevation = job.wait().get(coord)
+            if elevation is None:
+                return  # Left empty; fetched again when saving
+            if store is not self.waypoints.store or not store.contains_id(row_id):
+                return  # Removed or another file loaded in the meantime
+            current = store.get(row_id)
+            if (current.latitude, current.longitude) == coord and (overwrite or current.elevation is None):
+                current.elevation = f"{elevation:.1f}m"
+                self.waypoints.update(row_id, current)
+        
+        self.root.after(ELEVATION_POLL_INTERVAL_MS, poll)
+    
     def _edit_point(self):
         """Edit the selected waypoint."""
-        selected = self.tree.selection()
+        if self._busy(editing=True):
+            return
+        selected = self.table.selected_ids()
         if not selected:
             messagebox.showwarning("No Selection", "Please select a waypoint to edit")
             return
         
-        item = selected[0]
-        # Get the index of the selected item in the tree
-        tree_children = self.tree.get_children()
-        tree_index = tree_children.index(item)
-        
-        # Use the tree index to get the corresponding waypoint
-        if 0 <= tree_index < len(self.waypoints):
-            original_waypoint = self.waypoints[tree_index]
-            # Store original coordinates for comparison
-            original_lat = original_waypoint.latitude
-            original_lon = original_waypoint.longitude
-            
-            def on_save(waypoint: Waypoint):
-                # Check if coordinates changed or elevation is missing
-                coords_changed = (original_lat != waypoint.latitude or 
-                                original_lon != waypoint.longitude)
-                
-                # Fetch elevation if coordinates changed or elevation is missing
-                if waypoint.elevation is None or coords_changed:
-                    from ..file_io import get_elevation
-                    waypoint.elevation = get_elevation(waypoint.latitude, waypoint.longitude)
-                
-                self.waypoints[tree_index] = waypoint
-                # Sort by name after editing (name might have changed)
-                self.waypoints.sort(key=lambda w: w.name.lower())
-                self._refresh_tree()
-                self._mark_modified()
-                # Re-select the edited waypoint
-                self._select_waypoint_by_name(waypoint.name)
+        # The tree item id is the waypoint's stable row id
+        row_id = selected[0]
+        original_waypoint = self.waypoints.get(row_id)
+        # Store original coordinates for comparison
+        original_lat = original_waypoint.latitude
+        original_lon = original_waypoint.longitude
+        
+        def on_save(waypoint: Waypoint):
+            if not self.waypoints.contains_id(row_id):
+                return  # Removed or another file loaded in the meantime
+            # Check if coordinates changed or elevation is missing
+            coords_changed = (original_lat != waypoint.latitude or 
+                            original_lon != waypoint.longitude)
             
-            dialog = WaypointDialog(self.root, waypoint=self.waypoints[tree_index], on_save=on_save)
-            dialog.show()
+            # Moved to its new sorted position if the name changed
+            self.waypoints.update(row_id, waypoint)
+            self._mark_modified()
+            # Re-select the edited waypoint
+            self._show_waypoint(row_id)
+            # Fetch elevation if coordinates changed or elevation is missing
+            if waypoint.elevation is None or coords_changed:
+                self._fill_elevation(row_id, overwrite=coords_changed)
+        
+        dialog = WaypointDialog(self.root, waypoint=original_waypoint, on_save=on_save)
+        dialog.show()
     
     def _remove_selected(self):
         """Remove selected waypoints."""
-        selected = self.tree.selection()
+        if self._busy(editing=True):
+            return
+        selected = self.table.selected_ids()
         if not selected:
             messagebox.showwarning("No Selection", "Please select waypoint(s) to remove")
             return
@@ -349,43 +679,41 @@ class MainWindow:
         if not response:
             return
         
-        # Get indices of selected items in tree
-        tree_children = self.tree.get_children()
-        indices_to_remove = []
-        for item in selected:
-            tree_index = tree_children.index(item)
-            indices_to_remove.append(tree_index)
-        
-        # Sort indices in reverse order to remove from end first
-        indices_to_remove.sort(reverse=True)
-        
-        # Remove waypoints by index
-        for index in indices_to_remove:
-            if 0 <= index < len(self.waypoints):
-                del self.waypoints[index]
-        
-        self._refresh_tree()
+        # Remove waypoints by row id, undone as one step
+        label = f"Delete {len(selected)} waypoints" if len(selected) > 1 else "Delete waypoint"
+        with self.history.group(label):
+            self.waypoints.remove(selected)
         self._mark_modified()
     
-    def _save_cup(self) -> bool:
+    def _save_cup(self, on_saved=None) -> bool:
         """
-        Save waypoints to current CUP file.
+        Save waypoints to current CUP file in the background.
+        
+        Args:
+            on_saved: Callback once the file was written successfully
         
         Returns:
-            True if successful, False otherwise
+            True if saving started, False otherwise
         """
+        if self._busy():
+            return False
         if not self.cup_file_path:
-            return self._save_cup_as()
+            return self._save_cup_as(on_saved)
         
-        return self._write_cup_file(self.cup_file_path)
+        return self._write_cup_file(self.cup_file_path, on_saved)
     
-    def _save_cup_as(self) -> bool:
+    def _save_cup_as(self, on_saved=None) -> bool:
         """
-        Save waypoints to a new CUP file.
+        Save waypoints to a new CUP file in the background.
+        
+        Args:
+            on_saved: Callback once the file was written successfully
         
         Returns:
-            True if successful, False otherwise
+            True if saving started, False otherwise
         """
+        if self._busy():
+            return False
         if not self.waypoints:
             messagebox.showwarning("No Data", "No waypoints to save")
             return False
@@ -398,33 +726,80 @@ class MainWindow:
         if not filepath:
             return False
         
-        if self._write_cup_file(filepath):
+        def saved():
             self.cup_file_path = filepath
             self._update_title()
-            return True
-        return False
+            if on_saved:
+                on_saved()
+        
+        return self._write_cup_file(filepath, saved)
     
-    def _write_cup_file(self, filepath: str) -> bool:
+    def _write_cup_file(self, filepath: str, on_saved=None) -> bool:
         """
-        Write waypoints to CUP file format.
+        Write waypoints to CUP file format on a background thread.
+        
+        Missing elevations are looked up first (the user can skip that
+        stage), then the file is written atomically. Editing can go on
+        meanwhile, as a copy of the waypoints is saved.
         
         Args:
             filepath: Path to save the file
-            
+            on_saved: Callback once the file was written successfully
+        
         Returns:
-            True if successful, False otherwise
+            True if saving started
         """
-        try:
-            write_cup_file(filepath, self.waypoints, fetch_elevation=True)
-            self._mark_saved()
-            # Sort and refresh list after save
-            self.waypoints.sort(key=lambda w: w.name.lower())
-            self._refresh_tree()
-            messagebox.showinfo(
-                "Saved", 
-                f"Saved {len(self.waypoints)} waypoints to {os.path.basename(filepath)}"
-            )
-            return True
-        except Exception as e:
-            messagebox.showerror("Save Error", f"Failed to save file:\n{str(e)}")
-            return False
+        start = time.monotonic()
+        snapshot = self.waypoints.store.copy()
+        snapshot_time = time.monotonic() - start
+        revision = self._revision
+        self.journal.mark()
+        self.saver = BackgroundSave(filepath, snapshot)
+        self._show_progress(f"Saving {os.path.basename(filepath)}...", "Skip Elevations",
+                            self.saver.skip_elevation)
+        
+        def on_finished(saver: BackgroundSave):
+            if saver.error:
+                messagebox.showerror("Save Error", f"Failed to save file:\n{str(saver.error)}")
+                return
+            # Edits made while saving stay in the journal
+            self.journal.rebase(filepath, snapshot)
+            if self._revision == revision:
+                self._mark_saved()
+            result = saver.result
+            message = (f"Saved {result.rows} waypoints to {os.path.basename(filepath)}\n"
+                       f"(snapshot {snapshot_time:.2f} s, {saver.timing_summary()})")
+            if result.unresolved:
+                names = ", ".join(w.name for w in result.unresolved[:5])
+                more = "..." if len(result.unresolved) > 5 else ""
+                reason = "was skipped" if saver.elevation_skipped else "could not be fetched"
+                message += (
+                    f"\n\nElevation {reason} for {len(result.unresolved)} "
+                    f"waypoint(s) and was left empty: {names}{more}"
+                )
+                messagebox.showwarning("Saved", message)
+            else:
+                messagebox.showinfo("Saved", message)
+            if on_saved:
+                on_saved()
+        
+        self.root.after(ELEVATION_POLL_INTERVAL_MS, lambda: self._poll_saving(on_finished))
+        return True
+    
+    def _poll_saving(self, on_finished):
+        """Show the progress of the running save."""
+        saver = self.saver
+        if not saver.done:
+            if saver.stage == ELEVATION:
+                done, total = saver.progress
+                self.progress_bar.config(value=100 * done / total if total else 0)
+                self.progress_label.config(text=f"Looking up elevations: {done} of {total}")
+            else:
+                self.progress_button.config(state=tk.DISABLED)
+                self.progress_bar.config(value=100)
+                self.progress_label.config(text="Writing file...")
+            self.root.after(ELEVATION_POLL_INTERVAL_MS, lambda: self._poll_saving(on_finished))
+            return
+        self.saver = None
+        self.progress_frame.pack_forget()
+        on_finished(saver)
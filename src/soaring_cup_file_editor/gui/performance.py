@@ -0,0 +1,112 @@
+"""Performance panel: switches instrumentation on and shows the timing report."""
+
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+from .. import perf
+from ..config import PERF_REFRESH_MS
+
+
+class PerformanceDialog:
+    """Shows the perf report while open and saves it or a cProfile run."""
+    
+    def __init__(self, parent: tk.Tk):
+        """
+        Initialize the performance panel.
+        
+        Args:
+            parent: Parent window
+        """
+        self.parent = parent
+        # Statistics of the last profile run, kept for saving
+        self.profile = None
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Performance")
+        self.dialog.geometry("760x480")
+        self.dialog.transient(parent)
+        
+        self._create_widgets()
+        self._refresh()
+        self.dialog.bind('<Escape>', lambda e: self.dialog.destroy())
+    
+    def _create_widgets(self):
+        """Create dialog widgets."""
+        options = tk.Frame(self.dialog)
+        options.pack(fill=tk.X, padx=10, pady=(10, 0))
+        self.enabled_var = tk.BooleanVar(value=perf.enabled)
+        tk.Checkbutton(options, text="Collect timings", variable=self.enabled_var,
+                       command=self._toggle_enabled).pack(side=tk.LEFT)
+        self.profile_var = tk.BooleanVar(value=perf.is_profiling())
+        tk.Checkbutton(options, text="Profile with cProfile (GUI thread)", variable=self.profile_var,
+                       command=self._toggle_profile).pack(side=tk.LEFT, padx=10)
+        
+        frame = tk.Frame(self.dialog)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.text = tk.Text(frame, wrap=tk.NONE, font=('Courier', 9))
+        scrollbar = tk.Scrollbar(frame, orient=tk.VERTICAL, command=self.text.yview)
+        self.text.configure(yscrollcommand=scrollbar.set)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        button_frame = tk.Frame(self.dialog)
+        button_frame.pack(pady=(0, 10))
+        tk.Button(button_frame, text="Reset", command=self._reset, width=14).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Save Report...", command=self._save_report, width=14).pack(side=tk.LEFT, padx=5)
+        self.save_profile_btn = tk.Button(button_frame, text="Save Profile...", command=self._save_profile,
+                                          width=14, state=tk.DISABLED)
+        self.save_profile_btn.pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Close", command=self.dialog.destroy, width=14).pack(side=tk.LEFT, padx=5)
+    
+    def _refresh(self):
+        """Show the current report, and again every PERF_REFRESH_MS while the panel is open."""
+        if not self.dialog.winfo_exists():
+            return
+        text = perf.report()
+        if self.profile is not None:
+            text += "\n" + perf.profile_summary(self.profile)
+        position = self.text.yview()[0]
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', text)
+        self.text.yview_moveto(position)
+        self.dialog.after(PERF_REFRESH_MS, self._refresh)
+    
+    def _toggle_enabled(self):
+        if self.enabled_var.get():
+            perf.enable()
+        else:
+            perf.disable()
+    
+    def _toggle_profile(self):
+        if self.profile_var.get():
+            perf.start_profile()
+        else:
+            self.profile = perf.stop_profile()
+            self.save_profile_btn.config(state=tk.NORMAL if self.profile is not None else tk.DISABLED)
+    
+    def _reset(self):
+        perf.reset()
+        self.profile = None
+        self.save_profile_btn.config(state=tk.DISABLED)
+    
+    def _save_report(self):
+        filepath = filedialog.asksaveasfilename(
+            parent=self.dialog, defaultextension=".txt",
+            filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")]
+        )
+        if filepath:
+            self._try_save(lambda: perf.dump(filepath))
+    
+    def _save_profile(self):
+        filepath = filedialog.asksaveasfilename(
+            parent=self.dialog, defaultextension=".prof",
+            filetypes=[("Profile (pstats)", "*.prof"), ("All Files", "*.*")]
+        )
+        if filepath:
+            self._try_save(lambda: self.profile.dump_stats(filepath))
+    
+    def _try_save(self, save):
+        try:
+            save()
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Failed to save:\n{str(e)}", parent=self.dialog)
@@ -0,0 +1,483 @@
+"""Waypoint table widget with a virtualized mode for large files."""
+
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .. import perf
+from ..config import STYLE_OPTIONS, VIRTUAL_TREE_THRESHOLD, VIRTUAL_TREE_OVERSCAN, ROW_CACHE_SIZE
+from ..collection import CollectionEvent, WaypointCollection, INSERT, UPDATE, DELETE, MOVE
+from ..store import WaypointRow, WaypointStore
+
+COLUMNS = ("Name", "Code", "Country", "Latitude", "Longitude", "Elevation", "Style", "Airfield")
+HEADINGS = {
+    "Name": "Name",
+    "Code": "Code",
+    "Country": "Country",
+    "Latitude": "Latitude",
+    "Longitude": "Longitude",
+    "Elevation": "Elevation (m)",
+    "Style": "Type",
+    "Airfield": "Airfield",
+}
+WIDTHS = {
+    "Name": 180,
+    "Code": 60,
+    "Country": 60,
+    "Latitude": 100,
+    "Longitude": 100,
+    "Elevation": 80,
+    "Style": 150,
+    "Airfield": 80,
+}
+
+
+def format_row(row: WaypointRow) -> Tuple[str, ...]:
+    """
+    Format a waypoint for display in the table.
+    
+    Args:
+        row: Store row view (or Waypoint)
+    
+    Returns:
+        Tuple of display values in COLUMNS order
+    """
+    style_label = STYLE_OPTIONS.get(row.style, 'Unknown')
+    
+    # Format elevation (stored as string with unit)
+    elev_str = str(row.elevation) if row.elevation is not None else ""
+    
+    # Check if airfield (has runway or frequency info)
+    airfield_marker = "✓" if row.is_airfield else ""
+    
+    return (
+        row.name,
+        row.code,
+        row.country,
+        f"{row.latitude:.6f}",
+        f"{row.longitude:.6f}",
+        elev_str,
+        style_label,
+        airfield_marker
+    )
+
+
+class WaypointTable:
+    """
+    Treeview listing the waypoints of a WaypointCollection.
+    
+    The table subscribes to the collection and applies each change as a
+    single-row Treeview operation instead of rebuilding the list.
+    
+    Up to VIRTUAL_TREE_THRESHOLD rows every waypoint gets its own Treeview
+    item. Above it the table switches to a virtualized mode: only the rows
+    in the visible viewport plus VIRTUAL_TREE_OVERSCAN rows on each side
+    exist as items, a proxy scrollbar represents the whole list, and the
+    items are re-filled with other rows as the view approaches their edges.
+    
+    Rows are identified by their stable store row id: it is the Treeview
+    iid of a row in one-item-per-row mode, and the selection is kept as a
+    set of row ids in virtualized mode, so it survives re-filling and
+    changes elsewhere in the list.
+    
+    Formatted rows are cached per store row id until the row changes.
+    
+    A filter (e.g. search results) limits the table to a set of row ids,
+    listed in collection order. Filtered lists always use the virtualized
+    mode, so narrowing or widening the filter costs the same at any size.
+    """
+    
+    def __init__(self, parent: tk.Misc, heading_commands: Optional[Dict[str, Callable[[], None]]] = None,
+                 on_activate: Optional[Callable[[], None]] = None):
+        """
+        Create the table widgets.
+        
+        Args:
+            parent: Parent widget
+            heading_commands: Column name -> callback for heading clicks
+            on_activate: Callback for double-clicking a row
+        """
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=COLUMNS, show='headings')
+        for column in COLUMNS:
+            command = (heading_commands or {}).get(column)
+            if command:
+                self.tree.heading(column, text=HEADINGS[column], command=command)
+            else:
+                self.tree.heading(column, text=HEADINGS[column])
+            self.tree.column(column, width=WIDTHS[column])
+        
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        if on_activate:
+            self.tree.bind('<Double-Button-1>', lambda e: on_activate())
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<Configure>', lambda e: self._render())
+        
+        self.collection: Optional[WaypointCollection] = None
+        self.virtual = False
+        self._row_cache: Dict[int, Tuple[str, ...]] = {}
+        
+        # Filter state: matching row ids and their display order (built lazily)
+        self._filter: Optional[Set[int]] = None
+        self._filter_order: Optional[List[int]] = None
+        self._filter_positions: Optional[Dict[int, int]] = None
+        
+        # Item window state (virtualized mode)
+        self._offset = 0
+        self._window_start = 0
+        self._window_items: List[str] = []
+        self._window_ids: List[int] = []
+        self._selected: Set[int] = set()
+        self._applied_selection: Tuple[str, ...] = ()
+        self._focus_id: Optional[int] = None
+        self._row_height = 20
+        self._header_height = 24
+        self._render_pending = False
+        self._set_mode(False)
+    
+    def pack(self, **kwargs):
+        """Pack the table's frame into its parent."""
+        self.frame.pack(**kwargs)
+    
+    @property
+    def store(self) -> WaypointStore:
+        """Store holding the listed waypoints."""
+        return self.collection.store if self.collection is not None else WaypointStore()
+    
+    def set_collection(self, collection: WaypointCollection) -> None:
+        """
+        Display a collection and follow its changes.
+        
+        Args:
+            collection: Waypoints to list
+        """
+        if self.collection is not None:
+            self.collection.unsubscribe(self._on_change)
+        self.collection = collection
+        collection.subscribe(self._on_change)
+        self.refresh()
+    
+    def set_filter(self, row_ids: Optional[Iterable[int]]) -> None:
+        """
+        Show only some rows, or all rows again.
+        
+        The list is scrolled to the top; the selection is kept for rows that
+        stay visible.
+        
+        Args:
+            row_ids: Store row ids to show, or None to show all rows
+        """
+        self._filter = None if row_ids is None else set(row_ids)
+        self._filter_order = None
+        self._filter_positions = None
+        self._offset = 0  # Start at the best-sorted result
+        self._update_view()
+    
+    @property
+    def filtered(self) -> bool:
+        """Whether a filter is limiting the listed rows."""
+        return self._filter is not None
+    
+    def row_count(self) -> int:
+        """Get the number of listed rows."""
+        if self._filter is None:
+            return len(self.store)
+        return len(self._ordered_filter())
+    
+    def _wants_virtual(self) -> bool:
+        return self._filter is not None or len(self.store) > VIRTUAL_TREE_THRESHOLD
+    
+    def _ordered_filter(self) -> List[int]:
+        """Filtered row ids in collection order."""
+        if self._filter_order is None:
+            self._filter_order = self.collection.in_order(self._filter)
+            self._filter_positions = None
+        return self._filter_order
+    
+    def _id_at(self, index: int) -> int:
+        """Row id at a display position."""
+        if self._filter is None:
+            return self.store.id_at(index)
+        return self._ordered_filter()[index]
+    
+    def _index_of(self, row_id: int) -> int:
+        """Display position of a listed row."""
+        if self._filter is None:
+            return self.collection.index_of(row_id)
+        order = self._ordered_filter()
+        if self._filter_positions is None:
+            self._filter_positions = {listed_id: index for index, listed_id in enumerate(order)}
+        return self._filter_positions[row_id]
+    
+    def is_listed(self, row_id: int) -> bool:
+        """Whether a row is in the collection and not hidden by the filter."""
+        return self.store.contains_id(row_id) and (self._filter is None or row_id in self._filter)
+    
+    def refresh(self) -> None:
+        """Redisplay all rows."""
+        self._row_cache.clear()
+        if self._filter is not None:
+            self._filter = {row_id for row_id in self._filter if self.store.contains_id(row_id)}
+            self._filter_order = None
+        with perf.timer("table.refresh"):
+            self._update_view()
+    
+    def _update_view(self) -> None:
+        """Redisplay the listed rows, switching mode if needed."""
+        virtual = self._wants_virtual()
+        if virtual != self.virtual:
+            if self.virtual:
+                selected, focus_id = self._selected, self._focus_id
+            else:
+                selected = {int(iid) for iid in self.tree.selection()}
+                focus_id = int(self.tree.focus()) if self.tree.focus() else None
+            self._set_mode(virtual)
+            self._selected, self._focus_id = selected, focus_id
+        
+        if self.virtual:
+            self._selected = {row_id for row_id in self._selected if self.is_listed(row_id)}
+            if self._focus_id is not None and not self.is_listed(self._focus_id):
+                self._focus_id = None
+            self._render(force=True)
+        else:
+            self.tree.delete(*self.tree.get_children())
+            for row_id in self.store.row_ids():
+                self.tree.insert('', tk.END, iid=str(row_id), values=self._values(row_id))
+            perf.count("table.items_inserted", len(self.store))
+            # Restore a selection carried over from the virtualized mode
+            selection = [str(row_id) for row_id in self._selected if self.store.contains_id(row_id)]
+            if selection:
+                self.tree.selection_set(selection)
+                focus = str(self._focus_id) if str(self._focus_id) in selection else selection[0]
+                self.tree.focus(focus)
+                self.tree.see(focus)
+            self._selected, self._focus_id = set(), None
+    
+    def _on_change(self, event: CollectionEvent) -> None:
+        """Apply a collection change to the Treeview."""
+        if event.kind not in (INSERT, UPDATE, DELETE, MOVE):
+            self.refresh()
+            return
+        if event.kind in (UPDATE, DELETE):
+            self._row_cache.pop(event.row_id, None)
+        if self._wants_virtual() != self.virtual:
+            self.refresh()
+            return
+        
+        if self._filter is not None:
+            # New rows are not listed until the filter is set again
+            if event.kind == DELETE:
+                self._filter.discard(event.row_id)
+                self._selected.discard(event.row_id)
+            if event.kind in (DELETE, MOVE):
+                self._filter_order = None
+            self._schedule_render()
+            return
+        
+        if self.virtual:
+            if event.kind == DELETE:
+                self._selected.discard(event.row_id)
+                if self._focus_id == event.row_id:
+                    self._focus_id = None
+            # Keep the same rows in view when rows above them come or go
+            if event.kind in (INSERT, DELETE) and event.index < self._offset:
+                self._offset += 1 if event.kind == INSERT else -1
+            self._schedule_render()
+            return
+        
+        iid = str(event.row_id)
+        if event.kind == INSERT:
+            self.tree.insert('', event.index, iid=iid, values=self._values(event.row_id))
+        elif event.kind == UPDATE:
+            self.tree.item(iid, values=self._values(event.row_id))
+        elif event.kind == DELETE:
+            self.tree.delete(iid)
+        elif event.kind == MOVE:
+            self.tree.move(iid, '', event.index)
+    
+    def _values(self, row_id: int) -> Tuple[str, ...]:
+        """Get the formatted values of a row, via the row cache."""
+        values = self._row_cache.get(row_id)
+        if values is None:
+            if len(self._row_cache) >= ROW_CACHE_SIZE:
+                self._row_cache.clear()
+            values = format_row(WaypointRow(self.store, row_id))
+            self._row_cache[row_id] = values
+        return values
+    
+    def _set_mode(self, virtual: bool) -> None:
+        """Switch between one item per row and the virtualized item window."""
+        self.virtual = virtual
+        self.tree.delete(*self.tree.get_children())
+        self._window_items = []
+        self._window_ids = []
+        self._window_start = 0
+        self._offset = 0
+        self._selected = set()
+        self._applied_selection = ()
+        self._focus_id = None
+        if virtual:
+            self.scrollbar.configure(command=self._on_scrollbar)
+            self.tree.configure(yscrollcommand=self._on_tree_scrolled)
+        else:
+            self.scrollbar.configure(command=self.tree.yview)
+            self.tree.configure(yscrollcommand=self.scrollbar.set)
+    
+    # Selection
+    
+    def selected_ids(self) -> List[int]:
+        """Get the row ids of the selected rows, in display order."""
+        if not self.virtual:
+            return [int(iid) for iid in self.tree.selection()]
+        return sorted(self._selected, key=self._index_of)
+    
+    def select_id(self, row_id: int) -> None:
+        """
+        Select a row and scroll it into view.
+        
+        A row hidden by the filter cannot be selected; clear the filter first.
+        
+        Args:
+            row_id: Store row id of the waypoint
+        """
+        if not self.is_listed(row_id):
+            return
+        if self.virtual:
+            self._selected = {row_id}
+            self._focus_id = row_id
+            index = self._index_of(row_id)
+            visible = self._visible_rows()
+            if not self._offset <= index < self._offset + visible:
+                self._offset = max(0, index - visible // 2)
+            self._render(force=True)
+            return
+        
+        item_id = str(row_id)
+        # Clear current selection
+        self.tree.selection_remove(self.tree.selection())
+        # Select and scroll to the item
+        self.tree.selection_set(item_id)
+        self.tree.see(item_id)
+        self.tree.focus(item_id)
+    
+    def _on_select(self, event=None) -> None:
+        """Take over a selection made by the user inside the item window."""
+        if not self.virtual:
+            return
+        selection = self.tree.selection()
+        if selection == self._applied_selection:
+            # Event caused by re-applying the selection after a re-fill
+            return
+        row_ids = dict(zip(self._window_items, self._window_ids))
+        self._selected = {row_ids[item] for item in selection if item in row_ids}
+        self._applied_selection = selection
+        focus = self.tree.focus()
+        if focus in row_ids:
+            self._focus_id = row_ids[focus]
+    
+    # Virtualized mode
+    
+    def _schedule_render(self) -> None:
+        """Re-fill the item window once the current batch of changes is applied."""
+        if not self._render_pending:
+            self._render_pending = True
+            self.tree.after_idle(self._deferred_render)
+    
+    def _deferred_render(self) -> None:
+        self._render_pending = False
+        self._render(force=True)
+    
+    def _visible_rows(self) -> int:
+        """Estimate how many rows fit in the Treeview."""
+        if self._window_items and self._window_start <= self._offset:
+            position = min(self._offset - self._window_start, len(self._window_items) - 1)
+            box = self.tree.bbox(self._window_items[position])
+            if box:
+                self._header_height = box[1]
+                self._row_height = max(1, box[3])
+        height = self.tree.winfo_height() - self._header_height
+        return max(1, height // self._row_height)
+    
+    def _render(self, force: bool = False) -> None:
+        """
+        Make sure items exist for the viewport starting at the current offset.
+        
+        The item window is only re-filled when the viewport gets close to its
+        edges (or when forced after data changes); otherwise the Treeview is
+        just scrolled within the existing items.
+        
+        Args:
+            force: Re-fill the item window even if it covers the viewport
+        """
+        if not self.virtual:
+            return
+        count = self.row_count()
+        visible = self._visible_rows()
+        self._offset = max(0, min(self._offset, count - visible))
+        
+        start = self._window_start
+        end = start + len(self._window_items)
+        margin = VIRTUAL_TREE_OVERSCAN // 3
+        covered = (start <= max(0, self._offset - margin) and
+                   min(count, self._offset + visible + margin) <= end)
+        if force or not covered:
+            start = max(0, self._offset - VIRTUAL_TREE_OVERSCAN)
+            end = min(count, self._offset + visible + VIRTUAL_TREE_OVERSCAN)
+            with perf.timer("table.render"):
+                self._fill_window(start, end)
+        
+        if self._window_items:
+            self.tree.yview_moveto((self._offset - self._window_start) / len(self._window_items))
+        self._update_scrollbar(visible)
+    
+    def _fill_window(self, start: int, end: int) -> None:
+        """Reuse, add or remove Treeview items so they show rows start..end-1."""
+        items = self._window_items
+        row_ids = [self._id_at(index) for index in range(start, end)]
+        perf.count("table.items_inserted", max(0, len(row_ids) - len(items)))
+        while len(items) > len(row_ids):
+            self.tree.delete(items.pop())
+        for k, row_id in enumerate(row_ids):
+            values = self._values(row_id)
+            if k < len(items):
+                self.tree.item(items[k], values=values)
+            else:
+                items.append(self.tree.insert('', tk.END, values=values))
+        self._window_start = start
+        self._window_ids = row_ids
+        
+        selection = tuple(item for item, row_id in zip(items, row_ids) if row_id in self._selected)
+        self._applied_selection = selection
+        self.tree.selection_set(selection)
+        if self._focus_id in row_ids:
+            self.tree.focus(items[row_ids.index(self._focus_id)])
+    
+    def _update_scrollbar(self, visible: int) -> None:
+        """Position the proxy scrollbar's slider relative to the whole list."""
+        count = self.row_count()
+        if count == 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(self._offset / count, min(1.0, (self._offset + visible) / count))
+    
+    def _on_scrollbar(self, action: str, amount: str, unit: Optional[str] = None) -> None:
+        """Handle the proxy scrollbar (dragging, arrows and trough clicks)."""
+        if action == 'moveto':
+            self._offset = int(float(amount) * self.row_count())
+        elif action == 'scroll':
+            step = self._visible_rows() if unit == 'pages' else 1
+            self._offset += int(amount) * step
+        self._render()
+    
+    def _on_tree_scrolled(self, first: str, last: str) -> None:
+        """Follow the Treeview's own scrolling (mouse wheel, keyboard) inside the item window."""
+        if self._window_items:
+            offset = self._window_start + round(float(first) * len(self._window_items))
+            if offset != self._offset:
+                self._offset = offset
+                self._render()
+                return
+        self._update_scrollbar(self._visible_rows())
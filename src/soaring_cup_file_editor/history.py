@@ -0,0 +1,290 @@
+"""Undo and redo of waypoint edits, recorded as compact deltas."""
+
+import sys
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import fields
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from .collection import CollectionEvent, WaypointCollection, INSERT, UPDATE, DELETE, RESET
+from .config import UNDO_MEMORY_LIMIT
+from .models import Waypoint
+
+FIELD_NAMES = tuple(f.name for f in fields(Waypoint))
+
+
+class _Rows:
+    """Rows added (or removed) by a step; undone by removing (restoring) them."""
+    
+    __slots__ = ('row_ids', 'added')
+    
+    def __init__(self, added: bool):
+        self.row_ids = array('q')
+        self.added = added
+    
+    @property
+    def size(self) -> int:
+        return 64 + self.row_ids.itemsize * len(self.row_ids)
+    
+    def apply(self, collection: WaypointCollection, undo: bool) -> None:
+        if self.added == undo:
+            collection.remove(self.row_ids)
+        else:
+            collection.restore(self.row_ids)
+
+
+class _Changes:
+    """Changed fields of one row, with their values before and after."""
+    
+    __slots__ = ('row_id', 'names', 'before', 'after')
+    
+    def __init__(self, row_id: int, names: Tuple[str, ...], before: tuple, after: tuple):
+        self.row_id = row_id
+        self.names = names
+        self.before = before
+        self.after = after
+    
+    @property
+    def size(self) -> int:
+        return 120 + sum(sys.getsizeof(value) for value in self.before + self.after)
+    
+    def apply(self, collection: WaypointCollection, undo: bool) -> None:
+        waypoint = collection.get(self.row_id)
+        for name, value in zip(self.names, self.before if undo else self.after):
+            setattr(waypoint, name, value)
+        collection.update(self.row_id, waypoint)
+
+
+class UndoStep:
+    """One undoable user action: the deltas of all changes it made."""
+    
+    __slots__ = ('label', 'deltas', 'size')
+    
+    def __init__(self, label: str):
+        self.label = label
+        self.deltas: List = []
+        self.size = 64
+    
+    def add(self, delta) -> None:
+        self.deltas.append(delta)
+        self.size += delta.size
+    
+    def add_rows(self, row_ids, added: bool) -> None:
+        """Record added or removed rows, extending the previous delta if it is of the same kind."""
+        last = self.deltas[-1] if self.deltas else None
+        if not isinstance(last, _Rows) or last.added != added:
+            last = _Rows(added)
+            self.deltas.append(last)
+        else:
+            self.size -= last.size
+        last.row_ids.extend(row_ids)
+        self.size += last.size
+
+
+class UndoHistory:
+    """
+    Undo/redo stacks for a WaypointCollection.
+    
+    The history follows the collection's change events instead of copying
+    waypoints: an edit is stored as the changed fields of one row id, and
+    adding or removing waypoints only as their row ids, because removed
+    rows keep their data in the store and are simply brought back on undo.
+    Undoing the removal of 10,000 rows is therefore one restore() call.
+    
+    Changes made between begin() and end() (or inside group()) form one
+    step. Once the deltas use more than ``memory_limit`` bytes, the oldest
+    steps are dropped.
+    """
+    
+    def __init__(self, memory_limit: int = UNDO_MEMORY_LIMIT):
+        """
+        Create an empty history.
+        
+        Args:
+            memory_limit: Approximate bytes of deltas kept
+        """
+        self.memory_limit = memory_limit
+        self.paused = False
+        self._undo: Deque[UndoStep] = deque()
+        self._redo: List[UndoStep] = []
+        self._memory = 0
+        self._group: Optional[UndoStep] = None
+        self._depth = 0
+        self._applying = False
+        self._collection: Optional[WaypointCollection] = None
+        self._store = None
+    
+    def attach(self, collection: WaypointCollection) -> None:
+        """
+        Follow a collection's changes.
+        
+        Args:
+            collection: Collection whose edits can be undone
+        """
+        if self._collection is not None:
+            self._collection.unsubscribe(self._on_change)
+        self._collection = collection
+        self._store = collection.store
+        collection.subscribe(self._on_change)
+        self.clear()
+    
+    # Recording
+    
+    def begin(self, label: str) -> None:
+        """
+        Start collecting changes into one step; calls may be nested.
+        
+        Args:
+            label: Description shown for undo/redo, e.g. "Delete 3 waypoints"
+        """
+        if self._depth == 0:
+            self._group = UndoStep(label)
+        self._depth += 1
+    
+    def end(self, discard: bool = False) -> None:
+        """
+        Finish the step started by begin().
+        
+        Args:
+            discard: Drop the step instead (e.g. an import that was cancelled and rolled back)
+        """
+        self._depth -= 1
+        if self._depth == 0:
+            step, self._group = self._group, None
+            if step.deltas and not discard:
+                self._push(step)
+    
+    @contextmanager
+    def group(self, label: str) -> Iterator[None]:
+        """Collect the changes made inside a with block into one step."""
+        self.begin(label)
+        try:
+            yield
+        finally:
+            self.end()
+    
+    def _push(self, step: UndoStep) -> None:
+        self._undo.append(step)
+        self._memory += step.size
+        for dropped in self._redo:
+            self._memory -= dropped.size
+        self._redo = []
+        while self._memory > self.memory_limit and len(self._undo) > 1:
+            self._memory -= self._undo.popleft().size
+    
+    def _step(self, label: str) -> UndoStep:
+        """The step being collected, or a new single-change step."""
+        return self._group if self._group is not None else UndoStep(label)
+    
+    def _on_change(self, event: CollectionEvent) -> None:
+        if self._applying or self.paused:
+            return
+        kind = event.kind
+        if kind == RESET:
+            if self._collection.store is not self._store:
+                # Another file: earlier steps refer to the old store's rows
+                self._store = self._collection.store
+                self.clear()
+                return
+            if event.added is not None:
+                step = self._step(f"Add {len(event.added)} waypoints")
+                step.add_rows(event.added, True)
+            elif event.removed is not None:
+                step = self._step(f"Delete {len(event.removed)} waypoints")
+                step.add_rows(sorted(event.removed), False)
+            else:
+                return  # Re-sorted, nothing changed
+        elif kind in (INSERT, DELETE):
+            step = self._step("Add waypoint" if kind == INSERT else "Delete waypoint")
+            step.add_rows((event.row_id,), kind == INSERT)
+        elif kind == UPDATE and event.previous is not None:
+            before = event.previous
+            after = self._collection.get(event.row_id)
+            names = tuple(name for name in FIELD_NAMES if getattr(before, name) != getattr(after, name))
+            if not names:
+                return
+            step = self._step(f"Edit {after.name}")
+            step.add(_Changes(event.row_id, names, tuple(getattr(before, name) for name in names),
+                              tuple(getattr(after, name) for name in names)))
+        else:
+            return
+        if step is not self._group:
+            self._push(step)
+    
+    # Undo and redo
+    
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+    
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+    
+    @property
+    def undo_label(self) -> Optional[str]:
+        return self._undo[-1].label if self._undo else None
+    
+    @property
+    def redo_label(self) -> Optional[str]:
+        return self._redo[-1].label if self._redo else None
+    
+    @property
+    def memory(self) -> int:
+        """Approximate bytes used by the recorded deltas."""
+        return self._memory
+    
+    def __len__(self) -> int:
+        return len(self._undo)
+    
+    def _apply(self, step: UndoStep, undo: bool) -> None:
+        self._applying = True
+        try:
+            for delta in (reversed(step.deltas) if undo else step.deltas):
+                delta.apply(self._collection, undo)
+        finally:
+            self._applying = False
+    
+    def undo(self) -> Optional[UndoStep]:
+        """
+        Revert the last step.
+        
+        Returns:
+            The undone step, or None if there was nothing to undo
+        """
+        if not self._undo or self._group is not None:
+            return None
+        step = self._undo.pop()
+        self._apply(step, undo=True)
+        self._redo.append(step)
+        return step
+    
+    def redo(self) -> Optional[UndoStep]:
+        """
+        Apply the last undone step again.
+        
+        Returns:
+            The redone step, or None if there was nothing to redo
+        """
+        if not self._redo or self._group is not None:
+            return None
+        step = self._redo.pop()
+        self._apply(step, undo=False)
+        self._undo.append(step)
+        return step
+    
+    def clear(self) -> None:
+        """Forget all steps."""
+        self._undo.clear()
+        self._redo = []
+        self._memory = 0
+    
+    def pause(self) -> None:
+        """Stop recording (e.g. while a file is loaded into the collection)."""
+        self.paused = True
+    
+    def resume(self) -> None:
+        """Record again after pause()."""
+        self.paused = False
+        self._store = self._collection.store
@@ -0,0 +1,422 @@
+"""Append-only journal of waypoint edits for crash recovery."""
+
+import json
+import os
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, TextIO
+
+from .collection import CollectionEvent, WaypointCollection, INSERT, UPDATE, DELETE, RESET
+from .config import JOURNAL_COMPACT_RECORDS, JOURNAL_DIR, JOURNAL_ENABLED, JOURNAL_SYNC_INTERVAL
+from .elevation_cache import user_cache_dir
+from .file_io import atomic_write
+from .models import Waypoint
+from .store import WaypointStore
+
+JOURNAL_VERSION = 1
+
+
+def journal_dir() -> str:
+    """Directory for journals of untitled files and the session pointer."""
+    return JOURNAL_DIR or user_cache_dir()
+
+
+def journal_path(filepath: Optional[str]) -> str:
+    """
+    Get the journal file used for a CUP file.
+    
+    Args:
+        filepath: Path of the CUP file, or None for an untitled file
+    
+    Returns:
+        Path of a hidden journal next to the file (or in journal_dir())
+    """
+    if filepath is None:
+        return os.path.join(journal_dir(), 'untitled.journal')
+    directory, name = os.path.split(os.path.abspath(filepath))
+    return os.path.join(directory, f".{name}.journal")
+
+
+def _session_pointer() -> str:
+    return os.path.join(journal_dir(), 'session.json')
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@dataclass
+class JournalContents:
+    """A journal read back for recovery."""
+    
+    path: str
+    base_file: Optional[str]
+    base_size: Optional[int]
+    base_mtime_ns: Optional[int]
+    base_rows: int
+    created: float
+    records: List[dict] = field(default_factory=list)
+    
+    def base_matches(self) -> bool:
+        """Check that the base file is still the one the journal was written against."""
+        if self.base_file is None:
+            return True
+        try:
+            stat = os.stat(self.base_file)
+        except OSError:
+            return False
+        return stat.st_size == self.base_size and stat.st_mtime_ns == self.base_mtime_ns
+
+
+def read_journal(path: str) -> Optional[JournalContents]:
+    """
+    Read a journal file.
+    
+    A last line torn by a crash while it was written is ignored.
+    
+    Args:
+        path: Journal file path
+    
+    Returns:
+        JournalContents, or None if the file is missing or not a journal
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().split('\n')
+        header = json.loads(lines[0])
+    except (OSError, ValueError):
+        return None
+    if not isinstance(header, dict) or header.get('op') != 'base' or header.get('version') != JOURNAL_VERSION:
+        return None
+    contents = JournalContents(path, header['file'], header['size'], header['mtime_ns'],
+                               header['rows'], header['created'])
+    for line in lines[1:]:
+        if not line:
+            continue
+        try:
+            contents.records.append(json.loads(line))
+        except ValueError:
+            break
+    return contents
+
+
+def find_session_journal() -> Optional[JournalContents]:
+    """
+    Find the journal of a previous session that ended without saving or discarding its edits.
+    
+    Returns:
+        JournalContents with at least one record, or None
+    """
+    try:
+        with open(_session_pointer(), encoding='utf-8') as f:
+            path = json.load(f)['journal']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    contents = read_journal(path)
+    return contents if contents is not None and contents.records else None
+
+
+def discard_journal(path: str) -> None:
+    """
+    Delete a journal file and the session pointer if it refers to it.
+    
+    Args:
+        path: Journal file path
+    """
+    _remove(path)
+    try:
+        with open(_session_pointer(), encoding='utf-8') as f:
+            current = json.load(f).get('journal')
+    except (OSError, ValueError, AttributeError):
+        return
+    if current == path:
+        _remove(_session_pointer())
+
+
+class EditJournal:
+    """
+    Records every edit of a WaypointCollection in an append-only file.
+    
+    The journal starts from a base, the file as it was loaded or last saved,
+    and appends one JSON line per added, updated or deleted waypoint, so an
+    autosave costs one short write per edit however big the file is. Rows
+    are identified by their position in the base file, or after the base
+    rows for added waypoints, so the journal can be replayed onto a fresh
+    load of the base file. Once the journal holds many more records than
+    edited rows it is compacted to one record per row.
+    """
+    
+    def __init__(self, enabled: bool = JOURNAL_ENABLED):
+        """
+        Create a journal; it records nothing until attach() and start().
+        
+        Args:
+            enabled: If False, every method does nothing
+        """
+        self.enabled = enabled
+        self.path: Optional[str] = None
+        self.records = 0
+        self.paused = True
+        self._collection: Optional[WaypointCollection] = None
+        self._file: Optional[TextIO] = None
+        self._header: Optional[dict] = None
+        self._base_rows = 0
+        self._base_next = 0
+        # Base row ids -> positions in the base file, or None if they are equal
+        self._positions: Optional[array] = None
+        self._touched: Set[int] = set()
+        self._since_mark: Optional[Set[int]] = None
+        self._deferred = False
+        self._last_sync = 0.0
+    
+    def attach(self, collection: WaypointCollection) -> None:
+        """
+        Follow a collection's changes.
+        
+        Args:
+            collection: Collection whose edits are recorded
+        """
+        if self._collection is not None:
+            self._collection.unsubscribe(self._on_change)
+        self._collection = collection
+        collection.subscribe(self._on_change)
+    
+    # Base
+    
+    def _set_base(self, filepath: Optional[str], store: WaypointStore,
+                  positions: Optional[array]) -> None:
+        self.path = journal_path(filepath)
+        size = mtime_ns = None
+        if filepath is not None:
+            stat = os.stat(filepath)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        self._header = {
+            'op': 'base', 'version': JOURNAL_VERSION, 'file': os.path.abspath(filepath) if filepath else None,
+            'size': size, 'mtime_ns': mtime_ns, 'rows': len(store), 'created': time.time(),
+        }
+        self._base_rows = len(store)
+        self._base_next = store.next_row_id
+        self._positions = positions
+        self._touched = set()
+        self.records = 0
+    
+    def start(self, filepath: Optional[str] = None) -> None:
+        """
+        Start a new journal for the collection as freshly loaded from a file.
+        
+        The previous journal is deleted. Nothing is written until the first edit.
+        
+        Args:
+            filepath: File the collection was loaded from, or None for a new file
+        """
+        if not self.enabled:
+            return
+        self.discard()
+        self._set_base(filepath, self._collection.store, None)
+        self.paused = False
+    
+    def rebase(self, filepath: str, snapshot: WaypointStore) -> None:
+        """
+        Start from a just saved file, keeping the edits made since mark().
+        
+        Args:
+            filepath: File the snapshot was saved to
+            snapshot: Store as it was written (a copy taken when mark() was called)
+        """
+        if not self.enabled:
+            return
+        since = self._since_mark or set()
+        self._since_mark = None
+        positions = array('q', [-1]) * snapshot.next_row_id
+        for position, row_id in enumerate(snapshot.row_ids()):
+            positions[row_id] = position
+        old_path = self.path
+        self._close_file()
+        self._set_base(filepath, snapshot, positions)
+        self._touched = since
+        self.paused = False
+        # The new journal replaces the old one before it is deleted (Save As)
+        self._rewrite()
+        if old_path is not None and old_path != self.path:
+            discard_journal(old_path)
+    
+    def mark(self) -> None:
+        """Remember the rows edited from now on (e.g. while a snapshot is saved)."""
+        self._since_mark = set()
+    
+    def pause(self) -> None:
+        """Stop recording (e.g. while a file is loaded into the collection)."""
+        self.paused = True
+    
+    def resume(self) -> None:
+        """Record again after pause(), with the same base."""
+        if self.enabled and self.path is not None:
+            self.paused = False
+    
+    def discard(self) -> None:
+        """Delete the journal file (e.g. after saving or when the edits are thrown away)."""
+        self._close_file()
+        if self.path is not None:
+            discard_journal(self.path)
+        self.records = 0
+        self._touched = set()
+    
+    def close(self) -> None:
+        """Flush and close the journal file, keeping it for recovery."""
+        if self._file is not None:
+            self._sync(force=True)
+        self._close_file()
+    
+    # Recording
+    
+    def _in_base(self, row_id: int) -> bool:
+        return row_id < self._base_next and (self._positions is None or self._positions[row_id] >= 0)
+    
+    def _journal_id(self, row_id: int) -> int:
+        if row_id >= self._base_next:
+            return self._base_rows + row_id - self._base_next
+        if self._positions is None:
+            return row_id
+        position = self._positions[row_id]
+        # A row deleted before the base was saved and then restored by undo is new to the base
+        return position if position >= 0 else -1 - row_id
+    
+    def _entry(self, op: str, row_id: int) -> dict:
+        entry = {'op': op, 'id': self._journal_id(row_id)}
+        if op != DELETE:
+            entry['waypoint'] = self._collection.store.get(row_id).to_dict()
+        return entry
+    
+    def _on_change(self, event: CollectionEvent) -> None:
+        if self.paused:
+            return
+        if event.kind in (INSERT, UPDATE, DELETE):
+            self._record(event.kind, (event.row_id,))
+        elif event.kind == RESET:
+            # Other resets re-sort or replace everything; the owner calls start() for those
+            if event.added is not None:
+                self._record(INSERT, event.added)
+            elif event.removed is not None:
+                self._record(DELETE, sorted(event.removed))
+    
+    def _record(self, op: str, row_ids: Iterable[int]) -> None:
+        row_ids = list(row_ids)
+        self._touched.update(row_ids)
+        if self._since_mark is not None:
+            self._since_mark.update(row_ids)
+        if self._deferred:
+            return
+        try:
+            if self._file is None:
+                self._open()
+            for row_id in row_ids:
+                self._file.write(json.dumps(self._entry(op, row_id), separators=(',', ':')))
+                self._file.write('\n')
+            self.records += len(row_ids)
+            self._sync()
+            if self.records >= JOURNAL_COMPACT_RECORDS and self.records >= 2 * len(self._touched):
+                self.compact()
+        except OSError as e:
+            print(f"Edit journal disabled, could not write {self.path}: {e}")
+            self._close_file()
+            self.paused = True
+    
+    def _open(self) -> None:
+        """Create the journal file with its header and point the session at it."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(json.dumps(self._header) + '\n')
+        self._write_pointer()
+    
+    def _write_pointer(self) -> None:
+        os.makedirs(journal_dir(), exist_ok=True)
+        with atomic_write(_session_pointer()) as f:
+            json.dump({'journal': self.path}, f)
+    
+    def _sync(self, force: bool = False) -> None:
+        """Flush every record at once (enough if the app crashes); fsync at most every JOURNAL_SYNC_INTERVAL."""
+        self._file.flush()
+        now = time.monotonic()
+        if force or now - self._last_sync >= JOURNAL_SYNC_INTERVAL:
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+    
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+    
+    # Compaction
+    
+    def _net_entry(self, row_id: int) -> Optional[dict]:
+        """Record taking the base row (or a new row) to its current state, if any."""
+        alive = self._collection.store.contains_id(row_id)
+        if self._in_base(row_id):
+            return self._entry(UPDATE if alive else DELETE, row_id)
+        return self._entry(INSERT, row_id) if alive else None
+    
+    def compact(self) -> None:
+        """Rewrite the journal with one record per edited row; costs O(edited rows)."""
+        if self.enabled and self.path is not None:
+            self._rewrite()
+    
+    def _rewrite(self) -> None:
+        self._close_file()
+        entries = [entry for entry in map(self._net_entry, sorted(self._touched)) if entry is not None]
+        if not entries:
+            discard_journal(self.path)
+            self.records = 0
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with atomic_write(self.path) as f:
+            f.write(json.dumps(self._header) + '\n')
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(',', ':')))
+                f.write('\n')
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self.records = len(entries)
+        self._write_pointer()
+    
+    # Recovery
+    
+    def replay(self, contents: JournalContents) -> int:
+        """
+        Apply a recovered journal to the attached collection.
+        
+        The collection must hold the base file, freshly loaded, and this
+        journal must have been started for it. The edits are journaled
+        again under the new row ids in a single compacted write.
+        
+        Args:
+            contents: Journal read with read_journal() or find_session_journal()
+        
+        Returns:
+            Number of records applied
+        """
+        collection = self._collection
+        if len(collection) != contents.base_rows:
+            raise ValueError(f"Expected {contents.base_rows} waypoints in the base file, found {len(collection)}")
+        # Journal ids of added rows -> their new row ids (base rows keep theirs)
+        row_ids: Dict[int, int] = {}
+        self._deferred = True
+        try:
+            for entry in contents.records:
+                journal_id = entry['id']
+                row_id = row_ids.get(journal_id, journal_id)
+                if entry['op'] == INSERT:
+                    row_ids[journal_id] = collection.add(Waypoint.from_dict(entry['waypoint']))
+                elif entry['op'] == UPDATE:
+                    collection.update(row_id, Waypoint.from_dict(entry['waypoint']))
+                elif entry['op'] == DELETE:
+                    collection.remove([row_id])
+        finally:
+            self._deferred = False
+        self.compact()
+        return len(contents.records)
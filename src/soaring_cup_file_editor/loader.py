@@ -0,0 +1,217 @@
+"""Background loading of CUP and CSV files in parsed chunks."""
+
+import io
+import os
+import queue
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from . import perf
+from .config import LOAD_CHUNK_ROWS, LOAD_QUEUE_CHUNKS
+from .file_io import RowError, iter_cup_stream, iter_csv_stream
+from .models import Waypoint
+from .parse_cache import content_digest, get_default_parse_cache
+
+# Supported file formats and their stream parsers
+FORMATS = {'cup': iter_cup_stream, 'csv': iter_csv_stream}
+
+
+class _CountingReader(io.RawIOBase):
+    """Raw file wrapper counting (and optionally hashing) the bytes read, for progress reporting."""
+    
+    def __init__(self, raw, digest=None):
+        self._raw = raw
+        self.count = 0
+        self.digest = digest
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        read = self._raw.readinto(buffer)
+        if read:
+            self.count += read
+            if self.digest is not None:
+                self.digest.update(memoryview(buffer)[:read])
+        return read
+    
+    def close(self) -> None:
+        self._raw.close()
+        super().close()
+
+
+class BackgroundLoader:
+    """
+    Parses a file on a worker thread and hands over the waypoints in chunks.
+    
+    The GUI polls take() (e.g. from a Tk ``after`` callback) and adds each
+    chunk as it arrives, so the first rows appear right away. A thread is
+    used rather than a process: the interpreter switches threads often
+    enough for the GUI to stay responsive, while sending Waypoint objects
+    back from a process would cost about as much as parsing them.
+    """
+    
+    def __init__(self, filepath: str, file_format: str = 'cup', chunk_rows: int = LOAD_CHUNK_ROWS):
+        """
+        Start loading a file.
+        
+        Args:
+            filepath: Path to a CUP or CSV file
+            file_format: 'cup' or 'csv'
+            chunk_rows: Waypoints per chunk
+        """
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown file format: {file_format}")
+        self.filepath = filepath
+        self.file_format = file_format
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self.errors: List[RowError] = []
+        self.total_bytes = os.path.getsize(filepath)
+        self.error: Optional[Exception] = None
+        self.cancelled = False
+        # True if the waypoints came from the parse cache
+        self.from_cache = False
+        self._reader: Optional[_CountingReader] = None
+        self._queue: "queue.Queue[List[Waypoint]]" = queue.Queue(LOAD_QUEUE_CHUNKS)
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._started = time.monotonic()
+        self._ended: Optional[float] = None
+        self._thread = threading.Thread(target=self._run, name="waypoint-loader", daemon=True)
+        self._thread.start()
+    
+    # Worker thread
+    
+    def _run(self) -> None:
+        try:
+            cache = get_default_parse_cache() if self.file_format == 'cup' else None
+            if cache is not None and not cache.accepts(self.total_bytes):
+                cache = None
+            if cache is not None and self._run_cached(cache):
+                return
+            with open(self.filepath, 'rb', buffering=0) as raw:
+                stat = os.fstat(raw.fileno())
+                self._reader = _CountingReader(raw, content_digest() if cache is not None else None)
+                text = io.TextIOWrapper(io.BufferedReader(self._reader), encoding='utf-8', newline='')
+                # Everything parsed is kept for the cache entry
+                parsed: Optional[List[Waypoint]] = [] if cache is not None else None
+                chunk: List[Waypoint] = []
+                for item in FORMATS[self.file_format](text, yield_errors=True):
+                    if self._cancel.is_set():
+                        return
+                    if isinstance(item, RowError):
+                        self.errors.append(item)
+                        continue
+                    chunk.append(item)
+                    if len(chunk) >= self.chunk_rows:
+                        if parsed is not None:
+                            parsed.extend(chunk)
+                        if not self._put(chunk):
+                            return
+                        chunk = []
+                if chunk:
+                    if parsed is not None:
+                        parsed.extend(chunk)
+                    if not self._put(chunk):
+                        return
+            if cache is not None:
+                cache.store(self.filepath, stat, self._reader.digest.digest(), parsed,
+                            [(e.line_num, e.text, e.error) for e in self.errors])
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ended = time.monotonic()
+            # Includes waiting for the GUI to take chunks
+            perf.record(f"load.{self.file_format}", self._ended - self._started)
+            self._finished.set()
+    
+    def _run_cached(self, cache) -> bool:
+        """Hand over the waypoints from the parse cache; False if the file has no valid entry."""
+        cached = cache.load(self.filepath)
+        if cached is None:
+            return False
+        self.from_cache = True
+        perf.count("cup.parse_cache_hits")
+        waypoints, errors = cached
+        self.errors = [RowError(*error) for error in errors]
+        for start in range(0, len(waypoints), self.chunk_rows):
+            if not self._put(waypoints[start:start + self.chunk_rows]):
+                break
+        return True
+    
+    def _put(self, chunk: List[Waypoint]) -> bool:
+        """Queue a chunk, waiting while the GUI is behind; False if cancelled meanwhile."""
+        while not self._cancel.is_set():
+            try:
+                self._queue.put(chunk, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    # Polling
+    
+    def take(self) -> List[Waypoint]:
+        """
+        Take the waypoints parsed since the last call, without blocking.
+        
+        Returns:
+            Waypoints in file order (empty if none are ready)
+        """
+        waypoints: List[Waypoint] = []
+        while True:
+            try:
+                waypoints.extend(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self.rows += len(waypoints)
+        perf.count("load.rows", len(waypoints))
+        return waypoints
+    
+    def cancel(self) -> None:
+        """Stop parsing; waypoints not taken yet are dropped."""
+        self.cancelled = True
+        self._cancel.set()
+    
+    @property
+    def done(self) -> bool:
+        """True once the worker has stopped and every chunk was taken."""
+        return self._finished.is_set() and self._queue.empty()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the worker thread has stopped.
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+        
+        Returns:
+            True if the worker has stopped
+        """
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+    
+    @property
+    def bytes_read(self) -> int:
+        if self.from_cache:
+            return self.total_bytes
+        return self._reader.count if self._reader else 0
+    
+    @property
+    def progress(self) -> Tuple[int, int]:
+        """Bytes read so far and in total."""
+        return min(self.bytes_read, self.total_bytes), self.total_bytes
+    
+    @property
+    def elapsed(self) -> float:
+        """Seconds since loading started (until the worker stopped)."""
+        end = self._ended if self._ended is not None else time.monotonic()
+        return end - self._started
+    
+    @property
+    def rows_per_second(self) -> float:
+        """Waypoints taken per second so far."""
+        elapsed = time.monotonic() - self._started
+        return self.rows / elapsed if elapsed > 0 else 0.0
@@ -1,14 +1,22 @@
 """Data models for waypoints."""
 
+import sys
 from dataclasses import dataclass, field
 from typing import Optional
 
+# Slotted dataclasses need Python 3.10+; older versions fall back to __dict__
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Waypoint:
     """
     Represents a waypoint with all SeeYou CUP format fields.
     
+    Fields are validated and normalized on construction. Data that has
+    already been validated (copies, cache reloads) can skip that work
+    with from_trusted().
+    
     CUP Format Fields:
     - name: Waypoint name (required)
     - code: Short code/identifier (optional, e.g., "EPBK" for airports)
@@ -150,8 +158,66 @@ class Waypoint:
         }
     
     @classmethod
-    def from_dict(cls, data: dict) -> 'Waypoint':
-        """Create waypoint from dictionary format."""
+    def from_trusted(cls, name: str, latitude: float, longitude: float,
+                     code: str = "", country: str = "", elevation: Optional[str] = None,
+                     style: int = 1, runway_direction: str = "", runway_length: str = "",
+                     runway_width: str = "", frequency: str = "",
+                     description: str = "") -> 'Waypoint':
+        """
+        Create a waypoint from already validated values without re-validating.
+        
+        Only use this for data that came out of a Waypoint (copies, caches,
+        files this program wrote); user input must go through the normal
+        constructor.
+        """
+        waypoint = cls.__new__(cls)
+        waypoint.name = name
+        waypoint.latitude = latitude
+        waypoint.longitude = longitude
+        waypoint.code = code
+        waypoint.country = country
+        waypoint.elevation = elevation
+        waypoint.style = style
+        waypoint.runway_direction = runway_direction
+        waypoint.runway_length = runway_length
+        waypoint.runway_width = runway_width
+        waypoint.frequency = frequency
+        waypoint.description = description
+        return waypoint
+    
+    def copy(self) -> 'Waypoint':
+        """Create an independent copy without re-running validation."""
+        return Waypoint.from_trusted(
+            self.name, self.latitude, self.longitude, self.code, self.country,
+            self.elevation, self.style, self.runway_direction, self.runway_length,
+            self.runway_width, self.frequency, self.description
+        )
+    
+    @classmethod
+    def from_dict(cls, data: dict, validate: bool = True) -> 'Waypoint':
+        """
+        Create waypoint from dictionary format.
+        
+        Args:
+            data: Dictionary as produced by to_dict()
+            validate: Set to False for dictionaries produced by to_dict()
+                to skip validation
+        """
+        if not validate:
+            return cls.from_trusted(
+                name=data['name'],
+                latitude=data['latitude'],
+                longitude=data['longitude'],
+                code=data.get('code', ''),
+                country=data.get('country', ''),
+                elevation=data.get('elevation') or None,
+                style=data.get('style', 1),
+                runway_direction=data.get('runway_direction', ''),
+                runway_length=data.get('runway_length', ''),
+                runway_width=data.get('runway_width', ''),
+                frequency=data.get('frequency', ''),
+                description=data.get('description', '')
+            )
         return cls(
             name=data.get('name', ''),
             latitude=float(data.get('latitude', 0.0)),
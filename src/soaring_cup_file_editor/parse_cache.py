@@ -0,0 +1,291 @@
+"""
+Binary cache of parsed CUP files, so reopening an unchanged file skips parsing.
+
+Each entry stores the waypoints of one file column by column: latitudes
+and longitudes as float64 arrays, styles as bytes, and every text column
+as one NUL-separated UTF-8 block, which loads with a single decode and
+split instead of tokenizing and validating every row. Entries are read
+through mmap.
+
+An entry is used only if the source file still has the path, size and
+modification time it had when parsed, and the same content hash (so a
+copy restored with an old timestamp is not mistaken for the cached one).
+Entries also record the program version, as a newer parser may read the
+same file differently.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+from . import __version__
+from .config import PARSE_CACHE_DIR, PARSE_CACHE_ENABLED, PARSE_CACHE_MAX_FILES, PARSE_CACHE_MIN_BYTES
+from .elevation_cache import user_cache_dir
+from .models import Waypoint
+
+# (line number, row text, error message) of rows that failed to parse
+CachedError = Tuple[int, str, str]
+
+MAGIC = b'CUPPARS1'
+# Magic, rows, errors, source size, source mtime (ns), content digest, path and version lengths
+_HEADER = struct.Struct('<8sIIQq16sII')
+_SECTION = struct.Struct('<Q')
+_SEPARATOR = '\x00'
+_TEXT_FIELDS = ('name', 'code', 'country', 'elevation', 'runway_direction', 'runway_length',
+                'runway_width', 'frequency', 'description')
+_DIGEST_SIZE = 16
+_READ_SIZE = 1 << 20
+
+
+def content_digest(data: bytes = b''):
+    """New hash object for the content of a source file (update() it with the bytes read)."""
+    return hashlib.blake2b(data, digest_size=_DIGEST_SIZE)
+
+
+def file_digest(filepath: str) -> bytes:
+    """
+    Hash the content of a file.
+    
+    Args:
+        filepath: File to read
+    
+    Returns:
+        Digest as stored in cache entries
+    """
+    digest = content_digest()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(_READ_SIZE), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def _native(values: array) -> array:
+    # Entries are little-endian
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _join(values: Sequence[str]) -> bytes:
+    joined = _SEPARATOR.join(values)
+    if joined.count(_SEPARATOR) != max(len(values) - 1, 0):
+        raise ValueError("NUL character in a value")
+    return joined.encode('utf-8')
+
+
+def _split(block: bytes, count: int) -> List[str]:
+    if not count:
+        return []
+    values = block.decode('utf-8').split(_SEPARATOR)
+    if len(values) != count:
+        raise ValueError("corrupt text column")
+    return values
+
+
+class ParseCache:
+    """
+    Directory of parse cache entries, one per source file.
+    
+    Attributes:
+        hits: Number of files loaded from the cache
+        misses: Number of files that had to be parsed
+    """
+    
+    def __init__(self, directory: str, min_bytes: int = PARSE_CACHE_MIN_BYTES,
+                 max_files: int = PARSE_CACHE_MAX_FILES):
+        """
+        Initialize the cache (the directory is created on the first store).
+        
+        Args:
+            directory: Directory holding the entries
+            min_bytes: Source files smaller than this are not cached
+            max_files: Entries kept before the least recently used ones are deleted
+        """
+        self.directory = directory
+        self.min_bytes = min_bytes
+        self.max_files = max_files
+        self.hits = 0
+        self.misses = 0
+    
+    def entry_path(self, filepath: str) -> str:
+        """Get the cache entry used for a source file."""
+        key = hashlib.blake2b(os.path.abspath(filepath).encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"{key}.cupcache")
+    
+    def accepts(self, size: int) -> bool:
+        """Check whether a source file of ``size`` bytes is worth caching."""
+        return size >= self.min_bytes
+    
+    def load(self, filepath: str) -> Optional[Tuple[List[Waypoint], List[CachedError]]]:
+        """
+        Load the waypoints of a source file from its cache entry.
+        
+        Args:
+            filepath: Path of the CUP file
+        
+        Returns:
+            (waypoints, errors) as parsing the file would give them, or None
+            if there is no valid entry for the file as it is now
+        """
+        try:
+            stat = os.stat(filepath)
+            if not self.accepts(stat.st_size):
+                return None
+            entry = self.entry_path(filepath)
+            with open(entry, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                result = self._read(data, filepath, stat)
+            if result is not None:
+                self.hits += 1
+                # Marks the entry as recently used for pruning
+                os.utime(entry)
+                return result
+        except (OSError, ValueError, struct.error, UnicodeDecodeError):
+            pass
+        self.misses += 1
+        return None
+    
+    def _read(self, data: mmap.mmap, filepath: str, stat: os.stat_result):
+        magic, rows, error_count, size, mtime_ns, digest, path_len, version_len = _HEADER.unpack_from(data, 0)
+        offset = _HEADER.size
+        path = data[offset:offset + path_len].decode('utf-8')
+        offset += path_len
+        version = data[offset:offset + version_len].decode('utf-8')
+        offset += version_len
+        if (magic != MAGIC or version != __version__ or path != os.path.abspath(filepath)
+                or size != stat.st_size or mtime_ns != stat.st_mtime_ns):
+            return None
+        if digest != file_digest(filepath):
+            return None
+        
+        sections = []
+        while offset < len(data):
+            length, = _SECTION.unpack_from(data, offset)
+            offset += _SECTION.size
+            sections.append(data[offset:offset + length])
+            offset += length
+        if len(sections) != 3 + len(_TEXT_FIELDS) + 3:
+            raise ValueError("corrupt cache entry")
+        
+        latitudes = _native(array('d', sections[0])).tolist()
+        longitudes = _native(array('d', sections[1])).tolist()
+        styles = list(sections[2])
+        if not (len(latitudes) == len(longitudes) == len(styles) == rows):
+            raise ValueError("corrupt cache entry")
+        text = {name: _split(block, rows) for name, block in zip(_TEXT_FIELDS, sections[3:])}
+        # The parser stores a missing elevation as None
+        elevations = [elevation or None for elevation in text['elevation']]
+        waypoints = list(map(
+            Waypoint.from_trusted, text['name'], latitudes, longitudes, text['code'], text['country'],
+            elevations, styles, text['runway_direction'], text['runway_length'], text['runway_width'],
+            text['frequency'], text['description']
+        ))
+        
+        line_numbers = _native(array('q', sections[-3])).tolist()
+        errors = list(zip(line_numbers, _split(sections[-2], error_count), _split(sections[-1], error_count)))
+        if len(errors) != error_count:
+            raise ValueError("corrupt cache entry")
+        return waypoints, errors
+    
+    def store(self, filepath: str, stat: os.stat_result, digest: bytes,
+              waypoints: Sequence[Waypoint], errors: Sequence[CachedError]) -> bool:
+        """
+        Write the cache entry of a parsed source file.
+        
+        Args:
+            filepath: Path of the CUP file
+            stat: os.stat() of the file taken before it was read
+            digest: Digest of the bytes parsed (see content_digest())
+            waypoints: Waypoints parsed from the file
+            errors: Rows that failed to parse
+        
+        Returns:
+            True if the entry was written (False for small files, values
+            containing NUL characters, or write errors)
+        """
+        if not self.accepts(stat.st_size):
+            return False
+        try:
+            sections = [
+                _native(array('d', [w.latitude for w in waypoints])).tobytes(),
+                _native(array('d', [w.longitude for w in waypoints])).tobytes(),
+                bytes(w.style for w in waypoints),
+                *[_join([getattr(w, name) or '' for w in waypoints]) for name in _TEXT_FIELDS],
+                _native(array('q', [line_num for line_num, _, _ in errors])).tobytes(),
+                _join([row for _, row, _ in errors]),
+                _join([message for _, _, message in errors]),
+            ]
+        except (TypeError, ValueError):
+            # Values with NUL characters cannot be stored
+            return False
+        path = os.path.abspath(filepath).encode('utf-8')
+        version = __version__.encode('utf-8')
+        entry = self.entry_path(filepath)
+        temp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # A unique name, as other threads and processes may write the same entry
+            fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(entry)}.", suffix='.tmp',
+                                             dir=self.directory)
+            with open(fd, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, len(waypoints), len(errors), stat.st_size, stat.st_mtime_ns,
+                                     digest, len(path), len(version)))
+                f.write(path)
+                f.write(version)
+                for section in sections:
+                    f.write(_SECTION.pack(len(section)))
+                    f.write(section)
+            os.replace(temp_path, entry)
+        except (OSError, ValueError) as e:
+            print(f"Parse cache entry for {filepath} not written: {e}")
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+        self._prune()
+        return True
+    
+    def _prune(self) -> None:
+        """Delete the least recently used entries beyond max_files."""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.cupcache')]
+            entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+            for entry in entries[self.max_files:]:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+
+_default_cache: Optional[ParseCache] = None
+_default_cache_disabled = False
+
+
+def get_default_parse_cache() -> Optional[ParseCache]:
+    """
+    Get the shared parse cache in the user cache directory.
+    
+    Returns:
+        The cache, or None if parse caching is disabled
+    """
+    global _default_cache
+    if not PARSE_CACHE_ENABLED or _default_cache_disabled:
+        return None
+    if _default_cache is None:
+        _default_cache = ParseCache(PARSE_CACHE_DIR or os.path.join(user_cache_dir(), 'parsed'))
+    return _default_cache
+
+
+def set_default_parse_cache(cache: Optional[ParseCache]) -> None:
+    """
+    Replace the shared parse cache (None disables it).
+    
+    Args:
+        cache: Cache to use for subsequent parses
+    """
+    global _default_cache, _default_cache_disabled
+    _default_cache = cache
+    _default_cache_disabled = cache is None
@@ -0,0 +1,290 @@
+"""
+Lightweight timers and counters for finding out where time goes.
+
+Instrumentation is off by default. Turn it on with enable(), from the GUI's
+Performance panel, or by setting the SOARING_CUP_PERF environment variable
+("1", or "profile" to also run cProfile) before starting the editor or the
+command line.
+
+Two kinds of measurements are collected:
+
+- Stage timers placed in the code with ``with perf.timer("save.write"):``
+  around whole operations (loading a file, an elevation request, a table
+  refresh). When disabled, timer() returns a shared no-op context manager,
+  so the cost is one function call per operation.
+- Per-row probes (validation in Waypoint.__post_init__, coordinate
+  conversion, row formatting) are not in the code at all: enable() wraps
+  those functions with timed versions and disable() puts the originals
+  back, so they cost nothing while disabled.
+
+Times are inclusive: a row parse includes the validation it triggers.
+"""
+
+import atexit
+import importlib
+import io
+import os
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from .config import PERF_ENV_VAR, PERF_PROFILE_FILE, PERF_PROFILE_LINES
+
+if TYPE_CHECKING:  # Imported when profiling starts; perf is imported on every startup
+    import cProfile
+    import pstats
+
+# Functions wrapped while enabled: (module, attribute path, operation name).
+# Modules are imported on enable(), except GUI modules, which are only
+# instrumented if already loaded so the command line never imports tkinter.
+PROBES: List[Tuple[str, str, str]] = [
+    ('soaring_cup_file_editor.models', 'Waypoint.__post_init__', 'waypoint.validate'),
+    ('soaring_cup_file_editor.file_io', '_waypoint_from_cup_fields', 'cup.parse_row'),
+    ('soaring_cup_file_editor.file_io', '_waypoint_from_csv_row', 'csv.parse_row'),
+    ('soaring_cup_file_editor.file_io', '_format_cup_row', 'cup.format_row'),
+    ('soaring_cup_file_editor.file_io', 'ddmm_to_deg', 'coords.parse'),
+    ('soaring_cup_file_editor.file_io', 'deg_to_ddmm', 'coords.format'),
+    ('soaring_cup_file_editor.gui.waypoint_table', 'format_row', 'table.format_row'),
+]
+
+enabled = False
+_stats: Dict[str, List[float]] = {}  # name -> [calls, total seconds, max seconds]
+_counters: Dict[str, int] = {}
+_lock = threading.Lock()
+_originals: List[Tuple[object, str, object]] = []
+_profiler: Optional['cProfile.Profile'] = None
+
+
+class _NullTimer:
+    """Timer used while disabled: does nothing."""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """Records the time spent in a with block under an operation name."""
+    
+    __slots__ = ('name', 'start')
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def timer(name: str):
+    """
+    Time a with block as one call of an operation.
+    
+    Args:
+        name: Operation name, e.g. "save.write"
+    
+    Returns:
+        Context manager (a no-op while instrumentation is disabled)
+    """
+    return _Timer(name) if enabled else _NULL_TIMER
+
+
+def record(name: str, seconds: float) -> None:
+    """Add one call of an operation that took ``seconds`` (ignored while disabled)."""
+    if not enabled:
+        return
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            _stats[name] = [1, seconds, seconds]
+        else:
+            stat[0] += 1
+            stat[1] += seconds
+            if seconds > stat[2]:
+                stat[2] = seconds
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add to a counter, e.g. rows inserted or locations looked up (ignored while disabled)."""
+    if enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+
+# Switching on and off
+
+
+def _wrap(function: Callable, name: str) -> Callable:
+    perf_counter = time.perf_counter
+    
+    def timed(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(name, perf_counter() - start)
+    timed.__wrapped__ = function
+    timed.__name__ = getattr(function, '__name__', name)
+    return timed
+
+
+def _install_probes() -> None:
+    for module_name, path, name in PROBES:
+        if '.gui.' in module_name and module_name not in sys.modules:
+            continue
+        owner = importlib.import_module(module_name)
+        *parents, attribute = path.split('.')
+        for parent in parents:
+            owner = getattr(owner, parent)
+        original = getattr(owner, attribute)
+        _originals.append((owner, attribute, original))
+        setattr(owner, attribute, _wrap(original, name))
+
+
+def _remove_probes() -> None:
+    while _originals:
+        owner, attribute, original = _originals.pop()
+        setattr(owner, attribute, original)
+
+
+def enable() -> None:
+    """Start collecting timings and counters."""
+    global enabled
+    if not enabled:
+        _install_probes()
+        enabled = True
+
+
+def disable() -> None:
+    """Stop collecting (the collected data is kept until reset())."""
+    global enabled
+    if enabled:
+        enabled = False
+        _remove_probes()
+
+
+def reset() -> None:
+    """Forget all timings and counters."""
+    with _lock:
+        _stats.clear()
+        _counters.clear()
+
+
+# Profiling
+
+
+def start_profile() -> None:
+    """Run cProfile on the calling thread (the GUI thread; worker threads are not profiled)."""
+    global _profiler
+    if _profiler is None:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def stop_profile() -> Optional['pstats.Stats']:
+    """
+    Stop cProfile.
+    
+    Returns:
+        The collected statistics, or None if no profile was running
+    """
+    global _profiler
+    if _profiler is None:
+        return None
+    profiler, _profiler = _profiler, None
+    profiler.disable()
+    import pstats
+    return pstats.Stats(profiler)
+
+
+def is_profiling() -> bool:
+    """Whether start_profile() is running."""
+    return _profiler is not None
+
+
+def profile_summary(stats: 'pstats.Stats', lines: int = PERF_PROFILE_LINES) -> str:
+    """Functions with the most cumulative time, as pstats prints them."""
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats('cumulative').print_stats(lines)
+    return out.getvalue()
+
+
+# Reports
+
+
+def snapshot() -> Tuple[Dict[str, Tuple[int, float, float]], Dict[str, int]]:
+    """
+    Copy of the collected data.
+    
+    Returns:
+        Tuple of ({operation: (calls, total seconds, max seconds)}, {counter: value})
+    """
+    with _lock:
+        return {name: tuple(stat) for name, stat in _stats.items()}, dict(_counters)
+
+
+def report() -> str:
+    """Per-operation report: calls, total, mean and maximum time, then the counters."""
+    stats, counters = snapshot()
+    if not stats and not counters:
+        return "No timings collected" + ("" if enabled else " (instrumentation is off)") + "\n"
+    lines = [f"{'Operation':28} {'Calls':>9} {'Total s':>10} {'Mean ms':>10} {'Max ms':>10}"]
+    for name, (calls, total, longest) in sorted(stats.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:28} {calls:9d} {total:10.3f} {total / calls * 1e3:10.4f} {longest * 1e3:10.3f}")
+    if counters:
+        lines.append("")
+        lines.append(f"{'Counter':28} {'Value':>9}")
+        for name, value in sorted(counters.items()):
+            lines.append(f"{name:28} {value:9d}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(filepath: str) -> None:
+    """
+    Write the report to a text file.
+    
+    Args:
+        filepath: Path of the report
+    """
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(report())
+
+
+# Environment variable
+
+
+def enable_from_env() -> None:
+    """
+    Turn instrumentation on if the SOARING_CUP_PERF environment variable asks for it.
+    
+    The report (and with "profile", the top functions) is printed to stderr
+    at exit, and the profile saved to PERF_PROFILE_FILE for pstats or snakeviz.
+    """
+    mode = os.environ.get(PERF_ENV_VAR, '').strip().lower()
+    if mode in ('', '0', 'off', 'false', 'no'):
+        return
+    enable()
+    if mode == 'profile':
+        start_profile()
+    atexit.register(_report_at_exit)
+
+
+def _report_at_exit() -> None:
+    sys.stderr.write(report())
+    stats = stop_profile()
+    if stats is not None:
+        stats.dump_stats(PERF_PROFILE_FILE)
+        sys.stderr.write(profile_summary(stats))
+        sys.stderr.write(f"Profile saved to {os.path.abspath(PERF_PROFILE_FILE)}\n")
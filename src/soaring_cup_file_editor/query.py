@@ -0,0 +1,1102 @@
+"""Structured waypoint queries with an index-aware planner."""
+
+import math
+import re
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from .collection import CollectionEvent, WaypointCollection, INSERT, UPDATE, DELETE, MOVE
+from .config import STYLE_OPTIONS, STYLE_LABELS
+from .models import Waypoint
+from .search import NGRAM, TextIndex, tokenize
+from .spatial import SpatialIndex, haversine_m
+from .store import WaypointRow, WaypointStore
+from .utils import fold_text, parse_length
+
+# Fields indexed with one bitmap per distinct value
+BITMAP_FIELDS = ('style', 'country')
+# Numeric fields indexed as sorted columns (lengths are converted to metres)
+NUMERIC_FIELDS = ('latitude', 'longitude', 'elevation', 'runway_length', 'runway_width', 'frequency')
+LENGTH_FIELDS = ('elevation', 'runway_length', 'runway_width')
+TEXT_FIELDS = ('name', 'code', 'description', 'runway_direction')
+# Name of the spatial index among the per-field ones
+SPATIAL = 'spatial'
+# Fields covered by the full-text index
+SEARCHED_FIELDS = ('name', 'code', 'description')
+
+FIELD_ALIASES = {
+    'lat': 'latitude',
+    'lon': 'longitude',
+    'elev': 'elevation',
+    'rwlen': 'runway_length',
+    'rwwidth': 'runway_width',
+    'rwdir': 'runway_direction',
+    'freq': 'frequency',
+    'desc': 'description',
+    'type': 'style',
+}
+
+OPERATORS = ('=', '!=', '<', '<=', '>', '>=', '~')
+
+
+class QueryError(ValueError):
+    """A query that cannot be parsed or run."""
+
+
+def field_name(name: str) -> str:
+    """
+    Resolve a field name or alias.
+    
+    Args:
+        name: Waypoint field name or alias (e.g. "rwlen"), any case
+    
+    Returns:
+        Waypoint field name
+    
+    Raises:
+        QueryError: Unknown field
+    """
+    key = name.lower()
+    key = FIELD_ALIASES.get(key, key)
+    if key not in BITMAP_FIELDS + NUMERIC_FIELDS + TEXT_FIELDS:
+        raise QueryError(f"Unknown field '{name}'")
+    return key
+
+
+# Conditions
+
+
+class Condition:
+    """Base class of query conditions; combine with &, | and ~."""
+    
+    def __and__(self, other: 'Condition') -> 'Condition':
+        return And([self, other])
+    
+    def __or__(self, other: 'Condition') -> 'Condition':
+        return Or([self, other])
+    
+    def __invert__(self) -> 'Condition':
+        return Not(self)
+
+
+@dataclass(eq=False)
+class Compare(Condition):
+    """Field compared to a value; "~" means contains (text fields)."""
+    field: str
+    op: str
+    value: Union[str, float, int]
+    
+    def __str__(self) -> str:
+        return f"{self.field} {self.op} {self.value!r}"
+
+
+@dataclass(eq=False)
+class In(Condition):
+    """Field equal to one of several values."""
+    field: str
+    values: Tuple[Union[str, float, int], ...]
+    
+    def __str__(self) -> str:
+        return f"{self.field} IN ({', '.join(repr(value) for value in self.values)})"
+
+
+@dataclass(eq=False)
+class Within(Condition):
+    """
+    Waypoints within a distance of a point or of another waypoint.
+    
+    Attributes:
+        radius_m: Distance in metres
+        latitude: Centre latitude (if ``of`` is not given)
+        longitude: Centre longitude (if ``of`` is not given)
+        of: Code or name of the waypoint at the centre
+    """
+    radius_m: float
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    of: Optional[str] = None
+    
+    def __str__(self) -> str:
+        centre = self.of if self.of is not None else f"{self.latitude}, {self.longitude}"
+        return f"WITHIN {self.radius_m / 1000:g} km OF {centre}"
+
+
+@dataclass(eq=False)
+class Text(Condition):
+    """Free-text search over name, code and description (see TextIndex.search)."""
+    text: str
+    
+    def __str__(self) -> str:
+        return repr(self.text)
+
+
+@dataclass(eq=False)
+class And(Condition):
+    """All parts match."""
+    parts: List[Condition]
+    
+    def __and__(self, other: Condition) -> Condition:
+        return And(self.parts + [other])
+    
+    def __str__(self) -> str:
+        return ' AND '.join(f"({part})" if isinstance(part, Or) else str(part) for part in self.parts)
+
+
+@dataclass(eq=False)
+class Or(Condition):
+    """Any part matches."""
+    parts: List[Condition]
+    
+    def __or__(self, other: Condition) -> Condition:
+        return Or(self.parts + [other])
+    
+    def __str__(self) -> str:
+        return ' OR '.join(str(part) for part in self.parts)
+
+
+@dataclass(eq=False)
+class Not(Condition):
+    """The part does not match."""
+    part: Condition
+    
+    def __str__(self) -> str:
+        return f"NOT ({self.part})"
+
+
+# Builder API
+
+
+class Field:
+    """
+    Condition builder for one field.
+    
+    Example:
+        >>> query = (Field('style').isin(2, 4, 5) & (Field('country') == 'PL')
+        ...          & within('40km', of='EPBK') & (Field('rwlen') >= '600m'))
+    """
+    
+    def __init__(self, name: str):
+        self.name = field_name(name)
+    
+    def __eq__(self, value) -> Compare:  # type: ignore[override]
+        return Compare(self.name, '=', value)
+    
+    def __ne__(self, value) -> Compare:  # type: ignore[override]
+        return Compare(self.name, '!=', value)
+    
+    def __lt__(self, value) -> Compare:
+        return Compare(self.name, '<', value)
+    
+    def __le__(self, value) -> Compare:
+        return Compare(self.name, '<=', value)
+    
+    def __gt__(self, value) -> Compare:
+        return Compare(self.name, '>', value)
+    
+    def __ge__(self, value) -> Compare:
+        return Compare(self.name, '>=', value)
+    
+    __hash__ = None  # type: ignore[assignment]
+    
+    def isin(self, *values) -> In:
+        """Field equal to one of the values."""
+        return In(self.name, tuple(values))
+    
+    def contains(self, text: str) -> Compare:
+        """Text field containing the text (ignoring case and diacritics)."""
+        return Compare(self.name, '~', text)
+
+
+def within(distance: Union[str, float], of: Optional[str] = None,
+           latitude: Optional[float] = None, longitude: Optional[float] = None) -> Within:
+    """
+    Build a distance condition.
+    
+    Args:
+        distance: Metres, or a length with unit (e.g. "40km", "20nm")
+        of: Code or name of the waypoint at the centre
+        latitude: Centre latitude (instead of ``of``)
+        longitude: Centre longitude (instead of ``of``)
+    
+    Returns:
+        Within condition
+    """
+    radius_m = parse_length(distance) if isinstance(distance, str) else float(distance)
+    if radius_m is None:
+        raise QueryError(f"Invalid distance '{distance}'")
+    if of is None and (latitude is None or longitude is None):
+        raise QueryError("within() needs a waypoint or a latitude and longitude")
+    return Within(radius_m, latitude, longitude, of)
+
+
+# Query text parsing
+
+_TOKEN = re.compile(r'''\s*(?:
+      (?P<string>"[^"]*"|'[^']*')
+    | (?P<op><=|>=|!=|==|=|<|>|~)
+    | (?P<punct>[(),])
+    | (?P<number>[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:\s*(?:km|nm|ml|mi|ft|m)\b)?)
+    | (?P<word>[^\s()<>=!~,"']+)
+    )''', re.VERBOSE | re.IGNORECASE)
+_KEYWORDS = ('and', 'or', 'not', 'in', 'within', 'of')
+
+
+@dataclass
+class _Token:
+    kind: str
+    text: str
+    position: int
+    
+    @property
+    def keyword(self) -> Optional[str]:
+        if self.kind == 'word' and self.text.lower() in _KEYWORDS:
+            return self.text.lower()
+        return None
+
+
+def _is_field(token: _Token) -> bool:
+    """Whether a token names a field or alias."""
+    try:
+        return token.kind == 'word' and bool(field_name(token.text))
+    except QueryError:
+        return False
+
+
+def _tokenize_query(text: str) -> List[_Token]:
+    tokens = []
+    position = 0
+    while position < len(text):
+        if text[position:].strip() == '':
+            break
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise QueryError(f"Unexpected character at position {position + 1}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'string':
+            value = value[1:-1]
+        tokens.append(_Token(kind, value, match.start(kind)))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser of the query language (see parse_query)."""
+    
+    def __init__(self, text: str):
+        self.tokens = _tokenize_query(text)
+        self.pos = 0
+    
+    def peek(self, offset: int = 0) -> Optional[_Token]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+    
+    def take(self) -> _Token:
+        token = self.peek()
+        if token is None:
+            raise QueryError("Unexpected end of query")
+        self.pos += 1
+        return token
+    
+    def expect(self, text: str) -> None:
+        token = self.take()
+        if token.text.lower() != text:
+            raise QueryError(f"Expected '{text}' at position {token.position + 1}")
+    
+    def parse(self) -> Optional[Condition]:
+        tokens = self.tokens
+        # An operator still being typed after plain words ("glider not", "glider =")
+        # is ignored, so the words are searched meanwhile
+        while tokens and (tokens[-1].keyword in ('and', 'or', 'not') or (
+                tokens[-1].kind == 'op' and len(tokens) > 1 and not _is_field(tokens[-2]))):
+            tokens.pop()
+        if not tokens:
+            return None
+        condition = self.or_expr()
+        if self.peek() is not None:
+            token = self.peek()
+            raise QueryError(f"Unexpected '{token.text}' at position {token.position + 1}")
+        return condition
+    
+    def or_expr(self) -> Condition:
+        parts = [self.and_expr()]
+        while self.peek() is not None and self.peek().keyword == 'or':
+            self.take()
+            parts.append(self.and_expr())
+        return parts[0] if len(parts) == 1 else Or(parts)
+    
+    def and_expr(self) -> Condition:
+        parts = [self.unary()]
+        while True:
+            token = self.peek()
+            if token is None or token.keyword == 'or' or token.text == ')':
+                break
+            if token.keyword == 'and':
+                self.take()
+            parts.append(self.unary())  # Juxtaposed conditions are ANDed
+        return parts[0] if len(parts) == 1 else And(parts)
+    
+    def unary(self) -> Condition:
+        token = self.peek()
+        if token is not None and token.keyword == 'not':
+            self.take()
+            return Not(self.unary())
+        return self.primary()
+    
+    def primary(self) -> Condition:
+        token = self.take()
+        if token.text == '(':
+            condition = self.or_expr()
+            self.expect(')')
+            return condition
+        if token.keyword == 'within':
+            return self.within()
+        following = self.peek()
+        if token.kind == 'word' and self.field_follows(token):
+            name = field_name(token.text)
+            if following.kind == 'op':
+                op = self.take().text
+                return Compare(name, '=' if op == '==' else op, self.value())
+            negated = following.keyword == 'not'
+            if negated:
+                self.take()
+            self.expect('in')
+            self.expect('(')
+            values = [self.value()]
+            while self.peek() is not None and self.peek().text == ',':
+                self.take()
+                values.append(self.value())
+            self.expect(')')
+            condition = In(name, tuple(values))
+            return Not(condition) if negated else condition
+        if token.kind in ('word', 'string', 'number') and token.keyword in (None, 'in', 'of'):
+            return Text(token.text)  # "in" and "of" are only keywords after a field or distance
+        raise QueryError(f"Unexpected '{token.text}' at position {token.position + 1}")
+    
+    def field_follows(self, word: _Token) -> bool:
+        """Whether the word just taken starts a comparison or IN list (else it is searched)."""
+        following, after = self.peek(), self.peek(1)
+        if following is None:
+            return False
+        if following.kind == 'op' or following.keyword == 'in':
+            # A bare word before an unfinished operator is searched, not reported as a field
+            return after is not None or _is_field(word)
+        return following.keyword == 'not' and after is not None and after.keyword == 'in'
+    
+    def value(self) -> str:
+        token = self.take()
+        if token.kind not in ('word', 'string', 'number'):
+            raise QueryError(f"Expected a value at position {token.position + 1}")
+        return token.text
+    
+    def within(self) -> Within:
+        token = self.take()
+        radius_m = parse_length(token.text) if token.kind == 'number' else None
+        if radius_m is None:
+            raise QueryError(f"Expected a distance at position {token.position + 1}")
+        self.expect('of')
+        first = self.take()
+        if first.kind == 'number' and self.peek() is not None and self.peek().text == ',':
+            self.take()
+            second = self.take()
+            try:
+                return Within(radius_m, float(first.text), float(second.text))
+            except ValueError:
+                raise QueryError(f"Invalid coordinates at position {first.position + 1}")
+        if first.kind not in ('word', 'string'):
+            raise QueryError(f"Expected a waypoint or coordinates at position {first.position + 1}")
+        return Within(radius_m, of=first.text)
+
+
+def parse_query(text: str) -> Optional[Condition]:
+    """
+    Parse a query.
+    
+    The language combines conditions with AND, OR, NOT and parentheses
+    (juxtaposed conditions are ANDed, so plain words work as a search):
+    
+    - ``field = value`` with ``=``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, or
+      ``~`` (contains); lengths accept units, e.g. ``runway_length >= 600m``
+    - ``field IN (value, ...)`` and ``field NOT IN (...)``
+    - ``WITHIN 40km OF EPBK`` or ``WITHIN 10nm OF 50.1, 19.2``
+    - any other word or "quoted text" searches name, code and description
+    
+    A trailing AND, OR or NOT, or an operator after a word that is not a
+    field, is ignored while it is being typed.
+    
+    Styles can be given as numbers or labels, e.g. ``style = "Gliding airfield"``.
+    
+    Example:
+        >>> parse_query('style in (2,4,5) AND country=PL AND within 40 km of EPBK AND rwlen >= 600m')
+    
+    Args:
+        text: Query text
+    
+    Returns:
+        Condition, or None for an empty query
+    
+    Raises:
+        QueryError: Invalid query
+    """
+    return _Parser(text).parse()
+
+
+# Planning and execution
+
+
+@dataclass
+class PlanStep:
+    """One step of an executed query plan."""
+    description: str
+    rows: int
+    elapsed: float
+
+
+@dataclass
+class QueryResult:
+    """
+    Result of QueryEngine.run().
+    
+    Attributes:
+        ids: Row ids of the matching waypoints
+        elapsed: Seconds spent running the query (excluding index builds)
+        steps: Executed plan steps, in order
+        index_build: Seconds spent building indexes for this query
+    """
+    ids: Set[int]
+    elapsed: float
+    steps: List[PlanStep] = field(default_factory=list)
+    index_build: float = 0.0
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    @property
+    def used_index(self) -> bool:
+        """Whether any step used an index instead of scanning all rows."""
+        return not any(step.description.startswith('scan') for step in self.steps)
+    
+    def summary(self) -> str:
+        """Describe the result, its timing and the plan on several lines."""
+        lines = [f"{len(self.ids)} matches in {self.elapsed * 1000:.2f} ms"]
+        if self.index_build:
+            lines[0] += f" (+{self.index_build * 1000:.0f} ms building indexes)"
+        for step in self.steps:
+            lines.append(f"  {step.description}: {step.rows} rows, {step.elapsed * 1000:.2f} ms")
+        return '\n'.join(lines)
+
+
+def _bitmap_ids(bitmap: int) -> List[int]:
+    """Positions of the set bits of a bitmap."""
+    bits = bin(bitmap)[:1:-1]
+    ids = []
+    position = bits.find('1')
+    while position >= 0:
+        ids.append(position)
+        position = bits.find('1', position + 1)
+    return ids
+
+
+def _bit_count(bitmap: int) -> int:
+    return bin(bitmap).count('1')
+
+
+def _bitmap_of(row_ids: Iterable[int], size: int) -> int:
+    """Bitmap with the bits of the given ids set."""
+    bits = bytearray((size + 7) // 8)
+    for row_id in row_ids:
+        bits[row_id >> 3] |= 1 << (row_id & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class _Source:
+    """Candidate rows produced by an index, before they are materialized."""
+    
+    def __init__(self, description: str, estimate: int, materialize: Callable[[], Set[int]],
+                 test: Callable[[int], bool], bitmap: Optional[int] = None):
+        self.description = description
+        self.estimate = estimate
+        self.materialize = materialize
+        self.test = test
+        self.bitmap = bitmap
+
+
+class QueryEngine:
+    """
+    Runs queries over a WaypointCollection using indexes where possible.
+    
+    The engine keeps, per row id:
+    
+    - one bitmap (a Python int) per distinct style and country,
+    - sorted (value, row id) columns of the numeric fields,
+    - a SpatialIndex for WITHIN conditions,
+    - a TextIndex for free text (shared with the search box if given).
+    
+    The planner answers each AND from its most selective indexed condition
+    and checks the remaining conditions on those candidates only; OR and
+    NOT are answered from indexes when all their parts are indexed. Only
+    queries without any indexed condition scan all rows.
+    
+    Each index is built by the first query that uses its field, so a
+    query after loading a file only waits for the columns it needs, and
+    then follows the collection's change events.
+    """
+    
+    def __init__(self, collection: WaypointCollection, text_index: Optional[TextIndex] = None):
+        """
+        Create an engine following a collection.
+        
+        Args:
+            collection: Waypoints to query
+            text_index: Text index already attached to the collection (created if None)
+        """
+        self.collection = collection
+        if text_index is None:
+            text_index = TextIndex()
+            text_index.attach(collection)
+        self.text_index = text_index
+        self._stale = True
+        self._live = 0
+        self._built: Set[str] = set()
+        self._bitmaps: Dict[str, Dict[object, int]] = {}
+        self._row_values: Dict[str, Dict[int, object]] = {}
+        self._numbers: Dict[str, array] = {}
+        self._sorted: Dict[str, Tuple[array, array]] = {}
+        self._spatial = SpatialIndex()
+        collection.subscribe(self._on_change)
+    
+    def close(self) -> None:
+        """Stop following the collection."""
+        self.collection.unsubscribe(self._on_change)
+    
+    # Index maintenance
+    
+    def build(self) -> None:
+        """Build all indexes now instead of on the queries that need them."""
+        for name in BITMAP_FIELDS + NUMERIC_FIELDS + (SPATIAL,):
+            self._ensure(name)
+        self.text_index.build()
+    
+    def _ensure_live(self) -> None:
+        """Start over from the set of live rows if the collection changed wholesale."""
+        if not self._stale:
+            return
+        self._stale = False
+        store = self.collection.store
+        self._live = _bitmap_of(store.row_ids(), store.next_row_id)
+        self._built = set()
+        self._bitmaps = {}
+        self._row_values = {}
+        self._numbers = {}
+        self._sorted = {}
+        self._spatial = SpatialIndex()
+    
+    def _ensure(self, name: str) -> None:
+        """
+        Build the index of one field (or SPATIAL) if it is not built yet.
+        
+        Each index is read straight from the store's columns, so a query
+        only pays for the fields it uses.
+        """
+        self._ensure_live()
+        if name in self._built:
+            return
+        store = self.collection.store
+        row_ids = store.row_ids()
+        size = store.next_row_id
+        if name in BITMAP_FIELDS:
+            members: Dict[object, List[int]] = {}
+            row_values: Dict[int, object] = {}
+            for row_id, value in zip(row_ids, store.iter_field(name)):
+                key = self._key(name, value)
+                row_values[row_id] = key
+                members.setdefault(key, []).append(row_id)
+            self._row_values[name] = row_values
+            # Bitmaps are assembled in one go; setting bits row by row would copy them each time
+            self._bitmaps[name] = {key: _bitmap_of(ids, size) for key, ids in members.items()}
+        elif name in NUMERIC_FIELDS:
+            numbers = array('d', [math.nan]) * size
+            # Columns repeat few distinct values (e.g. "300m"), each parsed once
+            converted: Dict[object, float] = {}
+            for row_id, value in zip(row_ids, store.iter_field(name)):
+                number = converted.get(value)
+                if number is None:
+                    number = converted[value] = self._number(name, value)
+                numbers[row_id] = number
+            pairs = sorted((value, row_id) for row_id, value in enumerate(numbers) if not math.isnan(value))
+            self._numbers[name] = numbers
+            self._sorted[name] = (array('d', [value for value, _ in pairs]), array('q', [row_id for _, row_id in pairs]))
+        elif name == SPATIAL:
+            self._spatial = SpatialIndex.from_points(
+                zip(row_ids, store.iter_field('latitude'), store.iter_field('longitude')))
+        else:
+            raise ValueError(f"No index for '{name}'")
+        self._built.add(name)
+    
+    def _index_keys(self, row_id: int, row: WaypointRow) -> None:
+        """Set a row's bits, per-row values and numbers in the built indexes (not the sorted columns)."""
+        bit = 1 << row_id
+        self._live |= bit
+        for name in BITMAP_FIELDS:
+            if name not in self._built:
+                continue
+            key = self._key(name, getattr(row, name))
+            bitmaps = self._bitmaps[name]
+            bitmaps[key] = bitmaps.get(key, 0) | bit
+            self._row_values[name][row_id] = key
+        for name in NUMERIC_FIELDS:
+            if name not in self._built:
+                continue
+            numbers = self._numbers[name]
+            if len(numbers) <= row_id:
+                numbers.extend([math.nan] * (row_id + 1 - len(numbers)))
+            numbers[row_id] = self._number(name, getattr(row, name))
+    
+    def _unindex(self, row_id: int) -> None:
+        """Remove a row from all built indexes except the text index."""
+        bit = 1 << row_id
+        if not self._live & bit:
+            return
+        self._live &= ~bit
+        for name in BITMAP_FIELDS:
+            if name not in self._built:
+                continue
+            key = self._row_values[name].pop(row_id)
+            bitmaps = self._bitmaps[name]
+            bitmaps[key] &= ~bit
+            if not bitmaps[key]:
+                del bitmaps[key]
+        for name in NUMERIC_FIELDS:
+            if name not in self._built:
+                continue
+            value = self._numbers[name][row_id]
+            if not math.isnan(value):
+                values, ids = self._sorted[name]
+                lo, hi = bisect_left(values, value), bisect_right(values, value)
+                position = lo + ids[lo:hi].index(row_id)
+                del values[position]
+                del ids[position]
+            self._numbers[name][row_id] = math.nan
+        if SPATIAL in self._built:
+            self._spatial.remove(row_id)
+    
+    def _on_change(self, event: CollectionEvent) -> None:
+        if self._stale or event.kind == MOVE:
+            return
+        if event.kind in (UPDATE, DELETE):
+            self._unindex(event.row_id)
+        if event.kind in (INSERT, UPDATE):
+            row = WaypointRow(self.collection.store, event.row_id)
+            self._index_keys(event.row_id, row)
+            for name in NUMERIC_FIELDS:
+                if name not in self._built:
+                    continue
+                value = self._numbers[name][event.row_id]
+                if not math.isnan(value):
+                    values, ids = self._sorted[name]
+                    position = bisect_right(values, value)
+                    values.insert(position, value)
+                    ids.insert(position, event.row_id)
+            if SPATIAL in self._built:
+                self._spatial.insert(event.row_id, row.latitude, row.longitude)
+        elif event.kind != DELETE:
+            self._stale = True
+    
+    # Value conversion
+    
+    @staticmethod
+    def _key(name: str, value) -> object:
+        """Bitmap key of a field value."""
+        if name == 'style':
+            return int(value)
+        return str(value).strip().upper()
+    
+    @staticmethod
+    def _number(name: str, value) -> float:
+        """Numeric value of a field in metres for lengths (NaN if missing)."""
+        if isinstance(value, (int, float)):
+            return float(value)
+        if name in LENGTH_FIELDS:
+            metres = parse_length(value) if value else None
+            return math.nan if metres is None else metres
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return math.nan
+    
+    @staticmethod
+    def _query_key(name: str, value) -> object:
+        """Bitmap key of a value given in a query."""
+        if name == 'style':
+            if isinstance(value, (int, float)) or str(value).strip().lstrip('-').isdigit():
+                return int(value)
+            for label, style in STYLE_LABELS.items():
+                if fold_text(label) == fold_text(str(value)):
+                    return style
+            raise QueryError(f"Unknown style '{value}' (use 0-{max(STYLE_OPTIONS)} or a style label)")
+        return str(value).strip().upper()
+    
+    @classmethod
+    def _query_number(cls, name: str, value) -> float:
+        number = cls._number(name, value)
+        if math.isnan(number):
+            raise QueryError(f"'{value}' is not a valid {name.replace('_', ' ')}")
+        return number
+    
+    # Planning
+    
+    def _resolve(self, condition: Within) -> Tuple[float, float]:
+        """Centre of a WITHIN condition."""
+        if condition.of is None:
+            return condition.latitude, condition.longitude
+        wanted = fold_text(condition.of.strip())
+        candidates = self.text_index.search(condition.of) or set()
+        store = self.collection.store
+        for name in ('code', 'name'):
+            for row_id in sorted(candidates):
+                row = WaypointRow(store, row_id)
+                if fold_text(getattr(row, name).strip()) == wanted:
+                    return row.latitude, row.longitude
+        raise QueryError(f"No waypoint with code or name '{condition.of}'")
+    
+    def _predicate(self, condition: Condition) -> Callable[[int], bool]:
+        """Compile a condition into a test of one row id."""
+        store = self.collection.store
+        if isinstance(condition, And):
+            tests = [self._predicate(part) for part in condition.parts]
+            return lambda row_id: all(test(row_id) for test in tests)
+        if isinstance(condition, Or):
+            tests = [self._predicate(part) for part in condition.parts]
+            return lambda row_id: any(test(row_id) for test in tests)
+        if isinstance(condition, Not):
+            test = self._predicate(condition.part)
+            return lambda row_id: not test(row_id)
+        if isinstance(condition, Text):
+            matches = self.text_index.search(condition.text)
+            return (lambda row_id: True) if matches is None else matches.__contains__
+        if isinstance(condition, Within):
+            lat, lon = self._resolve(condition)
+            radius_m = condition.radius_m
+            return lambda row_id: haversine_m(lat, lon, store._lat[row_id], store._lon[row_id]) <= radius_m
+        if isinstance(condition, In) and condition.field in BITMAP_FIELDS:
+            keys = {self._query_key(condition.field, value) for value in condition.values}
+            values = self._row_values[condition.field]
+            return lambda row_id: values.get(row_id) in keys
+        if isinstance(condition, In):
+            tests = [self._predicate(Compare(condition.field, '=', value)) for value in condition.values]
+            return lambda row_id: any(test(row_id) for test in tests)
+        if isinstance(condition, Compare):
+            name, op = condition.field, condition.op
+            if name in BITMAP_FIELDS and op in ('=', '!='):
+                key = self._query_key(name, condition.value)
+                values = self._row_values[name]
+                if op == '=':
+                    return lambda row_id: values.get(row_id) == key
+                return lambda row_id: values.get(row_id) != key
+            compare = _COMPARE[op]
+            if name == 'style' and op != '~':
+                style = self._query_key(name, condition.value)
+                return lambda row_id: compare(store._style[row_id], style)
+            if name in NUMERIC_FIELDS and op != '~':
+                # Missing values match no comparison
+                number = self._query_number(name, condition.value)
+                numbers = self._numbers[name]
+                return lambda row_id: not math.isnan(numbers[row_id]) and compare(numbers[row_id], number)
+            wanted = fold_text(str(condition.value))
+            if name == 'style':
+                return lambda row_id: wanted in fold_text(STYLE_OPTIONS.get(store._style[row_id], ''))
+            return lambda row_id: compare(fold_text(str(getattr(WaypointRow(store, row_id), name))), wanted)
+        raise QueryError(f"Unsupported condition {condition!r}")
+    
+    def _sources(self, condition: Condition) -> Optional[List[_Source]]:
+        """Index sources answering a condition exactly, or None if it needs a scan."""
+        if isinstance(condition, Compare) and condition.field in BITMAP_FIELDS and condition.op in ('=', '!='):
+            bitmap = self._bitmaps[condition.field].get(self._query_key(condition.field, condition.value), 0)
+            if condition.op == '!=':
+                bitmap = self._live & ~bitmap
+            return [self._bitmap_source(str(condition), bitmap, self._predicate(condition))]
+        if isinstance(condition, In) and condition.field in BITMAP_FIELDS:
+            bitmaps = self._bitmaps[condition.field]
+            bitmap = 0
+            for value in condition.values:
+                bitmap |= bitmaps.get(self._query_key(condition.field, value), 0)
+            return [self._bitmap_source(str(condition), bitmap, self._predicate(condition))]
+        if isinstance(condition, Not):
+            part_sources = self._sources(condition.part)
+            if part_sources is not None and len(part_sources) == 1 and part_sources[0].bitmap is not None:
+                part_test = part_sources[0].test
+                return [self._bitmap_source(f"NOT ({condition.part})", self._live & ~part_sources[0].bitmap,
+                                            lambda row_id: not part_test(row_id))]
+            return None
+        if isinstance(condition, Compare) and condition.field in NUMERIC_FIELDS and condition.op in ('=', '<', '<=', '>', '>='):
+            return [self._range_source(condition)]
+        if isinstance(condition, Within):
+            lat, lon = self._resolve(condition)
+            radius_m = condition.radius_m
+            store = self.collection.store
+            hits: List[Set[int]] = []
+            
+            def materialize() -> Set[int]:
+                if not hits:
+                    hits.append({row_id for _, row_id in self._spatial.within_radius(lat, lon, radius_m)})
+                return hits[0]
+            
+            # Estimate from the hit count: a radius query only touches nearby cells
+            estimate = len(materialize())
+            return [_Source(f"spatial index {condition}", estimate, materialize,
+                            lambda row_id: haversine_m(lat, lon, store._lat[row_id], store._lon[row_id]) <= radius_m)]
+        if isinstance(condition, Text):
+            matches = self.text_index.search(condition.text)
+            if matches is None:
+                return []
+            return [_Source(f"text index {condition}", len(matches), lambda: matches, matches.__contains__)]
+        if isinstance(condition, Compare) and condition.field in SEARCHED_FIELDS and condition.op in ('=', '~'):
+            # The text index gives a superset when every word is matched whole or by n-grams
+            terms = tokenize(str(condition.value))
+            if terms and (condition.op == '=' or all(len(term) >= NGRAM for term in terms)):
+                matches = self.text_index.search(str(condition.value)) or set()
+                test = self._predicate(condition)
+                return [_Source(f"text index {condition}", len(matches),
+                                lambda: {row_id for row_id in matches if test(row_id)}, test)]
+            return None
+        if isinstance(condition, And):
+            sources = []
+            for part in condition.parts:
+                part_sources = self._sources(part)
+                if part_sources is None:
+                    return None
+                sources.extend(part_sources)
+            return sources
+        return None
+    
+    @staticmethod
+    def _bitmap_source(description: str, bitmap: int, test: Callable[[int], bool]) -> _Source:
+        # Candidates are tested with the per-row values: a bit test would shift the whole bitmap
+        return _Source(f"bitmap {description}", _bit_count(bitmap), lambda: set(_bitmap_ids(bitmap)), test, bitmap)
+    
+    def _range_source(self, condition: Compare) -> _Source:
+        values, ids = self._sorted[condition.field]
+        number = self._query_number(condition.field, condition.value)
+        lo, hi = 0, len(values)
+        if condition.op in ('=', '>='):
+            lo = bisect_left(values, number)
+        elif condition.op == '>':
+            lo = bisect_right(values, number)
+        if condition.op in ('=', '<='):
+            hi = bisect_right(values, number)
+        elif condition.op == '<':
+            hi = bisect_left(values, number)
+        hi = max(lo, hi)
+        numbers = self._numbers[condition.field]
+        compare = _COMPARE[condition.op]
+        return _Source(f"sorted column {condition}", hi - lo, lambda: set(ids[lo:hi]),
+                       lambda row_id: compare(numbers[row_id], number))
+    
+    def _execute(self, condition: Condition, steps: List[PlanStep]) -> Optional[Set[int]]:
+        """Answer a condition from indexes; None if it needs a scan."""
+        if isinstance(condition, And):
+            return self._execute_and(condition.parts, steps)
+        if isinstance(condition, Or):
+            results = []
+            for part in condition.parts:
+                part_steps: List[PlanStep] = []
+                result = self._execute(part, part_steps)
+                if result is None:
+                    return None
+                results.append(result)
+                steps.extend(part_steps)
+            start = time.perf_counter()
+            union = set().union(*results)
+            steps.append(PlanStep(f"union of {len(results)} parts", len(union), time.perf_counter() - start))
+            return union
+        if isinstance(condition, Not) and self._sources(condition) is None:
+            part_steps = []
+            result = self._execute(condition.part, part_steps)
+            if result is None:
+                return None
+            steps.extend(part_steps)
+            start = time.perf_counter()
+            complement = set(_bitmap_ids(self._live)) - result
+            steps.append(PlanStep("complement", len(complement), time.perf_counter() - start))
+            return complement
+        return self._execute_and([condition], steps)
+    
+    def _execute_and(self, parts: Sequence[Condition], steps: List[PlanStep]) -> Optional[Set[int]]:
+        """Answer a conjunction from its most selective index, testing the rest on the candidates."""
+        start = time.perf_counter()
+        sources: List[_Source] = []
+        residual: List[Condition] = []
+        nested: List[Condition] = []
+        flat: List[Condition] = []
+        pending = list(parts)
+        while pending:
+            part = pending.pop(0)
+            if isinstance(part, And):
+                pending[:0] = part.parts
+            else:
+                flat.append(part)
+        for part in flat:
+            part_sources = self._sources(part)
+            if part_sources is not None:
+                sources.extend(part_sources)
+            elif isinstance(part, (Or, Not)):
+                # Answered separately below if their parts are indexed
+                nested.append(part)
+            else:
+                residual.append(part)
+        # Bitmaps combine cheaply before choosing the driving source
+        bitmap_sources = [source for source in sources if source.bitmap is not None]
+        if len(bitmap_sources) > 1:
+            combined = self._live
+            for source in bitmap_sources:
+                combined &= source.bitmap
+            sources = [source for source in sources if source.bitmap is None]
+            description = ' AND '.join(source.description[len('bitmap '):] for source in bitmap_sources)
+            tests = [source.test for source in bitmap_sources]
+            sources.append(self._bitmap_source(description, combined,
+                                               lambda row_id: all(test(row_id) for test in tests)))
+        
+        candidates: Optional[Set[int]] = None
+        if sources:
+            sources.sort(key=lambda source: source.estimate)
+            driver = sources[0]
+            candidates = driver.materialize()
+            steps.append(PlanStep(driver.description, len(candidates), time.perf_counter() - start))
+            for source in sources[1:]:
+                start = time.perf_counter()
+                candidates = {row_id for row_id in candidates if source.test(row_id)}
+                steps.append(PlanStep(f"check {source.description}", len(candidates), time.perf_counter() - start))
+        for part in nested:
+            if candidates is not None:
+                residual.append(part)  # Cheaper to test on the candidates
+                continue
+            # Nested OR/NOT: answered from indexes if all their parts are indexed
+            part_steps: List[PlanStep] = []
+            result = self._execute(part, part_steps)
+            if result is None:
+                residual.append(part)
+                continue
+            steps.extend(part_steps)
+            start = time.perf_counter()
+            candidates = result if candidates is None else candidates & result
+            steps.append(PlanStep("intersect", len(candidates), time.perf_counter() - start))
+        if candidates is None:
+            return None
+        if residual:
+            start = time.perf_counter()
+            test = self._predicate(And(residual) if len(residual) > 1 else residual[0])
+            candidates = {row_id for row_id in candidates if test(row_id)}
+            description = ' AND '.join(str(part) for part in residual)
+            steps.append(PlanStep(f"filter {description}", len(candidates), time.perf_counter() - start))
+        return candidates
+    
+    # Running queries
+    
+    def run(self, query: Union[str, Condition, None], use_indexes: bool = True) -> Optional[QueryResult]:
+        """
+        Run a query.
+        
+        Args:
+            query: Query text (see parse_query) or a Condition
+            use_indexes: Plan with indexes (False tests every row, for comparison)
+        
+        Returns:
+            QueryResult, or None for an empty query
+        
+        Raises:
+            QueryError: Invalid query
+        """
+        condition = parse_query(query) if isinstance(query, str) else query
+        if condition is None:
+            return None
+        start = time.perf_counter()
+        self.text_index.build()
+        if _uses_columns(condition):
+            self._ensure_live()
+        for name in _indexed_fields(condition):
+            self._ensure(name)
+        index_build = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        steps: List[PlanStep] = []
+        ids = self._execute(condition, steps) if use_indexes else None
+        if ids is None:
+            test = self._predicate(condition)
+            ids = {row_id for row_id in self.collection.store.row_ids() if test(row_id)}
+            steps.append(PlanStep(f"scan {condition}", len(ids), time.perf_counter() - start))
+        return QueryResult(ids, time.perf_counter() - start, steps, index_build)
+    
+    def select(self, query: Union[str, Condition]) -> List[Waypoint]:
+        """
+        Run a query and get the matching waypoints in collection order.
+        
+        Args:
+            query: Query text (see parse_query) or a Condition
+        
+        Returns:
+            Matching waypoints
+        """
+        result = self.run(query)
+        if result is None:
+            return list(self.collection)
+        return [self.collection.get(row_id) for row_id in self.collection.in_order(result.ids)]
+
+
+def _uses_columns(condition: Condition) -> bool:
+    """Whether a condition needs more than the text index."""
+    if isinstance(condition, (And, Or)):
+        return any(_uses_columns(part) for part in condition.parts)
+    return not isinstance(condition, Text)  # NOT needs the set of all rows
+
+
+def _indexed_fields(condition: Condition) -> Set[str]:
+    """Fields (and SPATIAL) whose indexes a condition is planned or tested with."""
+    if isinstance(condition, (And, Or)):
+        return set().union(*(_indexed_fields(part) for part in condition.parts))
+    if isinstance(condition, Not):
+        return _indexed_fields(condition.part)
+    if isinstance(condition, Within):
+        return {SPATIAL}
+    if isinstance(condition, (Compare, In)) and condition.field in BITMAP_FIELDS + NUMERIC_FIELDS:
+        return {condition.field}
+    return set()
+
+
+def run_query(waypoints: Union[WaypointCollection, WaypointStore, Iterable[Waypoint]],
+              query: Union[str, Condition]) -> List[Waypoint]:
+    """
+    Select waypoints with a query.
+    
+    Args:
+        waypoints: Waypoints to filter (the result keeps their order)
+        query: Query text (see parse_query) or a Condition
+    
+    Returns:
+        Matching waypoints
+    
+    Example:
+        >>> run_query(parse_cup_file("PL.cup"), "style IN (2,4,5) AND WITHIN 40km OF EPBK")
+    """
+    if not isinstance(waypoints, WaypointCollection):
+        if not isinstance(waypoints, WaypointStore):
+            waypoints = WaypointStore(waypoints)
+        waypoints = WaypointCollection(waypoints, key=lambda row: 0)
+    engine = QueryEngine(waypoints)
+    try:
+        return engine.select(query)
+    finally:
+        engine.close()
+
+
+_COMPARE: Dict[str, Callable[[object, object], bool]] = {
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '~': lambda a, b: b in a,
+}
@@ -0,0 +1,123 @@
+"""Background saving of CUP files with a separate elevation stage."""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from . import perf
+from .config import ELEVATION_BATCH_SIZE, ELEVATION_TIME_BUDGET
+from .elevation import ElevationJob, get_default_resolver
+from .file_io import CupWriteResult, write_cup_file
+from .store import WaypointStore
+
+# Stages in the order they run
+ELEVATION = 'elevation'
+WRITE = 'write'
+DONE = 'done'
+
+
+class BackgroundSave:
+    """
+    Saves a snapshot of a WaypointStore as a CUP file on a worker thread.
+    
+    The save runs in two stages: missing elevations are looked up first,
+    then the file is written atomically with whatever was resolved. The
+    elevation stage can be cancelled (the rest is written without
+    elevation); the write itself always completes so the target file is
+    never left half-replaced. Poll ``stage``, progress and done (e.g. from a
+    Tk ``after`` callback).
+    """
+    
+    def __init__(self, filepath: str, store: WaypointStore, fetch_elevation: bool = True,
+                 time_budget: Optional[float] = ELEVATION_TIME_BUDGET):
+        """
+        Start saving.
+        
+        Args:
+            filepath: Path of the CUP file to write
+            store: Waypoints to save; not modified, so pass a copy if it is edited meanwhile
+            fetch_elevation: Whether to look up missing elevations
+            time_budget: Maximum seconds spent on the elevation stage, or None for no limit
+        """
+        self.filepath = filepath
+        self.store = store
+        self.fetch_elevation = fetch_elevation
+        self.time_budget = time_budget
+        self.stage = ELEVATION
+        # Seconds per stage, in the order they ran
+        self.timings: Dict[str, float] = {}
+        self.result: Optional[CupWriteResult] = None
+        self.error: Optional[Exception] = None
+        self.elevation_skipped = False
+        self._elevation_job: Optional[ElevationJob] = None
+        self._skip = threading.Event()
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="waypoint-saver", daemon=True)
+        self._thread.start()
+    
+    def _run(self) -> None:
+        try:
+            start = time.monotonic()
+            elevations = self._resolve_elevations() if self.fetch_elevation else {}
+            self.timings[ELEVATION] = time.monotonic() - start
+            self.stage = WRITE
+            start = time.monotonic()
+            self.result = write_cup_file(self.filepath, self.store, elevations=elevations)
+            self.result.elevation_time = self.timings[ELEVATION]
+            self.timings[WRITE] = time.monotonic() - start
+        except Exception as e:
+            self.error = e
+        finally:
+            for stage, seconds in self.timings.items():
+                perf.record(f"save.{stage}", seconds)
+            self.stage = DONE
+            self._finished.set()
+    
+    def _resolve_elevations(self) -> Dict[Tuple[float, float], float]:
+        """Look up the coordinates of waypoints without elevation until done or skipped."""
+        store = self.store
+        coords = [(row.latitude, row.longitude) for row in store.rows()
+                  if row.elevation is None or row.elevation == ""]
+        if not coords:
+            return {}
+        job = get_default_resolver().submit(coords, ELEVATION_BATCH_SIZE, time_budget=self.time_budget)
+        self._elevation_job = job
+        while not job.done():
+            if self._skip.wait(0.05):
+                job.cancel()
+                self.elevation_skipped = True
+                return job.partial()
+        return job.wait().elevations
+    
+    def skip_elevation(self) -> None:
+        """Stop looking up elevations and write the file with those resolved so far."""
+        self._skip.set()
+    
+    @property
+    def progress(self) -> Tuple[int, int]:
+        """Coordinates looked up so far and in total during the elevation stage."""
+        if self._elevation_job is None:
+            return 0, 0
+        return self._elevation_job.progress
+    
+    @property
+    def done(self) -> bool:
+        return self._finished.is_set()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the save has finished.
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+        
+        Returns:
+            True if the save has finished
+        """
+        return self._finished.wait(timeout)
+    
+    def timing_summary(self) -> str:
+        """Describe how long each stage took, e.g. for a status message."""
+        names = {ELEVATION: "elevation lookup", WRITE: "writing"}
+        parts = [f"{names[stage]} {seconds:.2f} s" for stage, seconds in self.timings.items()]
+        return ", ".join(parts)
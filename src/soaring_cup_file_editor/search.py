@@ -0,0 +1,204 @@
+"""Diacritic-folding full-text index for search-as-you-type."""
+
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .collection import CollectionEvent, WaypointCollection, INSERT, UPDATE, DELETE, MOVE
+from .store import WaypointRow
+from .utils import fold_text
+
+# Fields searched by the index
+SEARCH_FIELDS = ('name', 'code', 'description')
+
+_TOKEN = re.compile(r'[^\W_]+')
+NGRAM = 3
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into folded search tokens.
+    
+    Args:
+        text: Any text
+    
+    Returns:
+        Lower-case, diacritic-free words
+    """
+    return _TOKEN.findall(fold_text(text))
+
+
+def _ngrams(token: str) -> Set[str]:
+    return {token[i:i + NGRAM] for i in range(len(token) - NGRAM + 1)}
+
+
+class TextIndex:
+    """
+    Token index over the name, code and description of waypoints.
+    
+    Every distinct folded token maps to the ids containing it. The tokens
+    are also kept in a sorted list for prefix lookups and in a trigram map
+    for substring lookups, so a query only touches matching tokens instead
+    of scanning all waypoints.
+    
+    When attached to a WaypointCollection the index is built on first use
+    and then follows the collection's change events.
+    """
+    
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._tokens: List[str] = []
+        self._ngrams: Dict[str, Set[str]] = {}
+        self._row_tokens: Dict[int, Tuple[str, ...]] = {}
+        self._collection: Optional[WaypointCollection] = None
+        self._stale = False
+    
+    def __len__(self) -> int:
+        self.build()
+        return len(self._row_tokens)
+    
+    # Updates
+    
+    def add(self, point_id: int, texts: Iterable[str]) -> None:
+        """
+        Index texts under an id, replacing what was indexed for it before.
+        
+        Args:
+            point_id: Integer id (e.g. a store row id)
+            texts: Texts to index (e.g. name, code and description)
+        """
+        self.remove(point_id)
+        tokens = tuple(sorted({token for text in texts if text for token in tokenize(text)}))
+        self._row_tokens[point_id] = tokens
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                self._postings[token] = {point_id}
+                self._tokens.insert(bisect_left(self._tokens, token), token)
+                for gram in _ngrams(token):
+                    self._ngrams.setdefault(gram, set()).add(token)
+            else:
+                ids.add(point_id)
+    
+    def remove(self, point_id: int) -> None:
+        """
+        Remove an id from the index; unknown ids are ignored.
+        
+        Args:
+            point_id: Id passed to add()
+        """
+        for token in self._row_tokens.pop(point_id, ()):
+            ids = self._postings[token]
+            ids.discard(point_id)
+            if not ids:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+                for gram in _ngrams(token):
+                    grams = self._ngrams[gram]
+                    grams.discard(token)
+                    if not grams:
+                        del self._ngrams[gram]
+    
+    def clear(self) -> None:
+        """Remove everything from the index."""
+        self._postings = {}
+        self._tokens = []
+        self._ngrams = {}
+        self._row_tokens = {}
+    
+    # Following a collection
+    
+    def attach(self, collection: WaypointCollection) -> None:
+        """
+        Index a collection's waypoints by row id and follow its changes.
+        
+        The index itself is built by build() or lazily by the first search.
+        
+        Args:
+            collection: Collection to index
+        """
+        if self._collection is not None:
+            self._collection.unsubscribe(self._on_change)
+        self._collection = collection
+        collection.subscribe(self._on_change)
+        self._stale = True
+    
+    def build(self) -> None:
+        """Index the attached collection now if it changed wholesale, instead of on the next search."""
+        if not self._stale:
+            return
+        self._stale = False
+        self.clear()
+        store = self._collection.store
+        for row_id in store.row_ids():
+            self._add_row(row_id)
+    
+    def _add_row(self, row_id: int) -> None:
+        row = WaypointRow(self._collection.store, row_id)
+        self.add(row_id, (getattr(row, name) for name in SEARCH_FIELDS))
+    
+    def _on_change(self, event: CollectionEvent) -> None:
+        if self._stale or event.kind == MOVE:
+            return
+        if event.kind == DELETE:
+            self.remove(event.row_id)
+        elif event.kind in (INSERT, UPDATE):
+            self._add_row(event.row_id)
+        elif event.added is not None:
+            # Bulk import or restore: index just those rows
+            for row_id in event.added:
+                self._add_row(row_id)
+        elif event.removed is not None:
+            for row_id in event.removed:
+                self.remove(row_id)
+        else:
+            self._stale = True
+    
+    # Queries
+    
+    def _term_matches(self, term: str) -> Set[int]:
+        """Ids with a token starting with (or, from NGRAM letters on, containing) the term."""
+        postings = self._postings
+        if len(term) < NGRAM:
+            start = bisect_left(self._tokens, term)
+            tokens = []
+            for token in self._tokens[start:]:
+                if not token.startswith(term):
+                    break
+                tokens.append(token)
+        else:
+            grams = sorted((self._ngrams.get(gram, set()) for gram in _ngrams(term)), key=len)
+            candidates = set.intersection(*grams) if grams else set()
+            tokens = [token for token in candidates if term in token]
+        if len(tokens) == 1:
+            return postings[tokens[0]]
+        result: Set[int] = set()
+        for token in tokens:
+            result |= postings[token]
+        return result
+    
+    def search(self, query: str) -> Optional[Set[int]]:
+        """
+        Find the ids matching every word of a query.
+        
+        Words are folded like the index (case and diacritics are ignored).
+        Short words match token prefixes; words of NGRAM or more letters
+        match anywhere inside a token.
+        
+        Args:
+            query: Free text typed by the user
+        
+        Returns:
+            Matching ids, or None if the query has no words
+        """
+        self.build()
+        terms = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not terms:
+            return None
+        result: Optional[Set[int]] = None
+        for term in terms:
+            matches = self._term_matches(term)
+            result = set(matches) if result is None else result & matches
+            if not result:
+                break
+        return result
@@ -0,0 +1,357 @@
+"""Spatial index for nearest-neighbour, radius and bounding-box queries."""
+
+import heapq
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .collection import CollectionEvent, WaypointCollection, INSERT, UPDATE, DELETE, MOVE
+from .config import SPATIAL_INDEX_CELL_SIZE
+from .store import WaypointRow
+
+EARTH_RADIUS_M = 6371008.8  # Mean earth radius
+
+# (distance in metres, row id)
+Hit = Tuple[float, int]
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points.
+    
+    Args:
+        lat1: Latitude of the first point in degrees
+        lon1: Longitude of the first point in degrees
+        lat2: Latitude of the second point in degrees
+        lon2: Longitude of the second point in degrees
+    
+    Returns:
+        Distance in metres
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """
+    Grid index of points on the sphere.
+    
+    Points are bucketed into cells of ``cell_size`` degrees of latitude and
+    longitude. Queries only look at the cells that can contain matches and
+    check the candidates with great-circle distances, so results are exact.
+    Each point is identified by an integer id (a store row id when the
+    index follows a WaypointCollection) and can be inserted, moved and
+    removed individually.
+    """
+    
+    def __init__(self, cell_size: float = SPATIAL_INDEX_CELL_SIZE):
+        """
+        Create an empty index.
+        
+        Args:
+            cell_size: Cell edge in degrees
+        """
+        self.cell_size = cell_size
+        self._rows = math.ceil(180 / cell_size)
+        self._cols = math.ceil(360 / cell_size)
+        self._cells: Dict[int, array] = {}
+        # Per id: coordinates and cell key (-1 = not in the index)
+        self._lat = array('d')
+        self._lon = array('d')
+        self._cell = array('q')
+        self._count = 0
+        self._collection: Optional[WaypointCollection] = None
+    
+    @classmethod
+    def from_points(cls, points: Iterable[Tuple[int, float, float]],
+                    cell_size: float = SPATIAL_INDEX_CELL_SIZE) -> 'SpatialIndex':
+        """
+        Build an index from (id, latitude, longitude) tuples.
+        
+        Args:
+            points: Points to index
+            cell_size: Cell edge in degrees
+        
+        Returns:
+            New SpatialIndex
+        """
+        index = cls(cell_size)
+        points = list(points)
+        if not points:
+            return index
+        # Arrays are sized once and cells computed inline: insert() per point
+        # would grow the arrays one id at a time
+        size = max(point_id for point_id, _, _ in points) + 1
+        index._lat = array('d', [0.0]) * size
+        index._lon = array('d', [0.0]) * size
+        index._cell = array('q', [-1]) * size
+        cells = index._cells
+        last_row, cols = index._rows - 1, index._cols
+        for point_id, lat, lon in points:
+            if index._cell[point_id] >= 0:
+                index.insert(point_id, lat, lon)  # Repeated id: moved like insert() would
+                continue
+            key = min(last_row, max(0, int((lat + 90) // cell_size))) * cols + int((lon + 180) // cell_size) % cols
+            index._lat[point_id] = lat
+            index._lon[point_id] = lon
+            index._cell[point_id] = key
+            bucket = cells.get(key)
+            if bucket is None:
+                bucket = cells[key] = array('q')
+            bucket.append(point_id)
+            index._count += 1
+        return index
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def __contains__(self, point_id: int) -> bool:
+        return 0 <= point_id < len(self._cell) and self._cell[point_id] >= 0
+    
+    # Cells
+    
+    def _row_of(self, lat: float) -> int:
+        return min(self._rows - 1, max(0, int((lat + 90) // self.cell_size)))
+    
+    def _col_of(self, lon: float) -> int:
+        return int((lon + 180) // self.cell_size) % self._cols
+    
+    def _cell_keys(self, south: float, north: float, west: float, east: float) -> List[int]:
+        """Keys of the occupied cells overlapping a lat/lon box (east < west wraps the antimeridian)."""
+        rows = range(self._row_of(south), self._row_of(north) + 1)
+        span = east - west if west <= east else east - west + 360
+        first, last = self._col_of(west), self._col_of(east)
+        if span >= 360 - self.cell_size:
+            cols = range(self._cols)
+        elif first <= last:
+            cols = range(first, last + 1)
+        else:
+            cols = list(range(first, self._cols)) + list(range(0, last + 1))
+        if len(rows) * len(cols) > len(self._cells):
+            # Box covers more cells than are occupied: filter the occupied ones
+            row_set = set(rows)
+            col_set = set(cols)
+            return [key for key in self._cells
+                    if key // self._cols in row_set and key % self._cols in col_set]
+        cells = self._cells
+        return [key for key in (row * self._cols + col for row in rows for col in cols) if key in cells]
+    
+    # Updates
+    
+    def insert(self, point_id: int, lat: float, lon: float) -> None:
+        """
+        Add a point, or move it if the id is already indexed.
+        
+        Args:
+            point_id: Non-negative integer id
+            lat: Latitude in degrees
+            lon: Longitude in degrees
+        """
+        if point_id in self:
+            self.remove(point_id)
+        while len(self._cell) <= point_id:
+            self._lat.append(0.0)
+            self._lon.append(0.0)
+            self._cell.append(-1)
+        key = self._row_of(lat) * self._cols + self._col_of(lon)
+        self._lat[point_id] = lat
+        self._lon[point_id] = lon
+        self._cell[point_id] = key
+        bucket = self._cells.get(key)
+        if bucket is None:
+            bucket = self._cells[key] = array('q')
+        bucket.append(point_id)
+        self._count += 1
+    
+    def move(self, point_id: int, lat: float, lon: float) -> None:
+        """
+        Change the coordinates of an indexed point.
+        
+        Args:
+            point_id: Id of the point
+            lat: New latitude in degrees
+            lon: New longitude in degrees
+        """
+        key = self._row_of(lat) * self._cols + self._col_of(lon)
+        if point_id in self and self._cell[point_id] == key:
+            self._lat[point_id] = lat
+            self._lon[point_id] = lon
+        else:
+            self.insert(point_id, lat, lon)
+    
+    def remove(self, point_id: int) -> None:
+        """
+        Remove a point; unknown ids are ignored.
+        
+        Args:
+            point_id: Id of the point
+        """
+        if point_id not in self:
+            return
+        key = self._cell[point_id]
+        bucket = self._cells[key]
+        bucket.remove(point_id)
+        if not bucket:
+            del self._cells[key]
+        self._cell[point_id] = -1
+        self._count -= 1
+    
+    def clear(self) -> None:
+        """Remove all points."""
+        self._cells = {}
+        self._lat = array('d')
+        self._lon = array('d')
+        self._cell = array('q')
+        self._count = 0
+    
+    def position(self, point_id: int) -> Tuple[float, float]:
+        """Get the (latitude, longitude) of an indexed point."""
+        if point_id not in self:
+            raise KeyError(point_id)
+        return self._lat[point_id], self._lon[point_id]
+    
+    # Following a collection
+    
+    def attach(self, collection: WaypointCollection) -> None:
+        """
+        Index a collection's waypoints by row id and follow its changes.
+        
+        Args:
+            collection: Collection to index
+        """
+        if self._collection is not None:
+            self._collection.unsubscribe(self._on_change)
+        self._collection = collection
+        collection.subscribe(self._on_change)
+        self._rebuild()
+    
+    def detach(self) -> None:
+        """Stop following the attached collection."""
+        if self._collection is not None:
+            self._collection.unsubscribe(self._on_change)
+            self._collection = None
+    
+    def _rebuild(self) -> None:
+        self.clear()
+        store = self._collection.store
+        for row_id, lat, lon in zip(store.row_ids(), store.iter_field('latitude'),
+                                    store.iter_field('longitude')):
+            self.insert(row_id, lat, lon)
+    
+    def _on_change(self, event: CollectionEvent) -> None:
+        if event.kind == MOVE:
+            return  # Sort order does not matter here
+        if event.kind == DELETE:
+            self.remove(event.row_id)
+        elif event.kind in (INSERT, UPDATE):
+            row = WaypointRow(self._collection.store, event.row_id)
+            self.move(event.row_id, row.latitude, row.longitude)
+        else:
+            self._rebuild()
+    
+    # Queries
+    
+    def _scan(self, lat: float, lon: float, radius_m: float) -> List[Hit]:
+        """All points within a radius, unsorted."""
+        angle = radius_m / EARTH_RADIUS_M
+        if angle >= math.pi:
+            keys = list(self._cells)
+        else:
+            dlat = math.degrees(angle)
+            south, north = lat - dlat, lat + dlat
+            ratio = math.sin(angle) / max(1e-12, math.cos(math.radians(lat)))
+            if south <= -90 or north >= 90 or ratio >= 1:
+                # Circle contains a pole or spans all longitudes
+                keys = self._cell_keys(max(-90.0, south), min(90.0, north), -180.0, 180.0)
+            else:
+                dlon = math.degrees(math.asin(ratio))
+                west = (lon - dlon + 180) % 360 - 180
+                east = (lon + dlon + 180) % 360 - 180
+                keys = self._cell_keys(south, north, west, east)
+        
+        # Haversine with the query point's terms hoisted out of the loop
+        phi1 = math.radians(lat)
+        cos1 = math.cos(phi1)
+        limit = math.sin(min(angle, math.pi) / 2) ** 2
+        sin, cos, radians = math.sin, math.cos, math.radians
+        lats, lons = self._lat, self._lon
+        hits = []
+        for key in keys:
+            for point_id in self._cells[key]:
+                phi2 = radians(lats[point_id])
+                a = (sin((phi2 - phi1) / 2) ** 2 +
+                     cos1 * cos(phi2) * sin(radians(lons[point_id] - lon) / 2) ** 2)
+                if a <= limit:
+                    hits.append((2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a))), point_id))
+        return hits
+    
+    def within_radius(self, lat: float, lon: float, radius_m: float) -> List[Hit]:
+        """
+        Find all points within a great-circle distance.
+        
+        Args:
+            lat: Latitude of the centre in degrees
+            lon: Longitude of the centre in degrees
+            radius_m: Radius in metres
+        
+        Returns:
+            (distance_m, id) tuples, nearest first
+        """
+        hits = self._scan(lat, lon, radius_m)
+        hits.sort()
+        return hits
+    
+    def nearest(self, lat: float, lon: float, k: int = 1,
+                max_distance_m: Optional[float] = None) -> List[Hit]:
+        """
+        Find the k nearest points.
+        
+        The search radius starts at about one cell and doubles until it
+        holds k points, so only nearby cells are scanned.
+        
+        Args:
+            lat: Latitude of the query point in degrees
+            lon: Longitude of the query point in degrees
+            k: Number of neighbours
+            max_distance_m: Ignore points farther away than this
+        
+        Returns:
+            Up to k (distance_m, id) tuples, nearest first
+        """
+        if k <= 0 or not self._count:
+            return []
+        limit = max_distance_m if max_distance_m is not None else math.pi * EARTH_RADIUS_M
+        radius = min(limit, math.radians(self.cell_size) * EARTH_RADIUS_M)
+        while True:
+            hits = self._scan(lat, lon, radius)
+            if len(hits) >= k or radius >= limit:
+                return heapq.nsmallest(k, hits)
+            radius = min(limit, radius * 2)
+    
+    def within_bbox(self, south: float, west: float, north: float, east: float) -> List[int]:
+        """
+        Find all points inside a latitude/longitude box.
+        
+        Args:
+            south: Southern latitude in degrees
+            west: Western longitude in degrees
+            north: Northern latitude in degrees
+            east: Eastern longitude in degrees (less than west when the box
+                crosses the antimeridian)
+        
+        Returns:
+            Ids of the points in the box
+        """
+        wraps = west > east
+        lats, lons = self._lat, self._lon
+        result = []
+        for key in self._cell_keys(south, north, west, east):
+            for point_id in self._cells[key]:
+                lat = lats[point_id]
+                lon = lons[point_id]
+                if south <= lat <= north and ((lon >= west or lon <= east) if wraps else west <= lon <= east):
+                    result.append(point_id)
+        return result
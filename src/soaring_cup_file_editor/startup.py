@@ -0,0 +1,137 @@
+"""
+Import times of a cold start, for keeping startup under a budget.
+
+Started with ``--startup-profile`` on soaring-cup-editor or soaring-cup.
+Every module imported from the moment the package itself is imported
+(see __init__.py) is timed, and the report is written once the main
+window is shown or the command has parsed its arguments. The tree has the
+layout of ``python -X importtime`` (children before their parent, self
+and cumulative microseconds), which works in the PyInstaller executable
+too, where -X options cannot be passed.
+
+The report goes to stderr, or to STARTUP_PROFILE_FILE for the windowed
+executable, which has no stderr.
+"""
+
+import builtins
+import os
+import sys
+import time
+from _thread import get_ident
+from typing import List, Optional, Sequence
+
+from .config import STARTUP_PROFILE_FILE, STARTUP_PROFILE_LINES, STARTUP_TIME_BUDGET
+
+FLAG = '--startup-profile'
+
+_original_import = None
+_thread = None
+_started: Optional[float] = None
+_records: List[list] = []  # [module names, depth, self seconds, cumulative seconds], in completion order
+_stack: List[float] = []  # Seconds spent in child imports of each import in progress
+
+
+def requested(argv: Optional[Sequence[str]] = None) -> bool:
+    """Check whether the command line asks for a startup profile (default: sys.argv)."""
+    return FLAG in (sys.argv[1:] if argv is None else argv)
+
+
+def _absolute_name(name: str, globals: Optional[dict], level: int) -> str:
+    if not level:
+        return name
+    package = (globals or {}).get('__package__') or ''
+    if level > 1:
+        package = package.rsplit('.', level - 1)[0]
+    return f"{package}.{name}" if name else package
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if get_ident() != _thread:
+        return _original_import(name, globals, locals, fromlist, level)
+    target = _absolute_name(name, globals, level)
+    # "from . import x" loads x through the fromlist
+    candidates = [target]
+    if fromlist:
+        candidates.extend(f"{target}.{item}" for item in fromlist if item != '*')
+    missing = [module for module in candidates if module not in sys.modules]
+    if not missing:
+        return _original_import(name, globals, locals, fromlist, level)
+    
+    _stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        children = _stack.pop()
+        if _stack:
+            _stack[-1] += elapsed
+        loaded = [module for module in missing if module in sys.modules]
+        if loaded:
+            _records.append([', '.join(loaded), len(_stack), elapsed - children, elapsed])
+
+
+def start() -> None:
+    """Start timing imports made by the calling thread."""
+    global _original_import, _thread, _started
+    if _original_import is None:
+        _original_import = builtins.__import__
+        _thread = get_ident()
+        _started = time.perf_counter()
+        builtins.__import__ = _timed_import
+
+
+def stop() -> None:
+    """Stop timing imports (the records are kept for report())."""
+    global _original_import
+    if _original_import is not None:
+        builtins.__import__ = _original_import
+        _original_import = None
+
+
+def report(milestone: str) -> str:
+    """
+    Format the recorded imports.
+    
+    Args:
+        milestone: What startup reached when the report was made, e.g. "main window shown"
+    
+    Returns:
+        Import tree, slowest imports and the time against STARTUP_TIME_BUDGET
+    """
+    if _started is None:
+        return f"No startup profile: the package was imported before {FLAG} was seen\n"
+    elapsed = time.perf_counter() - _started
+    lines = ["import time: self [us] | cumulative | imported package"]
+    for names, depth, own, cumulative in _records:
+        lines.append(f"import time: {own * 1e6:9.0f} | {cumulative * 1e6:10.0f} | {'  ' * depth}{names}")
+    
+    lines.append("")
+    lines.append(f"Slowest imports (self time, of {len(_records)}):")
+    for names, depth, own, cumulative in sorted(_records, key=lambda record: -record[2])[:STARTUP_PROFILE_LINES]:
+        lines.append(f"  {own * 1e3:8.1f} ms  {names}")
+    
+    imports = sum(record[2] for record in _records)
+    lines.append("")
+    lines.append(f"Imports: {imports * 1e3:.0f} ms; {milestone} after {elapsed * 1e3:.0f} ms "
+                 f"(budget {STARTUP_TIME_BUDGET * 1e3:.0f} ms{', OVER BUDGET' if elapsed > STARTUP_TIME_BUDGET else ''})")
+    return "\n".join(lines) + "\n"
+
+
+def finish(milestone: str) -> None:
+    """
+    Stop timing imports and write the report.
+    
+    Args:
+        milestone: What startup reached, e.g. "main window shown"
+    """
+    stop()
+    text = report(milestone)
+    if sys.stderr is not None:
+        sys.stderr.write(text)
+        return
+    try:
+        with open(STARTUP_PROFILE_FILE, 'w', encoding='utf-8') as f:
+            f.write(text)
+    except OSError as e:
+        print(f"Could not write startup profile {os.path.abspath(STARTUP_PROFILE_FILE)}: {e}")
@@ -0,0 +1,427 @@
+"""Columnar in-memory storage for large waypoint databases."""
+
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, MutableSequence, Optional, Union
+
+from .models import Waypoint
+
+# Fields stored as dictionary-encoded columns (few distinct values per file)
+ENCODED_FIELDS = (
+    'code', 'country', 'elevation', 'runway_direction', 'runway_length',
+    'runway_width', 'frequency', 'description',
+)
+
+
+class _EncodedColumn:
+    """String column storing each distinct value once and a small integer code per row."""
+    
+    __slots__ = ('values', 'lookup', 'codes')
+    
+    def __init__(self):
+        self.values: List[Any] = []
+        self.lookup: Dict[Any, int] = {}
+        self.codes = array('I')
+    
+    def encode(self, value: Any) -> int:
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.lookup[value] = code
+        return code
+    
+    def append(self, value: Any) -> None:
+        self.codes.append(self.encode(value))
+    
+    def set(self, row: int, value: Any) -> None:
+        self.codes[row] = self.encode(value)
+    
+    def get(self, row: int) -> Any:
+        return self.values[self.codes[row]]
+
+
+class WaypointRow:
+    """
+    Lightweight read-only view of one stored waypoint.
+    
+    Attribute access reads straight from the store's columns, so scanning
+    rows (e.g. to compute sort keys) does not build Waypoint objects.
+    """
+    
+    __slots__ = ('_store', 'row_id')
+    
+    def __init__(self, store: 'WaypointStore', row_id: int):
+        self._store = store
+        self.row_id = row_id
+    
+    @property
+    def name(self) -> str:
+        return self._store._names[self.row_id]
+    
+    @property
+    def latitude(self) -> float:
+        return self._store._lat[self.row_id]
+    
+    @property
+    def longitude(self) -> float:
+        return self._store._lon[self.row_id]
+    
+    @property
+    def style(self) -> int:
+        return self._store._style[self.row_id]
+    
+    def __getattr__(self, field_name: str) -> Any:
+        column = self._store._encoded.get(field_name)
+        if column is None:
+            raise AttributeError(field_name)
+        return column.get(self.row_id)
+    
+    @property
+    def is_airfield(self) -> bool:
+        """Check if this waypoint is an airfield (has runway information)."""
+        return bool(self.runway_direction or self.runway_length or self.frequency)
+    
+    def to_waypoint(self) -> Waypoint:
+        """Materialize the row as a Waypoint."""
+        return self._store.get(self.row_id)
+
+
+class WaypointStore(MutableSequence):
+    """
+    Columnar, list-compatible container of waypoints.
+    
+    Coordinates are kept in ``array('d')`` columns, the style in an
+    ``array('B')`` column and repetitive string fields in dictionary-encoded
+    columns, instead of one Waypoint object with its own ``__dict__`` per row.
+    
+    Each row lives in a slot identified by a row id that stays the same
+    while the row is in the store (sorting and assignment keep it; deleted
+    slots are not reused). The sequence order is a separate array of row ids.
+    
+    Indexing returns a freshly materialized Waypoint; modifying it does not
+    change the store, assign it back with ``store[i] = waypoint`` instead.
+    """
+    
+    def __init__(self, waypoints: Iterable[Waypoint] = ()):
+        """
+        Create a store, optionally filled from an iterable of waypoints.
+        
+        Args:
+            waypoints: Initial waypoints (consumed lazily, e.g. from iter_cup_file())
+        """
+        self._names: List[str] = []
+        self._lat = array('d')
+        self._lon = array('d')
+        self._style = array('B')
+        self._encoded: Dict[str, _EncodedColumn] = {name: _EncodedColumn() for name in ENCODED_FIELDS}
+        self._live = bytearray()
+        self._order = array('q')
+        # Rows below this id were cleared: their data is gone and they cannot be restored
+        self._first_id = 0
+        self.extend(waypoints)
+    
+    # Row id access
+    
+    def _append_row(self, waypoint: Waypoint) -> int:
+        row_id = len(self._names)
+        self._names.append(waypoint.name)
+        self._lat.append(waypoint.latitude)
+        self._lon.append(waypoint.longitude)
+        self._style.append(waypoint.style)
+        for name, column in self._encoded.items():
+            column.append(getattr(waypoint, name))
+        self._live.append(1)
+        return row_id
+    
+    def _write_row(self, row_id: int, waypoint: Waypoint) -> None:
+        self._names[row_id] = waypoint.name
+        self._lat[row_id] = waypoint.latitude
+        self._lon[row_id] = waypoint.longitude
+        self._style[row_id] = waypoint.style
+        for name, column in self._encoded.items():
+            column.set(row_id, getattr(waypoint, name))
+    
+    def _check_row(self, row_id: int) -> None:
+        if not (0 <= row_id < len(self._live)) or not self._live[row_id]:
+            raise KeyError(row_id)
+    
+    def add(self, waypoint: Waypoint, index: Optional[int] = None) -> int:
+        """
+        Add a waypoint and return its row id.
+        
+        Args:
+            waypoint: Waypoint to store
+            index: Sequence position to insert at (default: append)
+        
+        Returns:
+            Row id of the new row
+        """
+        row_id = self._append_row(waypoint)
+        if index is None:
+            self._order.append(row_id)
+        else:
+            self._order.insert(index, row_id)
+        return row_id
+    
+    def get(self, row_id: int) -> Waypoint:
+        """
+        Materialize the waypoint stored under a row id.
+        
+        Args:
+            row_id: Row id as returned by add() or id_at()
+        
+        Returns:
+            Waypoint object
+        """
+        self._check_row(row_id)
+        encoded = self._encoded
+        return Waypoint.from_trusted(
+            name=self._names[row_id],
+            latitude=self._lat[row_id],
+            longitude=self._lon[row_id],
+            code=encoded['code'].get(row_id),
+            country=encoded['country'].get(row_id),
+            elevation=encoded['elevation'].get(row_id),
+            style=self._style[row_id],
+            runway_direction=encoded['runway_direction'].get(row_id),
+            runway_length=encoded['runway_length'].get(row_id),
+            runway_width=encoded['runway_width'].get(row_id),
+            frequency=encoded['frequency'].get(row_id),
+            description=encoded['description'].get(row_id)
+        )
+    
+    def replace(self, row_id: int, waypoint: Waypoint) -> None:
+        """
+        Overwrite the waypoint stored under a row id.
+        
+        Args:
+            row_id: Row id of an existing row
+            waypoint: New waypoint data
+        """
+        self._check_row(row_id)
+        self._write_row(row_id, waypoint)
+    
+    def remove_ids(self, row_ids: Iterable[int]) -> None:
+        """
+        Remove many rows at once, in one pass over the order.
+        
+        Args:
+            row_ids: Row ids of existing rows
+        """
+        for row_id in row_ids:
+            self._check_row(row_id)
+            self._live[row_id] = 0
+        live = self._live
+        self._order = array('q', [row_id for row_id in self._order if live[row_id]])
+    
+    def restore(self, row_id: int, index: Optional[int] = None) -> None:
+        """
+        Bring back a removed row; its data is still in the store.
+        
+        Args:
+            row_id: Row id of a removed row
+            index: Position to insert at (default: end)
+        """
+        if not self._first_id <= row_id < len(self._live) or self._live[row_id]:
+            raise KeyError(row_id)
+        self._live[row_id] = 1
+        if index is None:
+            self._order.append(row_id)
+        else:
+            self._order.insert(index, row_id)
+    
+    def restore_ids(self, row_ids: Iterable[int]) -> None:
+        """
+        Bring back many removed rows at once, appending them to the order.
+        
+        Args:
+            row_ids: Row ids of removed rows
+        """
+        row_ids = list(row_ids)
+        for row_id in row_ids:
+            if not self._first_id <= row_id < len(self._live) or self._live[row_id]:
+                raise KeyError(row_id)
+            self._live[row_id] = 1
+        self._order.extend(row_ids)
+    
+    @property
+    def next_row_id(self) -> int:
+        """Row id the next added row will get (all later rows have larger ids)."""
+        return len(self._names)
+    
+    def copy(self) -> 'WaypointStore':
+        """
+        Copy the store column by column, keeping row ids and order.
+        
+        No Waypoint objects are built, so this is a cheap snapshot that can
+        be read on another thread (e.g. written to disk) while the original
+        is being edited.
+        """
+        other = WaypointStore.__new__(WaypointStore)
+        other._names = list(self._names)
+        other._lat = array('d', self._lat)
+        other._lon = array('d', self._lon)
+        other._style = array('B', self._style)
+        other._encoded = {}
+        for name, column in self._encoded.items():
+            copied = _EncodedColumn()
+            copied.values = list(column.values)
+            copied.lookup = dict(column.lookup)
+            copied.codes = array('I', column.codes)
+            other._encoded[name] = copied
+        other._live = bytearray(self._live)
+        other._order = array('q', self._order)
+        other._first_id = self._first_id
+        return other
+    
+    def contains_id(self, row_id: int) -> bool:
+        """Check whether a row id refers to a row still in the store."""
+        return 0 <= row_id < len(self._live) and bool(self._live[row_id])
+    
+    def id_at(self, index: int) -> int:
+        """Get the row id at a sequence position."""
+        return self._order[index]
+    
+    def move(self, old_index: int, new_index: int) -> None:
+        """
+        Move the row at one sequence position to another.
+        
+        Args:
+            old_index: Current position of the row
+            new_index: Position of the row after the move
+        """
+        row_id = self._order.pop(old_index)
+        self._order.insert(new_index, row_id)
+    
+    def reorder(self, row_ids: Iterable[int]) -> None:
+        """
+        Set the sequence order.
+        
+        Args:
+            row_ids: Permutation of the current row ids
+        """
+        order = array('q', row_ids)
+        if len(order) != len(self._order):
+            raise ValueError("reorder() needs every row id exactly once")
+        self._order = order
+    
+    def row_ids(self) -> array:
+        """Get a copy of the row ids in sequence order."""
+        return array('q', self._order)
+    
+    def view(self, index: int) -> WaypointRow:
+        """Get a lightweight view of the row at a sequence position."""
+        return WaypointRow(self, self._order[index])
+    
+    def rows(self) -> Iterator[WaypointRow]:
+        """Iterate lightweight views of all rows in sequence order."""
+        for row_id in self._order:
+            yield WaypointRow(self, row_id)
+    
+    def iter_field(self, field_name: str) -> Iterator[Any]:
+        """
+        Iterate one field's values in sequence order without materializing rows.
+        
+        Args:
+            field_name: Waypoint field name (e.g. "name", "latitude", "country")
+        """
+        if field_name == 'name':
+            column = self._names
+        elif field_name == 'latitude':
+            column = self._lat
+        elif field_name == 'longitude':
+            column = self._lon
+        elif field_name == 'style':
+            column = self._style
+        else:
+            encoded = self._encoded[field_name]
+            values = encoded.values
+            codes = encoded.codes
+            return (values[codes[row_id]] for row_id in self._order)
+        return (column[row_id] for row_id in self._order)
+    
+    # MutableSequence interface
+    
+    def __len__(self) -> int:
+        return len(self._order)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Waypoint, List[Waypoint]]:
+        if isinstance(index, slice):
+            return [self.get(row_id) for row_id in self._order[index]]
+        return self.get(self._order[index])
+    
+    def __setitem__(self, index: Union[int, slice], waypoint: Waypoint) -> None:
+        if isinstance(index, slice):
+            raise TypeError("WaypointStore does not support slice assignment")
+        self._write_row(self._order[index], waypoint)
+    
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        if isinstance(index, slice):
+            for row_id in self._order[index]:
+                self._live[row_id] = 0
+        else:
+            self._live[self._order[index]] = 0
+        del self._order[index]
+    
+    def __iter__(self) -> Iterator[Waypoint]:
+        for row_id in self._order:
+            yield self.get(row_id)
+    
+    def insert(self, index: int, waypoint: Waypoint) -> None:
+        self._order.insert(index, self._append_row(waypoint))
+    
+    def append(self, waypoint: Waypoint) -> None:
+        self.add(waypoint)
+    
+    def extend(self, waypoints: Iterable[Waypoint]) -> None:
+        for waypoint in waypoints:
+            self.add(waypoint)
+    
+    def clear(self) -> None:
+        """
+        Remove all rows and drop their data.
+        
+        Row ids keep counting from where they were, so ids still held
+        elsewhere (tree items, the journal, undo history) never name a row
+        added later. The cleared slots keep only zeroed placeholders and
+        cannot be restored.
+        """
+        count = len(self._names)
+        self._names = [''] * count
+        self._lat = array('d', bytes(8 * count))
+        self._lon = array('d', bytes(8 * count))
+        self._style = array('B', bytes(count))
+        for name in ENCODED_FIELDS:
+            column = _EncodedColumn()
+            column.encode(None)
+            column.codes = array('I', bytes(column.codes.itemsize * count))
+            self._encoded[name] = column
+        self._live = bytearray(count)
+        self._order = array('q')
+        self._first_id = count
+    
+    def reverse(self) -> None:
+        self._order.reverse()
+    
+    def sort(self, key=None, reverse: bool = False) -> None:
+        """
+        Sort rows in place, like list.sort().
+        
+        The key function receives a WaypointRow view, which offers the same
+        read-only attributes as Waypoint without materializing it. Row ids
+        are unchanged by sorting.
+        
+        Args:
+            key: Function computing a sort key from a row (defaults to the name)
+            reverse: Sort in descending order
+        """
+        if key is None:
+            names = self._names
+            ordered = sorted(self._order, key=names.__getitem__, reverse=reverse)
+        else:
+            ordered = sorted(self._order, key=lambda row_id: key(WaypointRow(self, row_id)),
+                             reverse=reverse)
+        self._order = array('q', ordered)
+    
+    def __repr__(self) -> str:
+        return f"<WaypointStore with {len(self)} waypoints>"
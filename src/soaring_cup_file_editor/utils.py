@@ -1,4 +1,18 @@
-"""Utility functions for coordinate conversions."""
+"""Utility functions for coordinate and unit conversions and text matching."""
+
+import re
+import unicodedata
+from typing import Optional
+
+# Metres per length unit used in CUP files (ml = statute mile)
+LENGTH_UNITS = {'m': 1.0, 'km': 1000.0, 'ft': 0.3048, 'nm': 1852.0, 'ml': 1609.344, 'mi': 1609.344}
+_LENGTH = re.compile(r'\s*([-+]?\d+(?:\.\d*)?|[-+]?\.\d+)\s*([a-z]*)\s*$', re.IGNORECASE)
+
+# Letters that Unicode does not decompose into a base letter plus accent
+_FOLD_TABLE = str.maketrans({
+    'ł': 'l', 'Ł': 'L', 'ø': 'o', 'Ø': 'O', 'đ': 'd', 'Đ': 'D', 'ħ': 'h', 'Ħ': 'H',
+    'ı': 'i', 'ß': 'ss', 'æ': 'ae', 'Æ': 'AE', 'œ': 'oe', 'Œ': 'OE', 'þ': 'th', 'Þ': 'TH',
+})
 
 
 def ddmm_to_deg(coord_str: str) -> float:
@@ -56,3 +70,48 @@ def deg_to_ddmm(value: float, is_lat: bool) -> str:
     deg_format = "{:02d}" if is_lat else "{:03d}"
     # Use 3 decimal places for minutes per CUP specification
     return f"{deg_format.format(degrees)}{minutes:06.3f}{suffix}"
+
+
+def fold_text(text: str) -> str:
+    """
+    Fold text for accent- and case-insensitive matching.
+    
+    Args:
+        text: Any text, e.g. a waypoint name
+        
+    Returns:
+        Lower-case text with diacritics removed
+        
+    Example:
+        >>> fold_text("Bielska Białej")
+        'bielska bialej'
+    """
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text.translate(_FOLD_TABLE))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def parse_length(text: str, default_unit: str = 'm') -> Optional[float]:
+    """
+    Convert a length with an optional unit to metres.
+    
+    Args:
+        text: Number with optional unit (m, km, ft, nm, ml or mi), e.g. "1654ft"
+        default_unit: Unit of a bare number
+        
+    Returns:
+        Length in metres, or None for empty or unreadable text
+        
+    Example:
+        >>> parse_length("0.5nm")
+        926.0
+    """
+    match = _LENGTH.match(text or '')
+    if not match:
+        return None
+    unit = match.group(2).lower() or default_unit
+    factor = LENGTH_UNITS.get(unit)
+    if factor is None:
+        return None
+    return float(match.group(1)) * factor
@@ -0,0 +1,45 @@
+"""Shared test fixtures."""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+# For the stub elevation server and synthetic data
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from stub_elevation_server import StubElevationServer  # noqa: E402
+from soaring_cup_file_editor import elevation, journal  # noqa: E402
+from soaring_cup_file_editor.elevation_cache import ElevationCache, set_default_cache  # noqa: E402
+from soaring_cup_file_editor.parse_cache import set_default_parse_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Use an empty elevation cache and journal directory in tmp_path and no parse cache, never the user's."""
+    monkeypatch.setattr(journal, 'JOURNAL_DIR', str(tmp_path / 'journals'))
+    cache = ElevationCache(str(tmp_path / 'cache' / 'elevation.sqlite3'))
+    set_default_cache(cache)
+    set_default_parse_cache(None)
+    yield cache
+    set_default_cache(None)
+    cache.close()
+
+
+@pytest.fixture
+def stub_server():
+    """Local open-elevation API counting requests and locations."""
+    with StubElevationServer() as server:
+        yield server
+
+
+@pytest.fixture
+def stub_provider(stub_server):
+    """Default elevation provider talking to stub_server, without retries or rate limit."""
+    provider = elevation.OpenElevationProvider(url=stub_server.url, retries=0,
+                                               rate_limiter=elevation.RateLimiter(None))
+    elevation.set_default_provider(provider)
+    yield provider
+    elevation.set_default_provider(None)
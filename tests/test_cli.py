@@ -0,0 +1,92 @@
+"""Exit codes of the soaring-cup command."""
+
+import json
+
+import pytest
+
+from soaring_cup_file_editor import cli
+
+HEADER = 'name,code,country,lat,lon,elev,style,rwdir,rwlen,rwwidth,freq,desc\n'
+GOOD = '"Good",G,PL,5000.000N,01900.000E,100m,4,,,,,\n'
+NO_ELEVATION = '"High",H,PL,5010.000N,01910.000E,,1,,,,,\n'
+BAD = '"Bad",,,north,01900.000E,100m,1,,,,,\n'
+
+
+@pytest.fixture
+def cup(tmp_path):
+    def write(name, *rows):
+        path = tmp_path / name
+        path.write_text(HEADER + ''.join(rows), encoding='utf-8')
+        return str(path)
+    return write
+
+
+def test_convert_ok(cup, tmp_path):
+    target = str(tmp_path / 'out.csv')
+    assert cli.main(['convert', cup('in.cup', GOOD), '-o', target, '-j', '1']) == cli.EXIT_OK
+    assert open(target, encoding='utf-8').read().count('Good') == 1
+
+
+def test_missing_input_fails(tmp_path):
+    assert cli.main(['convert', str(tmp_path / 'missing.cup'), '-d', str(tmp_path / 'out'), '-j', '1']) \
+        == cli.EXIT_FAILED
+
+
+def test_one_failure_wins_over_incomplete(cup, tmp_path):
+    code = cli.main(['convert', cup('bad.cup', GOOD, BAD), str(tmp_path / 'missing.cup'),
+                     '-d', str(tmp_path / 'out'), '-j', '1'])
+    assert code == cli.EXIT_FAILED
+
+
+def test_invalid_rows_are_incomplete(cup, tmp_path, capsys):
+    source = cup('bad.cup', GOOD, BAD)
+    code = cli.main(['convert', source, '-o', str(tmp_path / 'out.csv'), '-j', '1', '--report', '-'])
+    assert code == cli.EXIT_INCOMPLETE
+    report = json.loads(capsys.readouterr().out)
+    assert report['exit_code'] == cli.EXIT_INCOMPLETE
+    assert report['reports'][0]['row_errors'] == 1
+    assert report['reports'][0]['errors'][0].startswith('line 3:')
+
+
+@pytest.mark.parametrize('arguments', [
+    ['convert', 'a.cup', 'b.cup', '-o', 'out.csv'],
+    ['filter', 'a.cup', '-d', 'out', '--query', 'bogus = 5'],
+    ['filter', 'a.cup', '--query', 'style = 1'],
+], ids=['output-with-two-inputs', 'invalid-query', 'would-overwrite'])
+def test_usage_errors(cup, tmp_path, monkeypatch, arguments):
+    monkeypatch.chdir(tmp_path)
+    cup('a.cup', GOOD)
+    cup('b.cup', GOOD)
+    assert cli.main(arguments + ['-j', '1']) == cli.EXIT_USAGE
+
+
+@pytest.mark.parametrize('arguments', [['convert', 'a.cup', '--jobs', '0'], ['frobnicate', 'a.cup']])
+def test_argparse_errors_exit_with_usage(arguments):
+    with pytest.raises(SystemExit) as raised:
+        cli.main(arguments)
+    assert raised.value.code == cli.EXIT_USAGE
+
+
+def test_filter_ok(cup, tmp_path):
+    target = tmp_path / 'out.cup'
+    source = cup('in.cup', GOOD, NO_ELEVATION)
+    assert cli.main(['filter', source, '-o', str(target), '--query', 'style = 4', '-j', '1']) == cli.EXIT_OK
+    assert 'Good' in target.read_text(encoding='utf-8') and 'High' not in target.read_text(encoding='utf-8')
+
+
+def test_fill_elevation_resolves_missing_elevations(cup, tmp_path, stub_server, stub_provider):
+    target = tmp_path / 'out.cup'
+    source = cup('in.cup', GOOD, NO_ELEVATION)
+    assert cli.main(['fill-elevation', source, '-o', str(target), '-j', '1']) == cli.EXIT_OK
+    assert stub_server.location_count == 1
+    assert target.read_text(encoding='utf-8').splitlines()[2].split(',')[5] != ''
+
+
+def test_unresolved_elevations_are_incomplete(cup, tmp_path, stub_server, stub_provider):
+    stub_server.fail_requests = 1000
+    target = tmp_path / 'out.cup'
+    source = cup('in.cup', GOOD, NO_ELEVATION)
+    code = cli.main(['fill-elevation', source, '-o', str(target), '-j', '1', '--time-budget', '5'])
+    assert code == cli.EXIT_INCOMPLETE
+    rows = target.read_text(encoding='utf-8').splitlines()
+    assert [row.split(',')[5] for row in rows[1:]] == ['100m', '']
@@ -0,0 +1,51 @@
+"""Elevation batching against the stub open-elevation API."""
+
+from stub_elevation_server import stub_elevation
+from soaring_cup_file_editor.elevation import resolve_elevations
+from soaring_cup_file_editor.file_io import parse_cup_file, write_cup_file
+from soaring_cup_file_editor.models import Waypoint
+
+
+def without_elevation(count):
+    return [Waypoint(f"WP{i}", 49.0 + i * 0.01, 19.0 + i * 0.005) for i in range(count)]
+
+
+def test_writer_batches_lookups(tmp_path, stub_server, stub_provider):
+    path = str(tmp_path / 'out.cup')
+    result = write_cup_file(path, without_elevation(250), batch_size=100)
+    assert stub_server.request_count == 3
+    assert sorted(stub_server.batch_sizes) == [50, 100, 100]
+    assert stub_server.location_count == 250
+    assert result.fetched == 250 and not result.unresolved
+    for waypoint in parse_cup_file(path):
+        assert waypoint.elevation == f"{stub_elevation(waypoint.latitude, waypoint.longitude):.1f}m"
+
+
+def test_duplicates_are_looked_up_once(stub_server, stub_provider):
+    coords = [(50.0, 19.0), (50.1, 19.1), (50.0, 19.0), (50.1, 19.1), (50.2, 19.2)]
+    result = resolve_elevations(coords, batch_size=2)
+    assert stub_server.location_count == 3
+    assert sorted(stub_server.batch_sizes) == [1, 2]
+    assert result.elevations[(50.0, 19.0)] == stub_elevation(50.0, 19.0)
+    assert not result.unresolved
+
+
+def test_cached_points_are_not_requested_again(tmp_path, stub_server, stub_provider):
+    waypoints = without_elevation(30)
+    write_cup_file(str(tmp_path / 'first.cup'), waypoints, batch_size=10)
+    assert stub_server.request_count == 3
+    write_cup_file(str(tmp_path / 'second.cup'), waypoints, batch_size=10)
+    assert stub_server.request_count == 3
+
+
+def test_unresolved_points_are_written_empty(tmp_path, stub_server, stub_provider):
+    stub_server.fail_requests = 1000
+    waypoints = without_elevation(5)
+    waypoints[2] = Waypoint("Known", 50.0, 20.0, elevation="321.0m")
+    path = str(tmp_path / 'out.cup')
+    result = write_cup_file(path, waypoints, batch_size=2)
+    assert len(result.unresolved) == 4
+    with open(path, encoding='utf-8') as f:
+        rows = f.read().splitlines()[1:]
+    assert [row.split(',')[5] for row in rows] == ['', '', '321.0m', '', '']
+    assert [w.elevation for w in parse_cup_file(path)] == [None, None, '321.0m', None, None]
@@ -0,0 +1,74 @@
+"""Reading and writing CUP and CSV files."""
+
+import os
+
+import pytest
+
+from soaring_cup_file_editor.file_io import (
+    atomic_write, iter_cup_file, parse_csv_file, parse_cup_file, write_csv_file, write_cup_file, RowError
+)
+from soaring_cup_file_editor.models import Waypoint
+
+# Text that the writers must quote and escape
+AWKWARD = [
+    Waypoint('Say "hi"', 50.1, 19.2, code='A,B', country='PL', elevation='300.0m',
+             frequency='122,500', description='a "b", c'),
+    Waypoint('"Quoted"', -33.5, -70.25, elevation='1654ft', runway_length='1200m',
+             frequency='Radio "x"', description='line 1\nline 2, "3"'),
+    Waypoint('Comma, Name', 0.0, 0.0, elevation='0.0m', description='""'),
+    Waypoint('Plain', 49.5, 20.0, code='EPXX', elevation='500.0m', style=5, runway_direction='090',
+             runway_length='800m', runway_width='30m', frequency='123.500', description='Grass'),
+]
+
+
+@pytest.mark.parametrize('write, parse', [
+    (lambda path, waypoints: write_cup_file(path, waypoints, fetch_elevation=False), parse_cup_file),
+    (write_csv_file, parse_csv_file),
+], ids=['cup', 'csv'])
+def test_round_trip_keeps_quotes_commas_and_newlines(tmp_path, write, parse):
+    path = str(tmp_path / 'out')
+    waypoints = AWKWARD
+    for _ in range(2):
+        write(path, waypoints)
+        waypoints = parse(path)
+    assert waypoints == AWKWARD
+
+
+def test_cup_quotes_are_doubled(tmp_path):
+    path = str(tmp_path / 'out.cup')
+    write_cup_file(path, AWKWARD[:1], fetch_elevation=False)
+    with open(path, encoding='utf-8') as f:
+        row = f.read().splitlines()[1]
+    assert row.startswith('"Say ""hi""","A,B",PL,')
+    assert row.endswith(',"122,500","a ""b"", c"')
+
+
+def test_missing_elevation_is_written_empty_without_lookups(tmp_path):
+    path = str(tmp_path / 'out.cup')
+    write_cup_file(path, [Waypoint('A', 50.0, 19.0)], fetch_elevation=False)
+    with open(path, encoding='utf-8') as f:
+        assert f.read().splitlines()[1].split(',')[5] == ''
+    assert parse_cup_file(path)[0].elevation is None
+
+
+def test_invalid_rows_are_reported(tmp_path):
+    path = tmp_path / 'in.cup'
+    path.write_text('name,code,country,lat,lon,elev,style,rwdir,rwlen,rwwidth,freq,desc\n'
+                    '"Good",,,5000.000N,01900.000E,100m,1,,,,,\n'
+                    '"Bad",,,north,01900.000E,100m,1,,,,,\n', encoding='utf-8')
+    items = list(iter_cup_file(str(path), yield_errors=True))
+    assert [type(item) for item in items] == [Waypoint, RowError]
+    assert items[1].line_num == 3
+
+
+def test_failed_atomic_write_keeps_previous_file(tmp_path):
+    directory = tmp_path / 'out'
+    directory.mkdir()
+    path = directory / 'out.cup'
+    path.write_text('before', encoding='utf-8')
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as f:
+            f.write('partial')
+            raise RuntimeError('simulated crash')
+    assert path.read_text(encoding='utf-8') == 'before'
+    assert os.listdir(directory) == ['out.cup']
@@ -0,0 +1,104 @@
+"""Undo and redo recorded as deltas."""
+
+from soaring_cup_file_editor.collection import WaypointCollection
+from soaring_cup_file_editor.config import BULK_CHANGE_ROWS
+from soaring_cup_file_editor.history import UndoHistory, _Changes, _Rows
+from soaring_cup_file_editor.models import Waypoint
+from soaring_cup_file_editor.store import WaypointStore
+
+
+def setup(count=5):
+    collection = WaypointCollection(WaypointStore(
+        Waypoint(f"WP{i}", 50.0 + i * 0.001, 19.0, code=f"C{i}") for i in range(count)))
+    history = UndoHistory()
+    history.attach(collection)
+    return collection, history
+
+
+def snapshot(collection):
+    return [(row_id, collection.get(row_id)) for row_id in collection.store.row_ids()]
+
+
+def test_edit_stores_only_changed_fields():
+    collection, history = setup()
+    waypoint = collection.get(2)
+    waypoint.country = 'PL'
+    collection.update(2, waypoint)
+    delta = history._undo[-1].deltas[0]
+    assert isinstance(delta, _Changes)
+    assert delta.names == ('country',) and delta.before == ('',) and delta.after == ('PL',)
+
+
+def test_undo_and_redo_restore_each_state():
+    collection, history = setup()
+    states = [snapshot(collection)]
+    collection.update(1, Waypoint("Renamed", 50.1, 19.0, code="C1"))
+    states.append(snapshot(collection))
+    collection.add(Waypoint("Added", 51.0, 20.0))
+    states.append(snapshot(collection))
+    with history.group("Delete 2 waypoints"):
+        collection.remove([0, 3])
+    states.append(snapshot(collection))
+
+    for state in reversed(states[:-1]):
+        history.undo()
+        assert snapshot(collection) == state
+    assert not history.can_undo and history.undo() is None
+    for state in states[1:]:
+        history.redo()
+        assert snapshot(collection) == state
+    assert not history.can_redo
+
+
+def test_bulk_remove_is_one_delta_of_row_ids():
+    count = 2 * BULK_CHANGE_ROWS + 10
+    collection, history = setup(count)
+    collection.remove(range(0, count, 2))
+    assert len(history) == 1
+    step = history._undo[-1]
+    assert len(step.deltas) == 1 and isinstance(step.deltas[0], _Rows)
+    assert list(step.deltas[0].row_ids) == list(range(0, count, 2))
+    history.undo()
+    assert len(collection) == count and collection.get(0).name == "WP0"
+    history.redo()
+    assert len(collection) == count // 2 and not collection.contains_id(0)
+
+
+def test_group_is_undone_at_once():
+    collection, history = setup()
+    before = snapshot(collection)
+    with history.group("Several edits"):
+        collection.update(0, Waypoint("A", 50.0, 19.0))
+        collection.add(Waypoint("B", 1.0, 2.0))
+        collection.remove([4])
+    assert len(history) == 1 and history.undo_label == "Several edits"
+    history.undo()
+    assert snapshot(collection) == before
+
+
+def test_new_edit_clears_redo():
+    collection, history = setup()
+    collection.update(0, Waypoint("A", 50.0, 19.0))
+    history.undo()
+    assert history.can_redo
+    collection.update(1, Waypoint("B", 50.1, 19.0))
+    assert not history.can_redo
+
+
+def test_oldest_steps_are_dropped_over_the_memory_limit():
+    collection, history = setup()
+    history.memory_limit = 2000
+    for i in range(50):
+        collection.update(0, Waypoint(f"Name {i}", 50.0, 19.0))
+    assert 1 <= len(history) < 50
+    assert history.memory <= 2000 or len(history) == 1
+    while history.undo():
+        pass
+    assert collection.get(0).name != "WP0"
+
+
+def test_loading_another_store_forgets_the_steps():
+    collection, history = setup()
+    collection.update(0, Waypoint("A", 50.0, 19.0))
+    collection.reset(WaypointStore([Waypoint("Other", 1.0, 2.0)]))
+    assert not history.can_undo
@@ -0,0 +1,117 @@
+"""Edit journal recording, compaction and replay."""
+
+import os
+
+import pytest
+
+from soaring_cup_file_editor import journal as journal_module
+from soaring_cup_file_editor.collection import WaypointCollection
+from soaring_cup_file_editor.file_io import parse_cup_file, write_cup_file
+from soaring_cup_file_editor.journal import (
+    EditJournal, discard_journal, find_session_journal, journal_path, read_journal
+)
+from soaring_cup_file_editor.models import Waypoint
+from soaring_cup_file_editor.store import WaypointStore
+
+BASE = [Waypoint(f"WP{i}", 50.0 + i * 0.1, 19.0, code=f"C{i}", elevation='100.0m') for i in range(5)]
+
+
+@pytest.fixture
+def base_file(tmp_path):
+    path = str(tmp_path / 'base.cup')
+    write_cup_file(path, BASE, fetch_elevation=False)
+    return path
+
+
+def load(path):
+    collection = WaypointCollection(WaypointStore(parse_cup_file(path)))
+    journal = EditJournal(enabled=True)
+    journal.attach(collection)
+    journal.start(path)
+    return collection, journal
+
+
+def edit(collection):
+    """Add, update and delete waypoints, including a row added and then changed."""
+    added = collection.add(Waypoint("New", 51.0, 20.0, code="NEW"))
+    collection.update(added, Waypoint("New renamed", 51.0, 20.0, code="NEW"))
+    collection.update(1, Waypoint("WP1 edited", 50.1, 19.0, code="C1", elevation='200.0m'))
+    collection.remove([3])
+    collection.extend([Waypoint("Bulk 1", 52.0, 21.0), Waypoint("Bulk 2", 52.1, 21.0)])
+
+
+def test_replay_reproduces_the_edits(base_file):
+    collection, journal = load(base_file)
+    edit(collection)
+    journal.close()
+    expected = sorted(w.to_dict().items() for w in collection)
+
+    contents = find_session_journal()
+    assert contents is not None and contents.base_matches()
+    recovered, journal = load(base_file)
+    assert journal.replay(contents) == len(contents.records)
+    assert sorted(w.to_dict().items() for w in recovered) == expected
+
+
+def test_replay_after_compaction(base_file):
+    collection, journal = load(base_file)
+    for i in range(20):
+        collection.update(2, Waypoint(f"WP2 v{i}", 50.2, 19.0, code="C2"))
+    edit(collection)
+    journal.compact()
+    journal.close()
+    contents = read_journal(journal_path(base_file))
+    # One record per edited row: WP2, WP1, WP3, and the three added rows
+    assert len(contents.records) == 6
+    expected = sorted(w.to_dict().items() for w in collection)
+
+    recovered, journal = load(base_file)
+    journal.replay(contents)
+    assert sorted(w.to_dict().items() for w in recovered) == expected
+
+
+def test_rows_added_then_deleted_are_compacted_away(base_file):
+    collection, journal = load(base_file)
+    row_id = collection.add(Waypoint("Temp", 1.0, 2.0))
+    collection.remove([row_id])
+    journal.compact()
+    assert not os.path.exists(journal_path(base_file))
+
+
+def test_torn_last_line_is_ignored(base_file):
+    collection, journal = load(base_file)
+    collection.update(0, Waypoint("WP0 edited", 50.0, 19.0, code="C0"))
+    journal.close()
+    with open(journal_path(base_file), 'a', encoding='utf-8') as f:
+        f.write('{"op":"update","id":1,"waypo')
+    contents = read_journal(journal_path(base_file))
+    assert [record['id'] for record in contents.records] == [0]
+
+
+def test_changed_base_file_is_detected(base_file):
+    collection, journal = load(base_file)
+    collection.remove([0])
+    journal.close()
+    write_cup_file(base_file, BASE[:2], fetch_elevation=False)
+    assert not read_journal(journal_path(base_file)).base_matches()
+
+
+def test_discard_removes_journal_and_session_pointer(base_file):
+    collection, journal = load(base_file)
+    collection.remove([0])
+    journal.close()
+    discard_journal(journal_path(base_file))
+    assert find_session_journal() is None
+    assert not os.listdir(journal_module.journal_dir())
+
+
+def test_replay_needs_the_base_rows(base_file):
+    collection, journal = load(base_file)
+    collection.remove([0])
+    journal.close()
+    contents = read_journal(journal_path(base_file))
+    other = WaypointCollection(WaypointStore(BASE[:3]))
+    replaying = EditJournal(enabled=True)
+    replaying.attach(other)
+    with pytest.raises(ValueError):
+        replaying.replay(contents)
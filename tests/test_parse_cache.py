@@ -0,0 +1,112 @@
+"""Parse cache validation."""
+
+import os
+import threading
+
+import pytest
+
+from soaring_cup_file_editor import parse_cache
+from soaring_cup_file_editor.file_io import parse_cup_file
+from soaring_cup_file_editor.parse_cache import ParseCache, set_default_parse_cache
+
+HEADER = 'name,code,country,lat,lon,elev,style,rwdir,rwlen,rwwidth,freq,desc\n'
+
+
+def rows(elevation):
+    return ''.join(f'"Point {i}",P{i},PL,5000.{i:03d}N,01900.000E,{elevation}m,1,,,,,"Say ""hi"""\n'
+                   for i in range(50))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ParseCache(str(tmp_path / 'parse-cache'), min_bytes=0)
+    set_default_parse_cache(cache)
+    yield cache
+    set_default_parse_cache(None)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'in.cup'
+    path.write_text(HEADER + rows(100), encoding='utf-8')
+    return str(path)
+
+
+def test_unchanged_file_is_loaded_from_the_cache(cache, source):
+    first = parse_cup_file(source)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert parse_cup_file(source) == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert first[0].description == 'Say "hi"'
+
+
+def test_changed_content_with_the_same_size_and_mtime_is_parsed_again(cache, source):
+    parse_cup_file(source)
+    stat = os.stat(source)
+    with open(source, 'w', encoding='utf-8') as f:
+        f.write(HEADER + rows(200))
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(source).st_size == stat.st_size
+
+    assert parse_cup_file(source)[0].elevation == '200m'
+    assert cache.hits == 0
+
+
+def test_touched_file_is_parsed_again(cache, source):
+    parse_cup_file(source)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    parse_cup_file(source)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_entries_of_another_version_are_ignored(cache, source, monkeypatch):
+    parse_cup_file(source)
+    monkeypatch.setattr(parse_cache, '__version__', parse_cache.__version__ + '.dev1')
+    parse_cup_file(source)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_corrupt_entry_is_a_miss(cache, source):
+    expected = parse_cup_file(source)
+    entry = cache.entry_path(source)
+    with open(entry, 'r+b') as f:
+        f.truncate(os.path.getsize(entry) - 10)
+    assert cache.load(source) is None
+    assert parse_cup_file(source) == expected
+
+
+def test_row_errors_are_reported_again_from_the_cache(cache, tmp_path, capsys):
+    path = tmp_path / 'bad.cup'
+    path.write_text(HEADER + rows(100) + '"Bad",,,north,01900.000E,100m,1,,,,,\n', encoding='utf-8')
+    parse_cup_file(str(path))
+    first = capsys.readouterr().out
+    assert 'Error parsing line 52' in first
+    parse_cup_file(str(path))
+    assert cache.hits == 1
+    assert capsys.readouterr().out == first
+
+
+def test_small_files_are_not_cached(tmp_path, source):
+    cache = ParseCache(str(tmp_path / 'parse-cache'), min_bytes=os.path.getsize(source) + 1)
+    set_default_parse_cache(cache)
+    parse_cup_file(source)
+    parse_cup_file(source)
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert not os.path.exists(cache.directory)
+
+
+def test_concurrent_stores_leave_one_valid_entry(cache, source):
+    stat = os.stat(source)
+    waypoints = parse_cup_file(source)
+    digest = parse_cache.file_digest(source)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.store(source, stat, digest, waypoints, [])))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [True] * 8
+    assert os.listdir(cache.directory) == [os.path.basename(cache.entry_path(source))]
+    assert cache.load(source) == (waypoints, [])
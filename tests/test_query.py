@@ -0,0 +1,136 @@
+"""Query parsing and planning."""
+
+import math
+
+import pytest
+
+from synthetic import synthetic_waypoints
+from soaring_cup_file_editor.collection import WaypointCollection
+from soaring_cup_file_editor.models import Waypoint
+from soaring_cup_file_editor.query import (
+    And, Compare, In, Not, Or, QueryEngine, QueryError, Text, Within, parse_query, run_query
+)
+from soaring_cup_file_editor.spatial import haversine_m
+from soaring_cup_file_editor.store import WaypointStore
+from soaring_cup_file_editor.utils import fold_text, parse_length
+
+
+def number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def length(value):
+    metres = parse_length(value) if value else None
+    return math.nan if metres is None else metres
+
+
+def country(w):
+    return w.country.strip().upper()
+
+
+# Queries with the same selection written as a plain Python test of each waypoint
+QUERIES = [
+    ("style IN (2, 4, 5) AND country = PL", lambda w: w.style in (2, 4, 5) and country(w) == 'PL'),
+    ("runway_length >= 600m", lambda w: length(w.runway_length) >= 600),
+    ("elevation > 800m OR style = 19", lambda w: length(w.elevation) > 800 or w.style == 19),
+    ("WITHIN 10nm OF 50.06, 19.94 AND NOT style = 8",
+     lambda w: haversine_m(50.06, 19.94, w.latitude, w.longitude) <= 18520 and w.style != 8),
+    ("frequency >= 122.5 AND frequency < 123", lambda w: 122.5 <= number(w.frequency) < 123),
+    ("name ~ biel", lambda w: 'biel' in fold_text(w.name)),
+    ("country != PL", lambda w: country(w) != 'PL'),
+    ("style NOT IN (1, 2) AND elevation <= 300m",
+     lambda w: w.style not in (1, 2) and length(w.elevation) <= 300),
+    ("NOT (style = 1 OR latitude < 50)", lambda w: not (w.style == 1 or w.latitude < 50)),
+    ("style = \"Gliding airfield\"", lambda w: w.style == 4),
+    ("rwwidth = 30m AND lon > 20", lambda w: length(w.runway_width) == 30 and w.longitude > 20),
+]
+
+
+@pytest.fixture(scope='module')
+def base_waypoints():
+    return list(synthetic_waypoints(3000))
+
+
+def matching(collection, test):
+    return {row_id for row_id in collection.store.row_ids() if test(collection.get(row_id))}
+
+
+@pytest.mark.parametrize('query, test', QUERIES, ids=[query for query, _ in QUERIES])
+def test_planner_matches_brute_force(base_waypoints, query, test):
+    collection = WaypointCollection(WaypointStore(base_waypoints))
+    engine = QueryEngine(collection)
+    planned = engine.run(query)
+    assert planned.ids == matching(collection, test)
+    assert engine.run(query, use_indexes=False).ids == planned.ids
+
+
+def test_indexes_follow_edits(base_waypoints):
+    collection = WaypointCollection(WaypointStore(base_waypoints))
+    engine = QueryEngine(collection)
+    # Some indexes are built before the edits, the others after them
+    for query, _ in QUERIES[:4]:
+        engine.run(query)
+    added = collection.add(Waypoint("Bielsko new", 50.05, 19.95, country='PL', style=4,
+                                    elevation='900m', runway_length='700m', frequency='122.700'))
+    collection.update(collection.id_at(10), Waypoint("Moved", 50.06, 19.94, style=2, country='PL',
+                                                     runway_length='650m', runway_width='30m'))
+    collection.remove([collection.id_at(0), collection.id_at(1)])
+    collection.extend(Waypoint(f"Bulk {i}", 51.0, 21.0 + i * 0.001, style=5, country='CZ')
+                      for i in range(1500))
+    for query, test in QUERIES:
+        assert engine.run(query).ids == matching(collection, test), query
+    assert added in engine.run("name ~ bielsko").ids
+
+
+def test_text_search_matches_words_in_any_field(base_waypoints):
+    collection = WaypointCollection(WaypointStore(base_waypoints[:200]))
+    word = collection[5].name.split()[0].lower()
+    result = QueryEngine(collection).run(word)
+    assert result is not None and collection.id_at(5) in result.ids
+
+
+def test_within_of_a_waypoint_by_code():
+    waypoints = [Waypoint("Centre", 50.0, 19.0, code="CTR"), Waypoint("Near", 50.05, 19.0),
+                 Waypoint("Far", 51.0, 19.0)]
+    assert [w.name for w in run_query(waypoints, "WITHIN 10km OF CTR")] == ["Centre", "Near"]
+    with pytest.raises(QueryError):
+        run_query(waypoints, "WITHIN 10km OF NOWHERE")
+
+
+def test_parse_structure():
+    condition = parse_query('style in (2,4) AND country=PL OR NOT rwlen >= 600m')
+    assert isinstance(condition, Or)
+    first, second = condition.parts
+    assert isinstance(first, And) and isinstance(first.parts[0], In) and first.parts[0].values == ('2', '4')
+    assert isinstance(first.parts[1], Compare) and first.parts[1].field == 'country'
+    assert isinstance(second, Not) and second.part.field == 'runway_length' and second.part.op == '>='
+    assert isinstance(parse_query('WITHIN 10nm OF 50.1, 19.2'), Within)
+    words = parse_query('glider "Nowy Targ"')
+    assert isinstance(words, And) and [part.text for part in words.parts] == ['glider', 'Nowy Targ']
+    assert parse_query('   ') is None
+
+
+@pytest.mark.parametrize('query', ['bogus = 5', 'elevation >', 'style IN (2', '(name ~ a', 'WITHIN x OF A'])
+def test_parse_errors(query):
+    with pytest.raises(QueryError):
+        parse_query(query)
+
+
+@pytest.mark.parametrize('query, words', [
+    ('word not', ['word']),
+    ('word =', ['word']),
+    ('glider or', ['glider']),
+    ('glider and', ['glider']),
+])
+def test_unfinished_operators_after_words_search_the_words(query, words):
+    condition = parse_query(query)
+    assert isinstance(condition, Text) and [condition.text] == words
+
+
+def test_word_not_word_is_a_negated_search():
+    condition = parse_query('glider not lotnisko')
+    assert isinstance(condition, And)
+    assert isinstance(condition.parts[1], Not) and condition.parts[1].part.text == 'lotnisko'
@@ -0,0 +1,81 @@
+"""Row ids of WaypointStore and WaypointCollection."""
+
+import pytest
+
+from soaring_cup_file_editor.collection import WaypointCollection
+from soaring_cup_file_editor.models import Waypoint
+from soaring_cup_file_editor.store import WaypointStore
+
+
+def waypoints(*names):
+    return [Waypoint(name, 50.0 + i * 0.1, 19.0 + i * 0.1, code=name.upper()) for i, name in enumerate(names)]
+
+
+def test_row_ids_survive_sort_and_reorder():
+    store = WaypointStore(waypoints('c', 'a', 'b'))
+    ids = {store.get(row_id).name: row_id for row_id in store.row_ids()}
+    store.sort()
+    assert [w.name for w in store] == ['a', 'b', 'c']
+    assert {name: store.get(row_id).name for name, row_id in ids.items()} == {'a': 'a', 'b': 'b', 'c': 'c'}
+    store.reverse()
+    assert store.get(ids['a']).name == 'a'
+
+
+def test_deleted_ids_are_not_reused():
+    store = WaypointStore(waypoints('a', 'b'))
+    first = store.id_at(0)
+    store.remove_ids([first])
+    new_id = store.add(Waypoint('c', 1.0, 2.0))
+    assert new_id == 2 and not store.contains_id(first)
+    with pytest.raises(KeyError):
+        store.get(first)
+
+
+def test_removed_rows_can_be_restored_with_their_data():
+    store = WaypointStore(waypoints('a', 'b', 'c'))
+    store.remove_ids([0, 2])
+    store.restore_ids([2, 0])
+    assert [w.name for w in store] == ['b', 'c', 'a']
+    with pytest.raises(KeyError):
+        store.restore(1)
+
+
+def test_assignment_and_replace_keep_the_row_id():
+    store = WaypointStore(waypoints('a', 'b'))
+    row_id = store.id_at(1)
+    store[1] = Waypoint('renamed', 1.0, 2.0)
+    assert store.id_at(1) == row_id and store.get(row_id).name == 'renamed'
+    store.replace(row_id, Waypoint('again', 1.0, 2.0))
+    assert store[1].name == 'again'
+
+
+def test_clear_keeps_row_ids_increasing():
+    store = WaypointStore(waypoints('a', 'b', 'c'))
+    old_ids = list(store.row_ids())
+    store.clear()
+    assert len(store) == 0
+    new_id = store.add(Waypoint('d', 1.0, 2.0))
+    assert new_id not in old_ids
+    assert not any(store.contains_id(row_id) for row_id in old_ids)
+    with pytest.raises(KeyError):
+        store.restore(old_ids[0])
+
+
+def test_copy_keeps_ids_and_is_independent():
+    store = WaypointStore(waypoints('a', 'b'))
+    store.remove_ids([0])
+    snapshot = store.copy()
+    store.replace(1, Waypoint('edited', 1.0, 2.0))
+    assert list(snapshot.row_ids()) == [1]
+    assert snapshot.get(1).name == 'b'
+    assert snapshot.next_row_id == store.next_row_id
+
+
+def test_collection_keeps_row_ids_while_resorting():
+    collection = WaypointCollection(WaypointStore(waypoints('b', 'a')))
+    row_id = collection.add(Waypoint('0 first', 1.0, 2.0))
+    assert collection.index_of(row_id) == 0
+    collection.update(row_id, Waypoint('z last', 1.0, 2.0))
+    assert collection.index_of(row_id) == 2
+    assert collection.get(row_id).name == 'z last'
+    assert [w.name for w in collection] == ['a', 'b', 'z last']